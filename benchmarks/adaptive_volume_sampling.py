@@ -0,0 +1,57 @@
+"""
+Number of energy evaluations for adaptive volume sampling vs the fixed grid of
+21 lattice constant factors in [0.8, 1.2] used by crystal_inputs.magnesium_oxide.
+
+Energies come from a Birch-Murnaghan curve with Gaussian noise. The adaptive driver
+is run twice per synthetic crystal:
+ * With the default tolerances of adaptive_sampling
+ * With tolerances equal to the parameter uncertainties achieved by the fixed
+   grid, such that both reach the same precision
+"""
+
+import warnings
+import numpy as np
+
+from energy_vs_volume import ev_functions
+from energy_vs_volume.adaptive_sampling import adaptive_energy_vs_volume, default_tolerances
+
+warnings.filterwarnings("ignore")
+
+n_crystals = 20
+energy_noise = 1.e-6
+fixed_factors = np.linspace(0.8, 1.2, 21, endpoint=True)
+rng = np.random.default_rng(0)
+
+print("{:>8s} {:>8s} {:>18s} {:>18s} {:>10s}".format(
+    "Crystal", "Fixed", "Adaptive, default", "Adaptive, matched", "Converged"))
+n_fixed, n_default, n_matched = 0, 0, 0
+for i in range(n_crystals):
+    # Bulk lattice constant slightly off the equilibrium value, as for experimental constants
+    true_params = np.array([rng.uniform(-30., -5.), rng.uniform(200., 600.),
+                            rng.uniform(0.002, 0.01), rng.uniform(3.5, 5.)])
+    reference_volume = true_params[1] * rng.uniform(0.95, 1.05)
+
+    def energy(factor):
+        volume = reference_volume * factor**3
+        return ev_functions.birch_murnaghan_relation(volume, *true_params) + rng.normal(0., energy_noise)
+
+    volumes = reference_volume * fixed_factors**3
+    energies = np.array([energy(f) for f in fixed_factors])
+    _, params, sd = ev_functions.fit_equation_of_state({'V': volumes, 'E': energies}, volumes,
+                                                       energy_noise=energy_noise)
+    tolerances = {'V0': sd[1] / params[1], 'B0': sd[2] / params[2], 'B1': sd[3]}
+
+    default = adaptive_energy_vs_volume(energy, reference_volume, tolerances=default_tolerances,
+                                        energy_noise=energy_noise, max_points=fixed_factors.size)
+    matched = adaptive_energy_vs_volume(energy, reference_volume, tolerances=tolerances,
+                                        energy_noise=energy_noise, max_points=fixed_factors.size)
+    print("{:>8d} {:>8d} {:>18d} {:>18d} {:>10s}".format(
+        i, fixed_factors.size, default['n_evaluations'], matched['n_evaluations'],
+        str(default['converged'] and matched['converged'])))
+    n_fixed += fixed_factors.size
+    n_default += default['n_evaluations']
+    n_matched += matched['n_evaluations']
+
+print("Total qcore runs. Fixed grid: {:d}, adaptive with default tolerances: {:d} ({:.0f}%), "
+      "adaptive with matched precision: {:d} ({:.0f}%)".format(
+       n_fixed, n_default, 100. * n_default / n_fixed, n_matched, 100. * n_matched / n_fixed))
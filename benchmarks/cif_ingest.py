@@ -0,0 +1,48 @@
+"""
+Benchmark cif ingest throughput with and without spglib symmetry detection.
+
+The space group of each cif is detected once, up front, then every cif is
+ingested with symmetry = 'full' (spglib on every read) and with the space
+group supplied (no symmetry detection). Finally, the background verification
+pass is timed on its own.
+
+Run from this directory, consistent with the other scripts.
+"""
+
+import glob
+import time
+import warnings
+
+from src.pymatgen_wrappers import cif_parser_wrapper, detected_space_group, verify_space_groups
+
+warnings.filterwarnings("ignore")
+
+n_repeats = 5
+symprec = 0.01
+
+fnames = sorted(glob.glob('../cifs/**/*.cif', recursive=True))
+space_groups = {fname: detected_space_group(fname, symprec=symprec) for fname in fnames}
+
+
+def ingest(symmetry: str) -> float:
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        for fname in fnames:
+            space_group = space_groups[fname] if symmetry == 'declared' else None
+            cif_parser_wrapper(fname, space_group=space_group, symmetry=symmetry, symprec=symprec)
+    return time.perf_counter() - start
+
+
+n_reads = n_repeats * len(fnames)
+t_full = ingest('full')
+t_declared = ingest('declared')
+
+print("Cifs ingested:", n_reads)
+print("symmetry = full:     {:.3f} s, {:.1f} cifs/s".format(t_full, n_reads / t_full))
+print("symmetry = declared: {:.3f} s, {:.1f} cifs/s".format(t_declared, n_reads / t_declared))
+print("Speed-up: {:.2f}".format(t_full / t_declared))
+
+crystals = {fname: cif_parser_wrapper(fname, space_group=space_groups[fname]) for fname in fnames}
+start = time.perf_counter()
+verify_space_groups(crystals, symprec=symprec)
+print("Verification pass: {:.3f} s".format(time.perf_counter() - start))
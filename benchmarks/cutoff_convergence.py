@@ -0,0 +1,61 @@
+"""
+Benchmark the automated cutoff convergence against scanning every cutoff
+over the full ladder, and against the full grid of cutoff combinations.
+
+Energies come from a synthetic model of an 8-atom cell, in which the h0,
+overlap and repulsive errors decay exponentially with different lengths, and
+the dispersion error decays as the cube of its cutoff. Each energy evaluation
+sleeps for a fixed time, standing in for a qcore run.
+"""
+
+import itertools
+import time
+import numpy as np
+
+from converged_inputs import cutoff_convergence
+
+n_atoms = 8
+e_converged = -69.056517465
+run_time = 0.01
+decay = {'h0_cutoff': (2.e-1, 4.), 'overlap_cutoff': (1.e-1, 3.), 'repulsive_cutoff': (5.e-2, 2.)}
+dispersion = -0.05
+
+
+def energy(cutoffs: dict) -> float:
+    time.sleep(run_time)
+    error = sum(a * np.exp(-cutoffs[key] / length) for key, (a, length) in decay.items())
+    return e_converged + error + dispersion / cutoffs['dispersion_cutoff'] ** 3
+
+
+ladder = cutoff_convergence.default_cutoffs
+keys = cutoff_convergence.cutoff_keys
+tolerance = cutoff_convergence.default_tolerance
+
+# Exhaustive answer: cheapest grid point, by sum of cutoffs cubed, for which the
+# sum of the magnitudes of the errors meets the tolerance
+grid = np.array(list(itertools.product(ladder, repeat=len(keys))))
+errors = np.zeros(len(grid))
+for k, key in enumerate(keys):
+    if key in decay:
+        a, length = decay[key]
+        errors += a * np.exp(-grid[:, k] / length)
+    else:
+        errors += abs(dispersion) / grid[:, k] ** 3
+ok = errors / n_atoms < tolerance
+cheapest = grid[ok][np.argmin(np.sum(grid[ok] ** 3, axis=1))]
+print("Full grid:      {:5d} runs. Cheapest cutoffs {}".format(len(grid), cheapest))
+
+start = time.perf_counter()
+scan = {key: [energy(dict({k: ladder[-1] for k in keys}, **{key: c})) for c in ladder] for key in keys}
+print("Full scans:     {:5d} runs, {:5.2f} s".format(len(keys) * len(ladder), time.perf_counter() - start))
+
+for n_probes in [1, 4]:
+    start = time.perf_counter()
+    result = cutoff_convergence.converge_cutoffs(energy, n_atoms, n_coarse=4, n_probes=n_probes)
+    print("Automated, {:d} probes: {:3d} runs, {:5.2f} s. Cutoffs {}, error/atom vs exact {:.1e} Ha, "
+          "vs extrapolated {:.1e} Ha. Extrapolation error/atom {:.1e} Ha"
+          .format(n_probes, result['n_runs'], time.perf_counter() - start,
+                  [result['cutoffs'][key] for key in keys],
+                  abs(result['energy'] - e_converged) / n_atoms,
+                  result['error_per_atom'],
+                  abs(result['extrapolated_energy'] - e_converged) / n_atoms))
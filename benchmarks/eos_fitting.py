@@ -0,0 +1,54 @@
+"""
+Benchmark batched Birch-Murnaghan fitting against per-curve scipy curve_fit.
+
+Synthetic E(V) curves span the range of energies, volumes and bulk moduli of
+the elemental crystals, in atomic units, with noise comparable to SCC tolerances.
+"""
+
+import time
+import warnings
+import numpy as np
+
+from energy_vs_volume import ev_functions
+
+warnings.filterwarnings("ignore")
+
+n_curves = 500
+n_points = 15
+noise = 1.e-6
+
+rng = np.random.default_rng(0)
+true_params = np.stack([rng.uniform(-30., -5., n_curves),      # E0 (Ha)
+                        rng.uniform(50., 300., n_curves),       # V0 (bohr^3)
+                        rng.uniform(0.002, 0.01, n_curves),     # B0 (Ha/bohr^3)
+                        rng.uniform(3.5, 5., n_curves)], 1)     # B1
+volumes = true_params[:, 1:2] * np.linspace(0.85, 1.15, n_points)
+energies = ev_functions.birch_murnaghan_relation(volumes, *[true_params[:, i:i+1] for i in range(4)])
+energies += rng.normal(0., noise, energies.shape)
+
+
+def relative_v0_error(params: np.ndarray) -> float:
+    return float(np.nanmax(np.abs(params[:, 1] - true_params[:, 1]) / true_params[:, 1]))
+
+
+start = time.perf_counter()
+serial_params = np.full(true_params.shape, np.nan)
+n_failed = 0
+for i in range(n_curves):
+    try:
+        _, serial_params[i], _ = ev_functions.fit_equation_of_state({'V': volumes[i], 'E': energies[i]},
+                                                                    volumes[i])
+    except RuntimeError:
+        n_failed += 1
+t_serial = time.perf_counter() - start
+
+start = time.perf_counter()
+batch_params, _, converged = ev_functions.fit_equation_of_state_batch(volumes, energies)
+t_batch = time.perf_counter() - start
+
+print("Curves: {:d}, points per curve: {:d}".format(n_curves, n_points))
+print("curve_fit, per curve: {:.4f} s, failures: {:d}, max relative V0 error: {:.2e}".format(
+    t_serial, n_failed, relative_v0_error(serial_params)))
+print("Batched fit:          {:.4f} s, failures: {:d}, max relative V0 error: {:.2e}".format(
+    t_batch, int(np.sum(~converged)), relative_v0_error(batch_params)))
+print("Speed-up: {:.1f}".format(t_serial / t_batch))
@@ -0,0 +1,59 @@
+"""
+Fit time and failure rate of fit_equation_of_state over synthetic, noisy E(V) curves.
+
+Compares the original fit (guess [min(E), min(V), 1, 1], finite-difference
+derivatives) against the parabola-based guess with analytic Jacobians, for
+each equation of state. A fit fails if curve_fit raises, or if V0 deviates
+from the true value by more than 1%.
+"""
+
+import time
+import warnings
+import numpy as np
+import scipy.optimize
+
+from energy_vs_volume import ev_functions
+
+warnings.filterwarnings("ignore")
+
+n_curves = 200
+n_points = 11
+noise_levels = [1.e-6, 1.e-5, 1.e-4]
+rng = np.random.default_rng(0)
+
+
+def original_fit(data: dict, volume_grid: np.ndarray, eos='birch_murnaghan'):
+    relation = ev_functions.equations_of_state[eos][0]
+    param_guesses = [np.amin(data['E']), np.amin(data['V']), 1., 1.]
+    params, pcov = scipy.optimize.curve_fit(relation, data['V'], data['E'], param_guesses)
+    return relation(volume_grid, *params), params, np.sqrt(np.diag(pcov))
+
+
+def benchmark(fit, eos: str, noise: float) -> tuple:
+    relation = ev_functions.equations_of_state[eos][0]
+    n_failed = 0
+    elapsed = 0.
+    for _ in range(n_curves):
+        true_params = [rng.uniform(-30., -5.), rng.uniform(50., 300.),
+                       rng.uniform(0.002, 0.01), rng.uniform(3.5, 5.)]
+        volumes = true_params[1] * np.linspace(0.85, 1.15, n_points)
+        energies = relation(volumes, *true_params) + rng.normal(0., noise, n_points)
+        start = time.perf_counter()
+        try:
+            _, params, _ = fit({'V': volumes, 'E': energies}, volumes, eos=eos)
+            failed = not abs(params[1] - true_params[1]) <= 0.01 * true_params[1]
+        except (RuntimeError, ValueError):
+            failed = True
+        elapsed += time.perf_counter() - start
+        n_failed += failed
+    return elapsed, n_failed / n_curves
+
+
+print("{:<16s} {:>8s}  {:>18s} {:>10s}  {:>18s} {:>10s}".format(
+    "EOS", "Noise", "Original time (s)", "Failures", "Analytic time (s)", "Failures"))
+for eos in ev_functions.equations_of_state:
+    for noise in noise_levels:
+        t_original, f_original = benchmark(original_fit, eos, noise)
+        t_analytic, f_analytic = benchmark(ev_functions.fit_equation_of_state, eos, noise)
+        print("{:<16s} {:>8.0e}  {:>18.3f} {:>9.1f}%  {:>18.3f} {:>9.1f}%".format(
+            eos, noise, t_original, 100 * f_original, t_analytic, 100 * f_analytic))
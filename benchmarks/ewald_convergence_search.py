@@ -0,0 +1,51 @@
+"""
+Benchmark the automated Ewald convergence search against a full parameter grid.
+
+Energies come from a synthetic model of conventional NaCl, fitted by eye to the
+sweeps tabulated in ewald_convergence/plot_ewald.py:
+ * The real-space error decays as erfc(sqrt(alpha) R), raising the energy at small alpha
+ * The reciprocal-space error grows as exp(-k_max / alpha), lowering the energy at
+   large alpha, until the SCF fails (returned as 0, as ewald.run_qcore does)
+Each energy evaluation sleeps for a fixed time, standing in for a qcore run.
+"""
+
+import time
+import numpy as np
+import scipy.special
+
+from ewald_convergence import convergence
+
+e_converged = -18.757852164027
+run_time = 0.01
+real = 20.
+
+
+def energy(ewald: dict) -> float:
+    time.sleep(run_time)
+    real_error = 5.e-4 * scipy.special.erfc(0.3 * ewald['real'] * np.sqrt(ewald['alpha']))
+    reciprocal_error = -100. * np.exp(-2.15 * ewald['reciprocal'] / ewald['alpha'])
+    if abs(reciprocal_error) > 1.:
+        return 0
+    return e_converged + real_error + reciprocal_error
+
+
+# Full grid, in the style of ewald.sweep_values
+k_grid = np.arange(1, 21)
+alpha_grid = np.geomspace(*convergence.default_alpha_range, 40)
+start = time.perf_counter()
+grid = np.array([[energy({'real': real, 'reciprocal': k, 'alpha': alpha}) for alpha in alpha_grid] for k in k_grid])
+grid_time = time.perf_counter() - start
+
+# Cheapest converged grid point: smallest k_max, then smallest alpha
+converged = np.abs(grid - e_converged) < convergence.default_tolerance
+ik, ia = np.argwhere(converged)[0]
+print("Full grid:  {:4d} runs, {:6.1f} s. k_max = {:d}, alpha = {:.3f}".format(
+    grid.size, grid_time, k_grid[ik], alpha_grid[ia]))
+
+for n_probes in [1, 4, 8]:
+    start = time.perf_counter()
+    result = convergence.converge_ewald(energy, real, reciprocal=20, n_probes=n_probes)
+    search_time = time.perf_counter() - start
+    print("Search, {:d} concurrent probes: {:4d} runs, {:6.1f} s. k_max = {:d}, alpha = {:.3f}, "
+          "|E - E_converged| = {:.1e} Ha".format(n_probes, result['n_runs'], search_time, result['reciprocal'],
+                                                 result['alpha'], abs(result['energy'] - e_converged)))
@@ -0,0 +1,55 @@
+"""
+Benchmark the NumPy point-charge Ewald engine at ~10^4 charges.
+
+For each real-space cutoff, alpha and the reciprocal cutoff are chosen by
+ewald.ewald_parameters for a target tolerance, and the time and error are reported
+for two systems of 10648 unit charges at the density of rock salt:
+ * Disordered: random positions and charges (the regime the Kolafa-Perram
+   estimates assume). The reference energy uses a tolerance of 1e-12 Ha.
+ * Rock salt supercell: exact energy from the Madelung constant. Charges
+   are correlated, so |S(G)|^2 ~ N^2 at Bragg peaks rather than ~ N, and
+   the estimates are optimistic. Screen crystals with a tighter tolerance.
+"""
+
+import time
+import numpy as np
+
+from src import ewald
+
+madelung_nacl = 1.747564594633182
+a = 10.66     # Conventional NaCl lattice constant, bohr
+n = 11        # 11 x 11 x 11 conventional cells = 10648 charges
+tolerance = 1.e-6
+
+fcc = np.array([[0., 0., 0.], [0.5, 0.5, 0.], [0.5, 0., 0.5], [0., 0.5, 0.5]])
+basis = np.vstack([fcc, fcc + [0.5, 0., 0.]])
+cells = np.stack(np.meshgrid(*[np.arange(n)] * 3, indexing='ij'), -1).reshape(-1, 1, 3)
+lattice = np.eye(3) * n * a
+volume = (n * a) ** 3
+
+crystal_positions = (cells + basis).reshape(-1, 3) * a
+crystal_charges = np.tile([1.] * 4 + [-1.] * 4, n ** 3)
+crystal_energy = -0.5 * madelung_nacl * crystal_charges.size / (0.5 * a)
+
+rng = np.random.default_rng(0)
+random_positions = rng.random(crystal_positions.shape) * n * a
+random_charges = rng.permutation(crystal_charges)
+alpha, reciprocal_cutoff = ewald.ewald_parameters(random_charges, volume, 20., 1.e-12)
+random_energy = ewald.ewald_energy(lattice, random_positions, random_charges, alpha, 20., reciprocal_cutoff)['total']
+
+systems = {'disordered': (random_positions, random_charges, random_energy),
+           'rock salt': (crystal_positions, crystal_charges, crystal_energy)}
+
+print("{:d} charges, tolerance {:.0e} Ha".format(crystal_charges.size, tolerance))
+print("{:>12s} {:>8s} {:>8s} {:>8s} {:>12s} {:>12s} {:>8s}".format(
+    "System", "R (bohr)", "alpha", "G_c", "est. error", "|error|", "time (s)"))
+for name, (positions, charges, reference) in systems.items():
+    for real_cutoff in [10., 15., 20., 25.]:
+        alpha, reciprocal_cutoff = ewald.ewald_parameters(charges, volume, real_cutoff, tolerance)
+        estimate = np.hypot(ewald.real_space_error(charges, volume, alpha, real_cutoff),
+                            ewald.reciprocal_space_error(charges, volume, alpha, reciprocal_cutoff))
+        start = time.perf_counter()
+        energy = ewald.ewald_energy(lattice, positions, charges, alpha, real_cutoff, reciprocal_cutoff)
+        elapsed = time.perf_counter() - start
+        print("{:>12s} {:8.1f} {:8.4f} {:8.3f} {:12.1e} {:12.1e} {:8.2f}".format(
+            name, real_cutoff, alpha, reciprocal_cutoff, estimate, abs(energy['total'] - reference), elapsed))
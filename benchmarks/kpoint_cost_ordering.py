@@ -0,0 +1,53 @@
+"""
+Benchmark symmetry-aware ordering of Monkhorst-Pack grids.
+
+For several crystals, predicts the number of irreducible k-points of every
+candidate grid with spglib, then runs the k-point convergence on a synthetic
+energy, in which the error per atom decays exponentially with the k-point
+density and the run time is proportional to the number of irreducible k-points.
+The total number of k-points computed is compared to running every
+candidate in order of grid size, as when choosing grids by hand. Grids that
+are more expensive than a denser grid are dropped from the cost order.
+"""
+
+import time
+import numpy as np
+
+from crystal_system import cubic, tetragonal, hexagonal
+from src.pymatgen_wrappers import cif_parser_wrapper
+from converged_inputs import kpoint_convergence
+
+crystals = {'MgO': cif_parser_wrapper('../' + cubic.conventional_fcc_cifs['magnesium_oxide'].file),
+            'rutile': tetragonal.tio2_rutile(),
+            'anatase': tetragonal.tio2_anatase(),
+            'h-BN': hexagonal.boron_nitride()}
+
+print('crystal'.ljust(10) + 'grids, kept'.ljust(13) + 'prediction (s)'.ljust(16) +
+      'k-points run: by size, by cost'.ljust(34) + 'converged grid')
+for name, crystal in crystals.items():
+    start = time.perf_counter()
+    grids = kpoint_convergence.candidate_grids(crystal, max_k_points=16 ** 3)
+    candidates = kpoint_convergence.order_by_cost(crystal, grids)
+    prediction_time = time.perf_counter() - start
+    n_k_points = {tuple(mesh): kpoint_convergence.irreducible_k_points(crystal, mesh) for mesh in grids}
+
+    lengths = kpoint_convergence.reciprocal_lengths(crystal)
+
+    def energy(point):
+        # Error set by the coarsest direction of the grid
+        density = np.min(np.asarray(point['monkhorst_pack']) / lengths)
+        return crystal['n_atoms'] * (-5. + 0.1 * np.exp(-4. * density))
+
+    # Same stopping criterion, with grids in order of size
+    size_cost, previous = 0, np.nan
+    for mesh in sorted(grids, key=np.prod):
+        size_cost += n_k_points[tuple(mesh)]
+        energy_per_atom = energy({'monkhorst_pack': mesh}) / crystal['n_atoms']
+        if abs(energy_per_atom - previous) < kpoint_convergence.default_tolerance:
+            break
+        previous = energy_per_atom
+
+    by_cost = kpoint_convergence.converge_k_points(energy, crystal, grids=grids)
+    cost_cost = sum(run['n_k_points'] for run in by_cost['runs'])
+    print(name.ljust(10) + '{:<13}'.format(str(len(grids)) + ', ' + str(len(candidates))) + '{:<16.3f}'.format(prediction_time) +
+          '{:<34}'.format(str(size_cost) + ', ' + str(cost_cost)) + str(by_cost['monkhorst_pack']))
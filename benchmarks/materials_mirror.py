@@ -0,0 +1,79 @@
+"""
+Benchmark the offline Materials Project mirror.
+
+Writes a synthetic mirror with three cubic polymorphs of each of the 118
+elements, in the document format of the supported_properties fields, then:
+ * builds the lowest-energy crystal of every element, as elemental_crystals does
+ * answers the same query through the HTTP stand-in server, as the legacy
+   MPRester would send it, and checks both agree
+"""
+
+import json
+import os
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+from pymatgen.core.lattice import Lattice
+from pymatgen.core.structure import Structure
+from pymatgen.io.cif import CifWriter
+
+from elemental_crystals import mirror
+from elemental_crystals.crystals import elemental_crystals
+from elemental_crystals.parameters import an_to_symbol, supported_properties
+
+
+def synthetic_documents() -> list:
+    polymorphs = {'bcc': (229, [[0, 0, 0]]), 'fcc': (225, [[0, 0, 0]]), 'sc': (221, [[0, 0, 0]])}
+    documents = []
+    for number, symbol in an_to_symbol.items():
+        for i, (name, (space_group, coords)) in enumerate(polymorphs.items()):
+            structure = Structure.from_spacegroup(space_group, Lattice.cubic(3. + 0.01 * number), [symbol], coords)
+            document = {key: None for key in supported_properties}
+            document.update({'material_id': 'mp-' + str(1000 * number + i),
+                             'energy': -1. * len(structure) + 0.1 * i,
+                             'energy_per_atom': -1. + 0.1 * i / len(structure),
+                             'nsites': len(structure),
+                             'unit_cell_formula': {symbol: float(len(structure))},
+                             'pretty_formula': symbol,
+                             'elements': [symbol],
+                             'nelements': 1,
+                             'e_above_hull': 0.1 * i,
+                             'spacegroup': {'number': space_group, 'symbol': name},
+                             'cif': str(CifWriter(structure))})
+            documents.append(document)
+    return documents
+
+
+with tempfile.TemporaryDirectory() as directory:
+    file_name = os.path.join(directory, 'mirror.sqlite')
+    documents = synthetic_documents()
+    start = time.perf_counter()
+    store = mirror.MaterialsMirror(file_name, writable=True)
+    store.insert(documents)
+    print('Mirror of {} documents written in {:.2f} s, {:.0f} kB'.format(
+        len(store), time.perf_counter() - start, os.path.getsize(file_name) / 1024))
+    store.close()
+
+    start = time.perf_counter()
+    crystals = elemental_crystals(file_name)
+    print('Crystals of {} elements from the mirror in {:.2f} s'.format(
+        sum(crystal is not None for crystal in crystals.values()), time.perf_counter() - start))
+
+    with mirror.LocalMPRester(mirror=file_name) as rester:
+        entry = rester.get_entries('K', inc_structure='initial', sort_by_e_above_hull=True)[0]
+        local = rester.query({'elements': {'$in': ['K', 'Na']}, 'e_above_hull': {'$lt': 0.05}},
+                             ['material_id', 'pretty_formula'])
+    print('Ground state of K:', entry.entry_id, entry.structure.get_space_group_info())
+
+    server, endpoint = mirror.serve(file_name)
+    data = urllib.parse.urlencode({'criteria': json.dumps({'elements': {'$in': ['K', 'Na']},
+                                                           'e_above_hull': {'$lt': 0.05}}),
+                                   'properties': json.dumps(['material_id', 'pretty_formula'])}).encode()
+    start = time.perf_counter()
+    with urllib.request.urlopen(endpoint + '/query', data) as response:
+        remote = json.loads(response.read())
+    print('HTTP query in {:.3f} s, agrees with local query: {}'.format(
+        time.perf_counter() - start, remote['valid_response'] and remote['response'] == local))
+    server.shutdown()
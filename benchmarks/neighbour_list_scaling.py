@@ -0,0 +1,42 @@
+"""
+Benchmark the cell-list neighbour search at a 40 bohr cutoff, up to ~10^5 atoms.
+
+Atoms are rock salt supercells, with small random displacements. For each
+size, reports the time to build the list, the number of unordered pairs,
+the memory footprint of the CSR arrays, and the time to re-evaluate all
+distances (as done per Ewald alpha or per sweep point).
+"""
+
+import time
+import numpy as np
+
+from src.neighbour_list import NeighbourList
+
+a = 10.66      # Conventional NaCl lattice constant, bohr
+cutoff = 40.
+skin = 1.
+
+fcc = np.array([[0., 0., 0.], [0.5, 0.5, 0.], [0.5, 0., 0.5], [0., 0.5, 0.5]])
+basis = np.vstack([fcc, fcc + [0.5, 0., 0.]])
+rng = np.random.default_rng(0)
+
+print("{:>8s} {:>12s} {:>10s} {:>12s} {:>10s} {:>12s}".format(
+    "n_atoms", "n_pairs", "build (s)", "memory (MB)", "B / pair", "reuse (s)"))
+for n in [2, 5, 11, 23]:
+    cells = np.stack(np.meshgrid(*[np.arange(n)] * 3, indexing='ij'), -1).reshape(-1, 1, 3)
+    positions = (cells + basis).reshape(-1, 3) * a + rng.normal(0., 0.05, (8 * n ** 3, 3))
+    lattice = np.eye(3) * n * a
+
+    start = time.perf_counter()
+    neighbours = NeighbourList(lattice, positions, cutoff, skin)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    displaced = positions + rng.normal(0., 0.05, positions.shape)
+    n_within = sum(i.size for i, _, _ in neighbours.distance_batches(displaced))
+    reuse = time.perf_counter() - start
+
+    footprint = neighbours.memory_footprint()['total']
+    print("{:8d} {:12d} {:10.2f} {:12.1f} {:10.2f} {:12.2f}".format(
+        positions.shape[0], neighbours.n_pairs, build, footprint / 1.e6,
+        footprint / neighbours.n_pairs, reuse))
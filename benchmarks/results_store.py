@@ -0,0 +1,51 @@
+"""
+Benchmark loading sweep histories from the results store.
+
+Writes 10^6 Ewald sweep runs (real cutoff, k_max, alpha, energy, n_iter,
+wall time), then times loading the whole sweep and an indexed selection as
+NumPy arrays. Also times recording single runs, as a sweep runner does.
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+
+from src.results_store import ResultsStore
+
+n_rows = 10 ** 6
+rng = np.random.default_rng(0)
+reciprocal = np.repeat(np.arange(1, 21), n_rows // 20)
+columns = {'real': np.full(n_rows, 20.),
+           'reciprocal': reciprocal,
+           'alpha': np.tile(np.geomspace(0.01, 2., n_rows // 20), 20),
+           'energy': -18.757852164 + rng.normal(0., 1.e-6, n_rows),
+           'n_iter': rng.integers(5, 40, n_rows),
+           'wall_time': rng.uniform(1., 10., n_rows)}
+
+with tempfile.TemporaryDirectory() as directory:
+    file_name = os.path.join(directory, 'results.sqlite')
+    with ResultsStore(file_name) as store:
+        start = time.perf_counter()
+        store.record_arrays('conventional_nacl', columns, qcore_build='benchmark')
+        print("Write {:d} rows: {:.2f} s".format(n_rows, time.perf_counter() - start))
+
+        n_single = 1000
+        start = time.perf_counter()
+        for i in range(n_single):
+            store.record('single_runs', {'alpha': 0.1 * i, 'monkhorst_pack': [2, 2, 2]},
+                         {'energy': -18.7, 'n_iter': 10}, wall_time=1.)
+        print("Record one run: {:.2f} ms".format(1.e3 * (time.perf_counter() - start) / n_single))
+
+    with ResultsStore(file_name) as store:
+        start = time.perf_counter()
+        results = store.query('conventional_nacl', columns=['alpha', 'reciprocal', 'energy', 'n_iter'])
+        print("Load all {:d} rows: {:.3f} s".format(results['energy'].size, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        results = store.query('conventional_nacl', columns=['alpha', 'energy'], reciprocal=4, alpha=(0.1, 0.5))
+        print("Load k_max = 4, 0.1 <= alpha <= 0.5, {:d} rows: {:.4f} s".format(
+            results['energy'].size, time.perf_counter() - start))
+
+        results = store.query('single_runs')
+        print("Single runs:", results['alpha'].size, "rows, columns:", sorted(results))
@@ -0,0 +1,67 @@
+"""
+Memory and creation time of option containers over a 10^5-job sweep definition.
+
+Each job is an options dictionary in the style of converged_inputs, with the
+lattice constant and Ewald alpha varying between jobs. Compares:
+ * The original Set, with an instance __dict__ (replicated below)
+ * The slotted Set
+ * The interned ImmutableSet
+"""
+
+import collections
+import time
+import tracemalloc
+import numpy as np
+
+from src.utils import Set, ImmutableSet
+
+
+class DictSet():
+    """ Original Set, with an instance __dict__ """
+    def __init__(self, value: float, unit=None) -> None:
+        self.value = value
+        if unit is not None:
+            self.unit = unit
+        else:
+            self.unit = ''
+
+
+n_jobs = 100000
+lattice_constants = np.linspace(0.8, 1.2, 100) * 4.2
+alphas = np.linspace(0.1, 1.0, n_jobs // lattice_constants.size)
+
+
+def sweep_definition(container) -> list:
+    jobs = []
+    for al in lattice_constants:
+        for alpha in alphas:
+            jobs.append(collections.OrderedDict([
+                ('a',                       container(float(al), 'angstrom')),
+                ('h0_cutoff',               container(40, 'bohr')),
+                ('overlap_cutoff',          container(40, 'bohr')),
+                ('repulsive_cutoff',        container(40, 'bohr')),
+                ('ewald_real_cutoff',       container(40, 'bohr')),
+                ('ewald_reciprocal_cutoff', container(10)),
+                ('ewald_alpha',             container(float(alpha))),
+                ('monkhorst_pack',          container([2, 2, 2])),
+                ('symmetry_reduction',      container(True)),
+                ('temperature',             container(0, 'kelvin'))
+            ]))
+    return jobs
+
+
+print("{:<14s} {:>10s} {:>14s} {:>18s}".format("Container", "Time (s)", "Peak (MB)", "Distinct objects"))
+for container in [DictSet, Set, ImmutableSet]:
+    # Time without tracing allocations, then measure memory
+    start = time.perf_counter()
+    jobs = sweep_definition(container)
+    elapsed = time.perf_counter() - start
+    del jobs
+
+    tracemalloc.start()
+    jobs = sweep_definition(container)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_distinct = len(set(id(option) for job in jobs for option in job.values()))
+    print("{:<14s} {:>10.3f} {:>14.1f} {:>18d}".format(container.__name__, elapsed, peak / 1.e6, n_distinct))
+    del jobs
@@ -0,0 +1,48 @@
+"""
+Check the k-grids of size_extensive/scaling.py against brute-force folding.
+
+For a Monkhorst-Pack grid of the cell and an n x n x n supercell, the k-points
+of the supercell grid, plus every reciprocal lattice vector of the supercell,
+are compared to the k-points of the cell grid, in fractional coordinates of
+the cell's reciprocal lattice. supercell_k_grid should report an exact grid
+if and only if the two sets coincide. Also checks that the supercell has the
+cell's composition and volume per atom.
+"""
+
+import itertools
+import numpy as np
+
+from crystal_system import cubic
+from src import lattice_vectors
+from src.lattice_vectors import get_bravais
+from size_extensive.scaling import supercell, supercell_k_grid
+
+
+def monkhorst_pack_points(m: int) -> np.ndarray:
+    """ One-dimensional Monkhorst-Pack points of a grid of m, wrapped into [0, 1) """
+    return np.mod((2. * np.arange(1, m + 1) - m - 1) / (2. * m), 1.)
+
+
+def folds_exactly(m: int, n: int) -> bool:
+    points = set(np.round(monkhorst_pack_points(m), 10))
+    grid = supercell_k_grid([m], n)[0][0]
+    folded = np.mod(monkhorst_pack_points(grid)[:, None] / n + np.arange(n)[None, :] / n, 1.)
+    return set(np.round(folded.reshape(-1), 10)) == points
+
+
+print('mesh'.ljust(6) + 'n'.ljust(4) + 'grid'.ljust(6) + 'exact'.ljust(8) + 'folded')
+mismatches = 0
+for m, n in itertools.product(range(1, 13), range(1, 5)):
+    exact = supercell_k_grid([m, m, m], n)[1]
+    folded = folds_exactly(m, n)
+    mismatches += exact != folded
+    if n > 1 and m % n == 0:
+        print(str(m).ljust(6) + str(n).ljust(4) + str(m // n).ljust(6) + str(exact).ljust(8) + str(folded))
+print('Disagreements between supercell_k_grid and folding:', mismatches)
+
+crystal = cubic.silicon()
+for n in [1, 2, 3]:
+    cell = supercell(crystal, n)
+    lattice = lattice_vectors.lattice_vectors_from_parameters(get_bravais(cell), cell['lattice_parameters'])
+    print('silicon {0}x{0}x{0}: {1} atoms, volume per atom {2:.4f}'.format(
+        n, cell['n_atoms'], abs(np.linalg.det(lattice)) / cell['n_atoms']))
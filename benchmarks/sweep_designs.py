@@ -0,0 +1,45 @@
+"""
+Benchmark the declarative sweep engine without qcore.
+
+Compares the number of points of full factorial and sparse-grid designs
+over four axes, then generates the inputs of a 10^5-point Latin-hypercube
+design lazily, comparing peak memory to materialising a list of inputs.
+"""
+
+import time
+import tracemalloc
+
+from crystal_system import tetragonal
+from energy_vs_volume.crystal_inputs import settings
+from src import sweep
+
+crystal = tetragonal.tio2_rutile()
+bounds = {'ewald_alpha': (0.1, 1.), 'ewald_real_cutoff': (10., 40.),
+          'h0_cutoff': (20., 60.), 'lattice_constant_factor': (0.9, 1.1)}
+
+print("Points per axis, full factorial, sparse grid")
+for level in range(1, 7):
+    n_1d = 1 if level == 1 else 2 ** (level - 1) + 1
+    n_sparse = sum(1 for _ in sweep.sparse_grid(bounds, level))
+    print(n_1d, n_1d ** len(bounds), n_sparse)
+
+n_points = 10 ** 5
+tracemalloc.start()
+start = time.perf_counter()
+n_characters = 0
+for point, input_string in sweep.sweep_inputs(crystal, settings, sweep.latin_hypercube(bounds, n_points, seed=0),
+                                              'rutile'):
+    n_characters += len(input_string)
+lazy_time = time.perf_counter() - start
+lazy_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print("Lazy generation of {:d} inputs: {:.1f} s, peak memory {:.1f} MB".format(
+    n_points, lazy_time, lazy_peak / 1.e6))
+
+n_list = 10 ** 4
+tracemalloc.start()
+inputs = list(sweep.sweep_inputs(crystal, settings, sweep.latin_hypercube(bounds, n_list, seed=0), 'rutile'))
+list_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print("List of {:d} inputs: peak memory {:.1f} MB, {:.0f} MB extrapolated to {:d}".format(
+    n_list, list_peak / 1.e6, list_peak / 1.e6 * n_points / n_list, n_points))
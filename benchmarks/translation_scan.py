@@ -0,0 +1,61 @@
+"""
+Benchmark the surrogate of the dense translational invariance scan.
+
+For several crystals, evaluates the surrogate over 13 lattice directions with
+100 shifts each, and compares it to a brute-force evaluation of the same
+truncated lattice sum for every shifted crystal. The brute-force sum plays the
+role of qcore: the scan runs only the selected shifts, and the worst shift of
+those runs is compared to the worst of all 1300 shifts.
+"""
+
+import time
+import numpy as np
+
+from crystal_system import cubic, tetragonal, hexagonal
+from src import lattice_vectors, utils
+from src.lattice_vectors import get_bravais
+from translation_invariance import scan
+
+cutoff = 40.
+crystals = {'silicon': cubic.silicon(),
+            'rutile': tetragonal.tio2_rutile(),
+            'anatase': tetragonal.tio2_anatase(),
+            'h-BN': hexagonal.boron_nitride()}
+
+
+def truncated_sum(crystal: dict, shift: np.ndarray) -> float:
+    """ sum_ij sum_{|T| < cutoff} 1 / sqrt(|r_ij + T|^2 + 1) of the shifted, wrapped crystal """
+    lattice = lattice_vectors.lattice_vectors_from_parameters(get_bravais(crystal), crystal['lattice_parameters'])
+    images = scan.translation_vectors(lattice, cutoff)
+    fractional = np.asarray(crystal['fractional'], dtype=float) + shift
+    fractional -= np.floor(fractional)
+    total = 0.
+    for i, j in zip(*np.triu_indices(fractional.shape[0])):
+        r = (fractional[j] - fractional[i] + images) @ lattice.T
+        total += np.sum(1. / np.sqrt(np.sum(r * r, axis=1) + 1.))
+    return total
+
+
+directions = scan.lattice_directions(1)
+t = np.arange(1, 101) / 101
+shifts = (t[None, :, None] * directions[:, None, :]).reshape(-1, 3)
+
+print('crystal'.ljust(10) + 'surrogate (s)'.ljust(15) + 'brute force (s)'.ljust(17) +
+      'max |error|'.ljust(13) + 'worst |dE|: all, 16 runs')
+for name, crystal in crystals.items():
+    crystal = dict(crystal, lattice_parameters=utils.angstrom_to_bohr(crystal['lattice_parameters']))
+
+    start = time.perf_counter()
+    surrogate = scan.surrogate_deviations(crystal, shifts, cutoff)
+    surrogate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = truncated_sum(crystal, np.zeros(3))
+    exact = np.array([truncated_sum(crystal, shift) for shift in shifts]) - reference
+    brute_force_time = time.perf_counter() - start
+
+    selected = scan.select_shifts(surrogate.reshape(len(directions), -1), n_runs=16, n_per_direction=3)
+    run = exact.reshape(len(directions), -1)[selected[:, 0], selected[:, 1]]
+    print(name.ljust(10) + '{:<15.3f}{:<17.2f}{:<13.1e}{:.3e}, {:.3e}'.format(
+        surrogate_time, brute_force_time, np.max(np.abs(surrogate - exact)),
+        np.max(np.abs(exact)), np.max(np.abs(run))))
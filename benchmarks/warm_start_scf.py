@@ -0,0 +1,45 @@
+"""
+Benchmark warm-started SCF across energy vs volume sweeps.
+
+Each sweep is run twice: every point from qcore's default guess, and as
+warm-started chains seeded with the converged charges of the neighbouring
+point. Reports the total SCF iterations (n_iter) and qcore runs of each
+sweep, including warm-started runs that qcore rejected, and the iterations saved.
+Requires src/warm_start.guess_result to be set for the qcore build. Requires a qcore executable (see src/run_qcore.py).
+
+Run from this directory, such that cif paths resolve as '../cifs/...'
+"""
+
+import time
+import numpy as np
+
+from energy_vs_volume import crystal_inputs, workflow
+from crystal_system import cubic, tetragonal, hexagonal
+from src.pymatgen_wrappers import cif_parser_wrapper
+from src import warm_start as warm_start_module
+
+if warm_start_module.guess_result is None:
+    quit("Set src/warm_start.guess_result, the qcore result key of the converged charges, to run this benchmark")
+
+crystals = {'magnesium_oxide': cif_parser_wrapper('../' + cubic.conventional_fcc_cifs['magnesium_oxide'].file,
+                                                  fractional=True, is_primitive_cell=False, bravais='cubic'),
+            'tio2_rutile': tetragonal.tio2_rutile(),
+            'boron_nitride': hexagonal.boron_nitride()}
+
+timings = {}
+results = {}
+for warm_start in [False, True]:
+    start = time.perf_counter()
+    results[warm_start] = workflow.run_energy_vs_volume(crystals, crystal_inputs.settings, warm_start=warm_start)
+    timings[warm_start] = time.perf_counter() - start
+
+print("{:>16s} {:>10s} {:>10s} {:>10s} {:>10s} {:>14s}".format("Crystal", "Cold", "Warm", "Saved", "Warm runs",
+                                                               "max |dE| (Ha)"))
+for name in crystals:
+    cold, warm = results[False][name], results[True][name]
+    n_cold, n_warm = cold['n_iter'].sum(), warm['n_iter'].sum()
+    max_difference = np.nanmax(np.abs(cold['energies'] - warm['energies']))
+    print("{:>16s} {:>10d} {:>10d} {:>10d} {:>10d} {:>14.2e}".format(name, n_cold, n_warm, n_cold - n_warm,
+                                                                     warm['n_runs'].sum(), max_difference))
+
+print("Wall time. Cold: {:.1f} s, warm-started: {:.1f} s".format(timings[False], timings[True]))
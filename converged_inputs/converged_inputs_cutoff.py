@@ -45,6 +45,8 @@ from src.pymatgen_wrappers import cif_parser_wrapper
 from src import qcore_input_strings as qcore_input
 from src.utils import Set, default_named_result
 from src.run_qcore import run_qcore
+from src.results_store import ResultsStore
+from converged_inputs import cutoff_convergence, kpoint_convergence
 
 
 # Simple cubic
@@ -198,6 +200,53 @@ def primitive_anatase(named_result='primitive_anatase'):
                                                 named_result=named_result)
     return input_string
 
+def example_materials() -> dict:
+    """ Crystals, settings and sub-commands of the examples above, keyed by named result """
+    xtb_potential = collections.OrderedDict([
+        ('potential_type', Set('truncated')),
+        ('smoothing_range', Set(1, 'bohr'))
+    ])
+    sub_commands = collections.OrderedDict([('xtb_potential', xtb_potential)])
+
+    settings = collections.OrderedDict([
+        ('h0_cutoff',               Set(40, 'bohr')),
+        ('overlap_cutoff',          Set(40, 'bohr')),
+        ('repulsive_cutoff',        Set(40, 'bohr')),
+        ('ewald_real_cutoff',       Set(40, 'bohr')),
+        ('ewald_reciprocal_cutoff', Set(10)),
+        ('ewald_alpha',             Set(0.5)),
+        ('monkhorst_pack',          Set([2, 2, 2])),
+        ('symmetry_reduction',      Set(True)),
+        ('temperature',             Set(0, 'kelvin'))
+    ])
+
+    return {
+        'alpha_N2': (cif_parser_wrapper('../' + cubic.cubic_cifs['alpha-N2'].file), settings, sub_commands),
+        'primitive_potassium': (cif_parser_wrapper('../' + cubic.bcc_cifs['potassium'].file),
+                                collections.OrderedDict(settings, solver=Set('SCC')), sub_commands),
+        'primitive_anatase': (tetragonal.tio2_anatase(),
+                              collections.OrderedDict(settings, symmetry_reduction=Set(False)), sub_commands)
+    }
+
+
+def converge_cutoffs(tolerance=1.e-6):
+    """
+    Converge the h0, overlap, repulsive and dispersion cutoffs of the examples
+    above, rather than hardcoding 40 bohr. See cutoff_convergence.py
+    """
+    with ResultsStore() as store:
+        return cutoff_convergence.converge_materials(example_materials(), tolerance=tolerance, store=store)
+
+
+def converge_monkhorst_pack(tolerance=1.e-6):
+    """
+    Converge the Monkhorst-Pack grids of the examples above, rather than
+    choosing [2, 2, 2] for speed. See kpoint_convergence.py
+    """
+    with ResultsStore() as store:
+        return kpoint_convergence.converge_materials(example_materials(), tolerance=tolerance, store=store)
+
+
 print(primitive_anatase())
 
 
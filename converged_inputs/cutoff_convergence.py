@@ -0,0 +1,327 @@
+"""
+Automated convergence of the real-space cutoffs of periodic xTB:
+h0_cutoff, overlap_cutoff, repulsive_cutoff and dispersion_cutoff.
+
+Procedure:
+ 1. Reference: run all cutoffs jointly at the three largest values of a ladder
+    of cutoffs, and extrapolate to infinite cutoff. This replaces running with
+    excessively high cutoffs then increasing them by 50%.
+ 2. Independently, for each cutoff with the others at the top of the ladder:
+    probe a coarse set of ladder values concurrently, fit the error |E - E_ref|
+    against the cutoff, and extrapolate to the cutoff at which the error meets that
+    cutoff's share of the tolerance. The predicted cutoff and the one below it
+    are probed concurrently: if they bracket convergence, the search stops.
+    Otherwise the bracket is n-sectioned, as for the Ewald parameters.
+    All cutoffs are searched concurrently.
+ 3. Jointly: run all cutoffs at their independent values. Cutoffs are coupled
+    (errors can add or cancel), so while the joint error exceeds the tolerance,
+    the cutoff with the largest independent error is raised by one step.
+
+Extrapolation assumes a form for the tail of each cutoff's error, in cutoff_tails.
+Terms built from overlaps decay exponentially with distance, so the h0 and overlap
+errors are fit as exponentials (log error linear in the cutoff). Dispersion pairs
+decay as r^-6, so the error of the dispersion sum decays as a power of the cutoff
+(r^-3), which an exponential fit extrapolates far too optimistically. The repulsive
+cutoff is also fit as a power law, which is conservative if its tail is exponential.
+The joint reference is extrapolated with the slowest tail of the cutoffs converged.
+
+The tolerance is an energy per atom. Each cutoff gets an equal share of it in
+step 2, such that the joint error usually meets it without step 3 raising any.
+"""
+
+import collections
+import concurrent.futures
+import typing
+import numpy as np
+
+from src.sweep import point_energy
+from src.utils import Set
+from ewald_convergence.convergence import EnergyCache, n_section
+
+cutoff_keys = ('h0_cutoff', 'overlap_cutoff', 'repulsive_cutoff', 'dispersion_cutoff')
+# Ladder of cutoffs in bohr. The largest must be converged
+default_cutoffs = np.arange(10., 65., 5.)
+# Energy tolerance in Ha per atom
+default_tolerance = 1.e-6
+# Form of the error tail of each cutoff: 'exponential' or 'power'
+cutoff_tails = {'h0_cutoff': 'exponential',
+                'overlap_cutoff': 'exponential',
+                'repulsive_cutoff': 'power',
+                'dispersion_cutoff': 'power'}
+
+
+def cutoffs_key(cutoffs: dict) -> tuple:
+    return tuple(sorted(cutoffs.items()))
+
+
+def aitken_extrapolation(e1: float, e2: float, e3: float) -> float:
+    """
+    Limit of a geometrically-converging sequence from three terms at equally-spaced
+    cutoffs. Returns e3 if the differences do not decrease geometrically.
+    """
+    d1, d2 = e2 - e1, e3 - e2
+    if d1 == 0 or not 0 < d2 / d1 < 1:
+        return e3
+    return e3 - d2 * d2 / (d2 - d1)
+
+
+def power_law_extrapolation(cutoffs: np.ndarray, e1: float, e2: float, e3: float) -> float:
+    """
+    Limit of E(r) = E_inf + A r^-p from three terms at increasing cutoffs, with the
+    exponent p found by bisection. Returns e3 if the differences do not decrease,
+    or decrease more slowly than any power of the cutoff.
+    """
+    r1, r2, r3 = cutoffs
+    d1, d2 = e2 - e1, e3 - e2
+    if d1 == 0 or not 0 < d2 / d1 < 1:
+        return e3
+
+    def tail_ratio(p):
+        return (r3 ** -p - r2 ** -p) / (r2 ** -p - r1 ** -p)
+
+    # tail_ratio decreases from its p -> 0 (logarithmic) limit towards 0
+    if d2 / d1 >= np.log(r3 / r2) / np.log(r2 / r1):
+        return e3
+    low, high = 1.e-6, 1.
+    while tail_ratio(high) > d2 / d1:
+        low, high = high, 2. * high
+    for _ in range(100):
+        p = 0.5 * (low + high)
+        low, high = (p, high) if tail_ratio(p) > d2 / d1 else (low, p)
+    p = 0.5 * (low + high)
+    return e3 - d2 / (r3 ** -p - r2 ** -p) * r3 ** -p
+
+
+def extrapolate(cutoffs: np.ndarray, energies: np.ndarray, tail='exponential') -> float:
+    """
+    Limit at infinite cutoff from three energies at equally-spaced cutoffs,
+    for an error tail of 'exponential' or 'power' form
+    """
+    if tail == 'power':
+        return power_law_extrapolation(cutoffs, *energies)
+    return aitken_extrapolation(*energies)
+
+
+def predict_cutoff(cutoffs: np.ndarray, errors: np.ndarray, tolerance: float,
+                   tail='exponential') -> typing.Optional[float]:
+
+    """
+    Cutoff at which a decaying error reaches tolerance, from a least-squares fit of
+    log(error) against the cutoff (exponential tail) or against log(cutoff) (power tail)
+
+    Returns
+    -------
+    cutoff : float or None
+        None if fewer than two errors are finite and non-zero, or if the
+        errors do not decrease with cutoff
+    """
+
+    usable = np.isfinite(errors) & (errors > 0)
+    if np.count_nonzero(usable) < 2:
+        return None
+    x = np.log(cutoffs) if tail == 'power' else cutoffs
+    slope, intercept = np.polyfit(x[usable], np.log(errors[usable]), 1)
+    if slope >= 0:
+        return None
+    predicted = (np.log(tolerance) - intercept) / slope
+    return np.exp(predicted) if tail == 'power' else predicted
+
+
+def converge_cutoff(energies: EnergyCache, key: str, reference: dict, reference_energy: float,
+                    ladder=default_cutoffs, tolerance=default_tolerance, n_coarse=4, n_probes=4,
+                    tail='exponential') -> int:
+
+    """
+    Smallest ladder value of one cutoff for which the energy agrees with the
+    reference, with all other cutoffs at their reference values
+
+    Parameters
+    ----------
+    energies : EnergyCache
+    key : str
+        Cutoff to converge
+    reference : dict
+        Reference cutoffs, {key: value}
+    reference_energy : float
+        Energy at the reference cutoffs
+    ladder : np.ndarray, optional
+        Increasing cutoffs to choose from
+    tolerance : float, optional
+        Energy tolerance in Ha (total, not per atom)
+    n_coarse : int, optional
+        Number of ladder values probed concurrently before extrapolating
+    n_probes : int, optional
+        Number of concurrent probes per n-section round
+    tail : str, optional
+        Form of the error tail, 'exponential' or 'power'. See cutoff_tails
+
+    Returns
+    -------
+    index : int
+        Index of the converged cutoff in the ladder
+    """
+
+    def errors(indices):
+        return np.abs(energies([dict(reference, **{key: ladder[i]}) for i in indices]) - reference_energy)
+
+    def converged(indices):
+        return errors(indices) < tolerance
+
+    top = len(ladder) - 1
+    coarse = np.unique(np.linspace(0, top - 1, n_coarse).round().astype(int))
+    coarse_errors = errors(coarse)
+    is_converged = coarse_errors < tolerance
+    if is_converged[0]:
+        return 0
+
+    lower = coarse[~is_converged].max()
+    larger = coarse[is_converged & (coarse > lower)]
+    upper = larger.min() if larger.size else top
+
+    # Extrapolate to the predicted cutoff, and check it together with the step below
+    predicted = predict_cutoff(ladder[coarse], coarse_errors, tolerance, tail)
+    if predicted is not None and upper - lower > 1:
+        p = int(np.clip(np.searchsorted(ladder, predicted), lower + 1, upper - 1))
+        probes = np.array(sorted({p - 1, p} - {lower}))
+        probe_converged = converged(probes)
+        lower = probes[~probe_converged].max() if (~probe_converged).any() else lower
+        larger = probes[probe_converged & (probes > lower)]
+        upper = larger.min() if larger.size else upper
+
+    return int(n_section(converged, lower, upper, n_probes, resolution=1, integer=True))
+
+
+def converge_cutoffs(energy: typing.Callable[[dict], float],
+                     n_atoms: int,
+                     keys=cutoff_keys,
+                     ladder=default_cutoffs,
+                     tolerance=default_tolerance,
+                     n_coarse=4,
+                     n_probes=4,
+                     max_workers=None,
+                     tails=cutoff_tails) -> dict:
+
+    """
+    Find the cheapest set of cutoffs that meets an energy tolerance per atom.
+
+    Parameters
+    ----------
+    energy : callable
+        Total energy for a dictionary {cutoff key: value in bohr}. None, NaN or
+        zero signifies a failed run. Called concurrently from a thread pool.
+    n_atoms : int
+        Number of atoms in the cell
+    keys : tuple of str, optional
+        Cutoffs to converge
+    ladder : np.ndarray, optional
+        Increasing cutoffs to choose from, in bohr, with at least three values
+    tolerance : float, optional
+        Energy tolerance in Ha per atom
+    n_coarse : int, optional
+        Number of ladder values per cutoff probed before extrapolating
+    n_probes : int, optional
+        Number of concurrent probes per n-section round
+    max_workers : int, optional
+        Number of concurrent runs. Defaults to n_coarse per cutoff
+    tails : dict, optional
+        Form of the error tail of each cutoff, 'exponential' or 'power'.
+        Cutoffs missing from it are exponential
+
+    Returns
+    -------
+    converged : dict
+        'cutoffs': {key: value}, the converged 'energy' and 'energy_per_atom',
+        'extrapolated_energy' at infinite cutoffs, 'error_per_atom' relative to it,
+        and 'n_runs', the number of energy evaluations
+    """
+
+    ladder = np.asarray(ladder, dtype=float)
+    assert ladder.size >= 3, "Need at least three cutoffs to extrapolate"
+    total_tolerance = tolerance * n_atoms
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or n_coarse * len(keys)) as executor:
+        energies = EnergyCache(energy, executor, key=cutoffs_key)
+
+        joint = energies([{key: cutoff for key in keys} for cutoff in ladder[-3:]])
+        reference = {key: ladder[-1] for key in keys}
+        reference_energy = joint[-1]
+        slowest_tail = 'power' if any(tails.get(key) == 'power' for key in keys) else 'exponential'
+        extrapolated = extrapolate(ladder[-3:], joint, slowest_tail)
+        if abs(reference_energy - extrapolated) > total_tolerance:
+            print("Largest cutoff is not converged to within tolerance. Extend the ladder")
+
+        # Searches of each cutoff wait on their own probes, so run in their own threads
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(keys)) as searches:
+            futures = {key: searches.submit(converge_cutoff, energies, key, reference, reference_energy,
+                                            ladder, total_tolerance / len(keys), n_coarse, n_probes,
+                                            tails.get(key, 'exponential'))
+                       for key in keys}
+            indices = {key: future.result() for key, future in futures.items()}
+
+        def independent_error(key):
+            return abs(energies([dict(reference, **{key: ladder[indices[key]]})])[0] - reference_energy)
+
+        cutoffs = {key: ladder[i] for key, i in indices.items()}
+        final_energy = energies([cutoffs])[0]
+        while not abs(final_energy - reference_energy) < total_tolerance:
+            raisable = [key for key in keys if indices[key] < ladder.size - 1]
+            if not raisable:
+                break
+            key = max(raisable, key=independent_error)
+            indices[key] += 1
+            cutoffs = {key: ladder[i] for key, i in indices.items()}
+            final_energy = energies([cutoffs])[0]
+
+    return {'cutoffs': {key: float(cutoff) for key, cutoff in cutoffs.items()},
+            'energy': final_energy,
+            'energy_per_atom': final_energy / n_atoms,
+            'extrapolated_energy': extrapolated,
+            'error_per_atom': abs(final_energy - extrapolated) / n_atoms,
+            'n_runs': energies.n_runs}
+
+
+def converge_materials(materials: typing.Dict[str, tuple],
+                       keys=cutoff_keys,
+                       ladder=default_cutoffs,
+                       tolerance=default_tolerance,
+                       store=None,
+                       **kwargs) -> typing.Dict[str, dict]:
+
+    """
+    Converge the cutoffs of several materials concurrently, and print a table of the results
+
+    Parameters
+    ----------
+    materials : dict
+        Keys = names, used as named results. Values = (crystal, settings, sub_commands).
+        Cutoffs missing from settings are added in bohr
+    keys, ladder, tolerance : optional
+        See converge_cutoffs
+    store : results_store.ResultsStore, optional
+        If given, every run is recorded with sweep name '<name>_cutoffs'
+    **kwargs
+        Passed to converge_cutoffs
+
+    Returns
+    -------
+    results : dict
+        Keys = names, values = as returned by converge_cutoffs
+    """
+
+    def converge(name, crystal, settings, sub_commands):
+        settings = collections.OrderedDict(settings)
+        for key in keys:
+            settings.setdefault(key, Set(float(ladder[-1]), 'bohr'))
+        energy = point_energy(crystal, settings, name + '_cutoffs', sub_commands, store=store)
+        return converge_cutoffs(energy, crystal['n_atoms'], keys, ladder, tolerance, **kwargs)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(materials)) as executor:
+        futures = {name: executor.submit(converge, name, *material) for name, material in materials.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    print('material'.ljust(20) + ''.join(key.ljust(20) for key in keys) + 'error/atom (Ha)'.ljust(18) + 'runs')
+    for name, result in results.items():
+        print(name.ljust(20) + ''.join('{:<20.1f}'.format(result['cutoffs'][key]) for key in keys) +
+              '{:<18.1e}'.format(result['error_per_atom']) + str(result['n_runs']))
+
+    return results
@@ -0,0 +1,251 @@
+"""
+Automated convergence of the Monkhorst-Pack grid.
+
+The cost of a periodic xTB calculation grows with the number of irreducible
+k-points, not with the size of the grid. This is predicted locally for each
+candidate grid from the crystal's symmetry, using spglib, so candidates are
+run in order of cost, and grids that are more expensive than a denser grid
+are never run.
+
+Candidate grids have a uniform k-point spacing along every reciprocal lattice
+vector. Grids are run in order of cost, and the search stops as soon as the
+energy per atom of a grid agrees with that of the previous grid.
+
+Monkhorst-Pack grids with an even number of points along a direction are
+offset by half a grid step from Gamma, and odd grids contain Gamma.
+"""
+
+import concurrent.futures
+import time
+import typing
+import numpy as np
+import spglib
+
+from src import lattice_vectors
+from src.pymatgen_wrappers import default_symprec
+from src.sweep import point_energy
+from src.lattice_vectors import get_bravais
+
+# Energy tolerance in Ha per atom
+default_tolerance = 1.e-6
+# Upper bound on the number of k-points of a candidate grid
+default_max_k_points = 20 ** 3
+
+
+def crystal_lattice(crystal: dict) -> np.ndarray:
+    """ Lattice vectors of a crystal as columns, in the unit of its lattice constants """
+    return lattice_vectors.lattice_vectors_from_parameters(get_bravais(crystal), crystal['lattice_parameters'])
+
+
+def spglib_cell(crystal: dict) -> tuple:
+    """ (lattice, fractional positions, atomic types) of a crystal, as spglib expects """
+    lattice = crystal_lattice(crystal)
+    if 'fractional' in crystal:
+        fractional = np.asarray(crystal['fractional'], dtype=float)
+    else:
+        fractional = np.linalg.solve(lattice, np.asarray(crystal['xyz'], dtype=float).T).T
+    # spglib only needs species to be distinguishable
+    types = np.unique(crystal['species'], return_inverse=True)[1]
+    return lattice.T, fractional, types
+
+
+def monkhorst_pack_shift(mesh) -> list:
+    """ Half-step offsets of a Monkhorst-Pack grid, in spglib's convention """
+    return [int(n % 2 == 0) for n in mesh]
+
+
+def irreducible_k_points(crystal: dict, mesh, symmetry_reduction=True, time_reversal=True,
+                         symprec=default_symprec) -> int:
+
+    """
+    Number of k-points of a Monkhorst-Pack grid that qcore computes
+
+    Parameters
+    ----------
+    crystal : dict
+        Crystal data
+    mesh : list of int
+        Monkhorst-Pack grid
+    symmetry_reduction : bool, optional
+        If False, every k-point of the grid is computed
+    time_reversal : bool, optional
+        Reduce k and -k to one k-point
+    symprec : float, optional
+        Distance tolerance for spglib symmetry detection, in the unit of the lattice constants
+
+    Returns
+    -------
+    n_k_points : int
+    """
+
+    if not symmetry_reduction:
+        return int(np.prod(mesh))
+    mapping, _ = spglib.get_ir_reciprocal_mesh(mesh, spglib_cell(crystal), is_shift=monkhorst_pack_shift(mesh),
+                                               is_time_reversal=time_reversal, symprec=symprec)
+    return int(np.unique(mapping).size)
+
+
+def candidate_grids(crystal: dict, max_k_points=default_max_k_points) -> typing.List[list]:
+
+    """
+    Monkhorst-Pack grids with a uniform k-point spacing, from Gamma only up to
+    max_k_points, in order of increasing density
+
+    The number of points along each reciprocal lattice vector b_i is
+    ceil(|b_i| / spacing), for decreasing spacing.
+    """
+
+    lengths = reciprocal_lengths(crystal)
+    grids = []
+    # Each grid is reached when one of its points crosses an integer
+    for spacing in sorted({lengths[i] / n for i in range(3) for n in range(1, 101)}, reverse=True):
+        mesh = [int(n) for n in np.ceil(lengths / spacing - 1.e-8)]
+        if np.prod(mesh) > max_k_points:
+            break
+        if not grids or mesh != grids[-1]:
+            grids.append(mesh)
+    return grids
+
+
+def reciprocal_lengths(crystal: dict) -> np.ndarray:
+    """ Lengths of the reciprocal lattice vectors, in inverse units of the lattice constants """
+    return np.linalg.norm(lattice_vectors.reciprocal_lattice_vectors(crystal_lattice(crystal)), axis=0)
+
+
+def order_by_cost(crystal: dict, grids: typing.List[list], **kwargs) -> typing.List[typing.Tuple[list, int]]:
+
+    """
+    Grids and their number of irreducible k-points, cheapest first
+
+    Grids that are no denser than a cheaper grid are dropped, where density is
+    that of the coarsest direction, min(n_i / |b_i|). For example, the 7x7x7
+    grid of an fcc crystal has fewer irreducible k-points than 6x6x6. The
+    remaining grids increase in both cost and density.
+
+    kwargs are passed to irreducible_k_points.
+    """
+
+    lengths = reciprocal_lengths(crystal)
+    costs = [(mesh, irreducible_k_points(crystal, mesh, **kwargs), np.min(np.asarray(mesh) / lengths))
+             for mesh in grids]
+    ordered = []
+    for mesh, n_k_points, density in sorted(costs, key=lambda cost: (cost[1], -cost[2])):
+        if not ordered or density > ordered[-1][2] * (1. + 1.e-8):
+            ordered.append((mesh, n_k_points, density))
+    return [(mesh, n_k_points) for mesh, n_k_points, _ in ordered]
+
+
+def converge_k_points(energy: typing.Callable[[dict], float],
+                      crystal: dict,
+                      grids=None,
+                      tolerance=default_tolerance,
+                      symmetry_reduction=True,
+                      n_concurrent=1,
+                      max_k_points=default_max_k_points) -> dict:
+
+    """
+    Find the cheapest Monkhorst-Pack grid for which the energy per atom is converged.
+
+    Parameters
+    ----------
+    energy : callable
+        Total energy for a point {'monkhorst_pack': [n1, n2, n3]}. None, NaN or
+        zero signifies a failed run. Called concurrently if n_concurrent > 1
+    crystal : dict
+        Crystal data
+    grids : list of list of int, optional
+        Candidate grids. Defaults to candidate_grids(crystal, max_k_points)
+    tolerance : float, optional
+        Tolerance on the difference in energy per atom between successive grids, in Ha
+    symmetry_reduction : bool, optional
+        Whether qcore reduces the grid by symmetry. Determines the cost of each grid
+    n_concurrent : int, optional
+        Number of grids run at once. Grids beyond the converged one may be run
+    max_k_points : int, optional
+        Largest grid considered, if grids is not given
+
+    Returns
+    -------
+    converged : dict
+        'monkhorst_pack', its 'n_k_points' and 'energy_per_atom', None if no two
+        successive grids agreed, and 'runs': a list with the 'monkhorst_pack',
+        'n_k_points', 'energy_per_atom' and 'wall_time' of every grid run
+    """
+
+    if grids is None:
+        grids = candidate_grids(crystal, max_k_points)
+    candidates = order_by_cost(crystal, grids, symmetry_reduction=symmetry_reduction)
+
+    def run(mesh):
+        start = time.perf_counter()
+        total_energy = energy({'monkhorst_pack': mesh})
+        wall_time = time.perf_counter() - start
+        failed = total_energy is None or total_energy == 0 or np.isnan(total_energy)
+        return (np.nan if failed else total_energy / crystal['n_atoms']), wall_time
+
+    runs = []
+    converged = {'monkhorst_pack': None, 'n_k_points': None, 'energy_per_atom': None}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_concurrent) as executor:
+        for start in range(0, len(candidates), n_concurrent):
+            batch = candidates[start:start + n_concurrent]
+            results = executor.map(run, [mesh for mesh, _ in batch])
+            for (mesh, n_k_points), (energy_per_atom, wall_time) in zip(batch, results):
+                runs.append({'monkhorst_pack': mesh, 'n_k_points': n_k_points,
+                             'energy_per_atom': energy_per_atom, 'wall_time': wall_time})
+            # Earliest pair of successive grids that agree
+            for previous, run_result in zip(runs[:-1], runs[1:]):
+                if abs(run_result['energy_per_atom'] - previous['energy_per_atom']) < tolerance:
+                    converged = {key: previous[key] for key in converged}
+                    break
+            if converged['monkhorst_pack'] is not None:
+                break
+
+    converged['runs'] = runs
+    return converged
+
+
+def print_runs(name: str, converged: dict) -> None:
+    """ Table of the grids run, with irreducible k-point counts and wall times """
+    print(name, 'converged grid:', converged['monkhorst_pack'])
+    print('monkhorst_pack'.ljust(16) + 'k-points'.ljust(10) + 'E/atom (Ha)'.ljust(18) + 'wall time (s)')
+    for run in converged['runs']:
+        print(str(run['monkhorst_pack']).ljust(16) + str(run['n_k_points']).ljust(10) +
+              '{:<18.9f}{:.2f}'.format(run['energy_per_atom'], run['wall_time']))
+
+
+def converge_materials(materials: typing.Dict[str, tuple], tolerance=default_tolerance, store=None,
+                       **kwargs) -> typing.Dict[str, dict]:
+
+    """
+    Converge the Monkhorst-Pack grids of several materials concurrently, and print the grids run
+
+    Parameters
+    ----------
+    materials : dict
+        Keys = names, used as named results. Values = (crystal, settings, sub_commands)
+    tolerance : float, optional
+        Energy tolerance in Ha per atom
+    store : results_store.ResultsStore, optional
+        If given, every run is recorded with sweep name '<name>_k_points'
+    **kwargs
+        Passed to converge_k_points. symmetry_reduction defaults to the settings of each material
+
+    Returns
+    -------
+    results : dict
+        Keys = names, values = as returned by converge_k_points
+    """
+
+    def converge(name, crystal, settings, sub_commands):
+        symmetry_reduction = settings['symmetry_reduction'].value if 'symmetry_reduction' in settings else True
+        energy = point_energy(crystal, settings, name + '_k_points', sub_commands, store=store)
+        return converge_k_points(energy, crystal, tolerance=tolerance,
+                                 **dict({'symmetry_reduction': symmetry_reduction}, **kwargs))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(materials)) as executor:
+        futures = {name: executor.submit(converge, name, *material) for name, material in materials.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, converged in results.items():
+        print_runs(name, converged)
+    return results
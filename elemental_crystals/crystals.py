@@ -0,0 +1,97 @@
+"""
+Get the CIF file of every elemental crystal and perform a QCore calc.
+
+API Homepage:
+https://materialsproject.org/infrastructure
+
+API Examples:
+https://gist.github.com/search?q=pymatgen+materials+api
+"""
+
+from pymatgen.core.structure import Structure
+
+from src.pymatgen_wrappers import structure_parser_wrapper
+from elemental_crystals.parameters import an_to_symbol
+from elemental_crystals import mirror
+
+
+# Queries are answered from a local mirror of the Materials Project.
+# Create it once, with the API and MAPI_KEY, using mirror.export().
+# Run from this folder:  cd elemental_crystals && PYTHONPATH=.. python crystals.py
+def elemental_crystals(mirror_file=mirror.default_mirror) -> dict:
+    """
+    Lowest-energy crystal of every element in an_to_symbol, from the local mirror
+    :param mirror_file: Materials Project mirror, see mirror.export
+    :return: dict of symbol: crystal dictionary, or None if the mirror has no crystal of that element
+    """
+    with mirror.LocalMPRester(mirror=mirror_file) as mat_project:
+        documents = mirror.ground_states(mat_project, an_to_symbol.values())
+    crystals = {}
+    for symbol, document in documents.items():
+        if document is None:
+            crystals[symbol] = None
+            continue
+        structure = Structure.from_str(document['cif'], fmt='cif')
+        crystals[symbol] = structure_parser_wrapper(structure, is_primitive_cell=True, fractional=True,
+                                                    remove_unused_parameters=True)
+    return crystals
+
+
+if __name__ == '__main__':
+    crystals = elemental_crystals()
+    print(crystals['K'])
+    print(sum(crystal is not None for crystal in crystals.values()), 'of', len(crystals), 'elements in the mirror')
+
+
+# def get_structure_from_mp(API_KEY: str, formula: str,
+#                           is_primitive_cell=True,
+#                           fractional=True,
+#                           remove_unused_parameters=True):
+#     """
+#
+#     materials_string = 'Cd-Se' for CdSe
+#     Database syntax is MongoDB
+#
+#     See these great refs for scraping cifs from the database:
+#     https://matsci.org/t/downloading-all-piezoelectric-materials/71/2
+#     https://github.com/dwinston/mpbinder/blob/754f29537d417c7b67d6ee53ed630a2787b7149d/get_zintl_cifs.ipynb
+#     """
+#
+#     # Convert formula to required material string i.e. CdSe to Cd-Se
+#     material_string = formula[0]
+#     for letter in formula[1:]:
+#         if letter.isupper():
+#             material_string += '-'
+#         material_string += letter
+#
+#     mpr = MPRester(API_KEY)
+#     docs = mpr.query({'chemsys': {'$in': [material_string]}}, ['material_id', 'pretty_formula', 'cif'])
+#     print(len(docs))
+#     cif_string = docs[0]['cif']
+#
+#     wrapper = io.TextIOWrapper(
+#         io.BytesIO(),
+#         encoding='cp1252',
+#         line_buffering=True,
+#     )
+#     wrapper.write(cif_string)
+#     parser = pymatgen.io.cif.CifParser(wrapper)
+#
+#     # parser = pymatgen.io.cif.CifParser()
+#     # parser.from_string(cif_string)
+#
+#     print(parser.get_structures())
+#     #structure = parser.get_structures(primitive=True)[0]
+#     #print(structure)
+
+# get_structure_from_mp(API_KEY, 'CdSe')
+
+# for atomic_number in range(1, n_elements + 1):
+#     with MPRester(API_KEY) as mat_project:
+#         #an_to_symbol[atomic_number]
+#         symbol = 'CdSe'
+#         data = mat_project.get_task_data(symbol)[0]
+#         print(data)
+#         #print(mat_project.get_structures(symbol, final=False)[0])
+#         mp_structure = mat_project.get_entries(symbol, conventional_unit_cell=False)[0]
+#         print(mp_structure)
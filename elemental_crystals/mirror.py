@@ -0,0 +1,387 @@
+"""
+Offline mirror of the Materials Project.
+
+ 1. export() downloads summary documents in bulk, with one paged query of the
+    current Materials Project API, and converts them to the legacy
+    supported_properties fields. This is the only step that needs the API and
+    an API key, and the only one that creates or modifies the mirror file.
+ 2. MaterialsMirror stores the documents in a local SQLite file, keyed by
+    material_id. Mirrors are opened read-only unless writable.
+ 3. LocalMPRester answers the queries of the legacy MPRester API from the
+    mirror: query(criteria, properties) with MongoDB-style criteria, and
+    get_structures and get_entries. serve() answers the same query over
+    HTTP, at the legacy /rest/v2/query endpoint, for clients that cannot
+    call LocalMPRester directly.
+
+Structures are parsed from the 'cif' field, which holds the relaxed
+structure: there is no separate initial structure in the mirror.
+"""
+
+import collections
+import http.server
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import typing
+import urllib.parse
+
+from pymatgen.core.structure import Structure
+from pymatgen.entries.computed_entries import ComputedEntry, ComputedStructureEntry
+from pymatgen.io.cif import CifWriter
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+from elemental_crystals.parameters import supported_properties, set_api_key
+
+default_mirror = 'materials_project.sqlite'
+
+
+class MaterialsMirror:
+    """
+    Local store of Materials Project documents, keyed by material_id.
+    Opened read-only unless writable, in which case the file is created if missing
+    """
+
+    def __init__(self, file_name=default_mirror, writable=False) -> None:
+        self.file_name = file_name
+        if writable:
+            connection = sqlite3.connect(file_name, check_same_thread=False)
+        elif os.path.isfile(file_name):
+            connection = sqlite3.connect(pathlib.Path(os.path.abspath(file_name)).as_uri() + '?mode=ro',
+                                         uri=True, check_same_thread=False)
+        else:
+            raise FileNotFoundError("No Materials Project mirror at '" + file_name + "'. "
+                                    "Create it once with mirror.export(), which requires MAPI_KEY")
+        # Connections are only used under the lock, so may be shared between threads
+        self._connection = connection
+        self._lock = threading.Lock()
+        self._documents = None
+        if writable:
+            with self._lock, self._connection:
+                self._connection.execute("CREATE TABLE IF NOT EXISTS materials "
+                                         "(material_id TEXT PRIMARY KEY, document TEXT NOT NULL)")
+
+    def insert(self, documents: typing.Iterable[dict]) -> int:
+        """ Insert or replace documents, which must have a material_id. Returns the number inserted """
+        rows = [(document['material_id'], json.dumps(document)) for document in documents]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO materials VALUES (?, ?)", rows)
+            self._documents = None
+        return len(rows)
+
+    def documents(self) -> typing.List[dict]:
+        """ All documents, read from the file once and then held in memory """
+        with self._lock:
+            if self._documents is None:
+                rows = self._connection.execute("SELECT document FROM materials ORDER BY material_id")
+                self._documents = [json.loads(row[0]) for row in rows]
+            return self._documents
+
+    def __getitem__(self, material_id: str) -> dict:
+        with self._lock:
+            row = self._connection.execute("SELECT document FROM materials WHERE material_id = ?",
+                                           (material_id,)).fetchone()
+        if row is None:
+            raise KeyError(material_id)
+        return json.loads(row[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM materials").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+# Fields of the summary documents of the current Materials Project API, from which
+# the legacy supported_properties fields are derived
+summary_fields = ('material_id', 'formula_pretty', 'nsites', 'elements', 'nelements', 'volume', 'density',
+                  'energy_per_atom', 'formation_energy_per_atom', 'energy_above_hull', 'band_gap',
+                  'total_magnetization', 'symmetry', 'structure')
+
+
+def legacy_document(summary: dict) -> dict:
+
+    """
+    Document with the legacy supported_properties fields, from a summary document
+    of the current Materials Project API
+
+    Parameters
+    ----------
+    summary : dict
+        Summary document with the summary_fields. The structure may be a
+        Structure, or its dictionary
+
+    Returns
+    -------
+    document : dict
+        Fields without a summary counterpart, such as hubbards and
+        icsd_ids, are None. The cif is written from the structure
+    """
+
+    structure = summary['structure']
+    if not isinstance(structure, Structure):
+        structure = Structure.from_dict(structure)
+    symmetry = summary.get('symmetry') or {}
+
+    document = {key: None for key in supported_properties}
+    document.update({'material_id': str(summary['material_id']),
+                     'energy': summary['energy_per_atom'] * len(structure),
+                     'energy_per_atom': summary['energy_per_atom'],
+                     'volume': summary.get('volume', structure.volume),
+                     'formation_energy_per_atom': summary.get('formation_energy_per_atom'),
+                     'nsites': len(structure),
+                     'unit_cell_formula': structure.composition.as_dict(),
+                     'pretty_formula': summary.get('formula_pretty', structure.composition.reduced_formula),
+                     'elements': sorted(str(element) for element in summary.get('elements',
+                                                                                structure.composition.elements)),
+                     'nelements': summary.get('nelements', len(structure.composition.elements)),
+                     'e_above_hull': summary.get('energy_above_hull'),
+                     'spacegroup': {'number': symmetry.get('number'), 'symbol': symmetry.get('symbol'),
+                                    'crystal_system': str(symmetry['crystal_system']).lower()
+                                    if symmetry.get('crystal_system') is not None else None},
+                     'band_gap': summary.get('band_gap'),
+                     'density': summary.get('density'),
+                     'total_magnetization': summary.get('total_magnetization'),
+                     'cif': str(CifWriter(structure))})
+    return document
+
+
+def export(file_name=default_mirror, api_key=None, criteria=None) -> int:
+
+    """
+    Download summary documents from the Materials Project into a local mirror
+
+    The legacy MPRester.query(criteria, properties, chunk_size=, mp_decode=)
+    is not part of the installed pymatgen, whose pymatgen.ext.matproj.MPRester
+    queries the current API. Documents are requested from its summary
+    endpoint, with the summary_fields, and converted with legacy_document.
+
+    Parameters
+    ----------
+    file_name : str, optional
+        Mirror file, created if missing. Existing documents with the same
+        material_id are replaced
+    api_key : str, optional
+        Key of the current API. Defaults to the MAPI_KEY environment variable
+    criteria : dict, optional
+        Filters of the summary endpoint. Defaults to every elemental crystal,
+        {'nelements_min': 1, 'nelements_max': 1}
+
+    Returns
+    -------
+    n_documents : int
+    """
+
+    # Only exporting needs the API
+    from pymatgen.ext.matproj import MPRester
+
+    if criteria is None:
+        criteria = {'nelements_min': 1, 'nelements_max': 1}
+    with MPRester(api_key or set_api_key()) as mat_project:
+        summaries = mat_project.get_summary(criteria, fields=list(summary_fields))
+    mirror = MaterialsMirror(file_name, writable=True)
+    n_documents = mirror.insert(legacy_document(summary) for summary in summaries)
+    mirror.close()
+    return n_documents
+
+
+def _field(document: dict, key: str) -> typing.Any:
+    """ Value of a dotted key, i.e. 'spacegroup.number'. chemsys is derived from elements """
+    if key == 'chemsys' and 'chemsys' not in document:
+        return '-'.join(sorted(document.get('elements', [])))
+    value = document
+    for part in key.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _equal(value, target) -> bool:
+    """ MongoDB equality: a list field matches if it is equal to, or contains, the target """
+    return value == target or (isinstance(value, list) and target in value)
+
+
+def _condition(value, condition) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return _equal(value, condition)
+    for operator, target in condition.items():
+        if operator == '$in':
+            satisfied = any(_equal(value, t) for t in target)
+        elif operator == '$nin':
+            satisfied = not any(_equal(value, t) for t in target)
+        elif operator == '$all':
+            satisfied = isinstance(value, list) and all(t in value for t in target)
+        elif operator == '$ne':
+            satisfied = not _equal(value, target)
+        elif operator == '$exists':
+            satisfied = (value is not None) == bool(target)
+        elif operator == '$size':
+            satisfied = isinstance(value, list) and len(value) == target
+        elif operator in ('$gt', '$gte', '$lt', '$lte'):
+            satisfied = value is not None and {'$gt': value > target, '$gte': value >= target,
+                                               '$lt': value < target, '$lte': value <= target}[operator]
+        else:
+            raise ValueError("Unsupported query operator " + operator)
+        if not satisfied:
+            return False
+    return True
+
+
+def matches(document: dict, criteria: dict) -> bool:
+    """ Whether a document satisfies MongoDB-style criteria, as accepted by MPRester.query """
+    for key, condition in criteria.items():
+        if key == '$and':
+            satisfied = all(matches(document, c) for c in condition)
+        elif key == '$or':
+            satisfied = any(matches(document, c) for c in condition)
+        else:
+            satisfied = _condition(_field(document, key), condition)
+        if not satisfied:
+            return False
+    return True
+
+
+def parse_criteria(criteria: typing.Union[str, dict]) -> dict:
+    """ Criteria from a material_id ('mp-149'), chemical system ('Cd-Se') or formula ('K'), as MPRester accepts """
+    if isinstance(criteria, dict):
+        return criteria
+    if criteria.startswith('mp-') or criteria.startswith('mvc-'):
+        return {'material_id': criteria}
+    if '-' in criteria:
+        return {'chemsys': '-'.join(sorted(criteria.split('-')))}
+    return {'pretty_formula': criteria}
+
+
+def _e_above_hull(document: dict) -> float:
+    """ Sort key of documents by e_above_hull. Documents without one sort last """
+    return document['e_above_hull'] if document['e_above_hull'] is not None else float('inf')
+
+
+class LocalMPRester:
+    """
+    Stand-in for the legacy MPRester, answering queries from a MaterialsMirror.
+    The API key is accepted, and ignored, such that callers need not change.
+    """
+
+    def __init__(self, api_key=None, mirror=default_mirror) -> None:
+        self.mirror = mirror if isinstance(mirror, MaterialsMirror) else MaterialsMirror(mirror)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    def query(self, criteria: typing.Union[str, dict], properties: typing.Sequence[str], chunk_size=None,
+              mp_decode=True) -> typing.List[dict]:
+        """ Documents matching criteria, with only the requested properties. chunk_size and mp_decode are ignored """
+        criteria = parse_criteria(criteria)
+        return [{key: _field(document, key) for key in properties}
+                for document in self.mirror.documents() if matches(document, criteria)]
+
+    def get_structures(self, chemsys_formula_id: str) -> typing.List[Structure]:
+        """ Structures of the matching materials, from their cifs """
+        return [Structure.from_str(document['cif'], fmt='cif')
+                for document in self.query(chemsys_formula_id, ['cif'])]
+
+    def get_entries(self, chemsys_formula_id_criteria: typing.Union[str, dict], inc_structure=None,
+                    conventional_unit_cell=False, sort_by_e_above_hull=False) -> list:
+
+        """
+        Computed entries of the matching materials, with entry_id = material_id
+
+        Entries are ComputedStructureEntry if inc_structure is given, with the
+        structure from the cif, or its conventional standard cell.
+        """
+
+        documents = self.query(chemsys_formula_id_criteria,
+                               ['material_id', 'energy', 'unit_cell_formula', 'e_above_hull', 'cif'])
+        if sort_by_e_above_hull:
+            documents.sort(key=_e_above_hull)
+        entries = []
+        for document in documents:
+            if inc_structure:
+                structure = Structure.from_str(document['cif'], fmt='cif')
+                if conventional_unit_cell:
+                    structure = SpacegroupAnalyzer(structure).get_conventional_standard_structure()
+                    # Energy is extensive: scale to the conventional cell
+                    energy = document['energy'] * len(structure) / sum(document['unit_cell_formula'].values())
+                else:
+                    energy = document['energy']
+                entries.append(ComputedStructureEntry(structure, energy, entry_id=document['material_id']))
+            else:
+                entries.append(ComputedEntry(document['unit_cell_formula'], document['energy'],
+                                             entry_id=document['material_id']))
+        return entries
+
+
+def ground_states(rester: LocalMPRester, symbols: typing.Iterable[str]) -> typing.Dict[str, typing.Optional[dict]]:
+    """
+    Lowest-energy elemental crystal of each symbol, by e_above_hull, in one pass over the mirror
+
+    Returns
+    -------
+    documents : dict
+        Keys = symbols, values = documents with the supported_properties fields, or None
+        if the mirror has no crystal of that element
+    """
+    by_element = collections.defaultdict(list)
+    for document in rester.query({'nelements': 1}, supported_properties):
+        by_element[document['elements'][0]].append(document)
+    return {symbol: min(by_element[symbol], key=_e_above_hull, default=None) for symbol in symbols}
+
+
+class _QueryHandler(http.server.BaseHTTPRequestHandler):
+    """ Legacy Materials API query endpoint: criteria and properties as JSON, in a form or the URL """
+
+    rester = None
+
+    def _respond(self, parameters: dict) -> None:
+        if not self.path.split('?')[0].rstrip('/').endswith('/query'):
+            self.send_error(404)
+            return
+        try:
+            criteria = json.loads(parameters['criteria'][0])
+            properties = json.loads(parameters['properties'][0])
+            body = {'valid_response': True, 'response': self.rester.query(criteria, properties)}
+        except (KeyError, ValueError) as error:
+            body = {'valid_response': False, 'error': str(error)}
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._respond(urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._respond(urllib.parse.parse_qs(self.rfile.read(length).decode()))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(mirror=default_mirror, port=0) -> typing.Tuple[http.server.ThreadingHTTPServer, str]:
+
+    """
+    Serve the legacy query API from a mirror, on localhost, in a background thread
+
+    Returns
+    -------
+    server : http.server.ThreadingHTTPServer
+        Call server.shutdown() to stop
+    endpoint : str
+        Base URL of the query endpoint, endpoint + '/query'
+    """
+
+    handler = type('QueryHandler', (_QueryHandler,), {'rester': LocalMPRester(mirror=mirror)})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:' + str(server.server_address[1]) + '/rest/v2'
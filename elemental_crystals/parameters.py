@@ -22,7 +22,7 @@ an_to_symbol = {1: 'H', 2: 'He', 3: 'Li', 4: 'Be', 5: 'B', 6: 'C', 7: 'N', 8: 'O
 # Materials API key should be user-specific and not shared
 # hence get from the env
 def set_api_key():
-    API_KEY = os.environ["MAPI_KEY"]
+    API_KEY = os.environ.get("MAPI_KEY")
     if API_KEY is None:
         print("Each user needs to define their own API key as an env variable")
         quit("env variable 'MAPI_KEY' not found")
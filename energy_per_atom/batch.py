@@ -0,0 +1,283 @@
+"""
+Compare the energy per atom of primitive and conventional cells, for every
+crystal in crystal_system with both a primitive and a conventional cif.
+
+Catalogue: each dictionary conventional_<lattice>_cifs of a crystal_system
+module is paired with <lattice>_cifs, by crystal name.
+
+Cells: lattice constants of primitive cifs are those of the primitive lattice
+vectors, whereas qcore expects the conventional constants for centred
+lattices (see pymatgen_wrappers.check_lattice_parameters). The primitive
+cell is therefore reduced from the conventional cell, using qcore's lattice
+vectors, such that both cells describe exactly the same crystal. The
+primitive cif gives the bravais lattice and the expected number of atoms.
+
+k-points: with conventional lattice vectors C = P M, for primitive lattice
+vectors P and an integer matrix M, k-points in fractional coordinates of the
+two reciprocal lattices are related by k_c = M^T k_p. The conventional grid
+is chosen to sample exactly the k-points of the primitive grid if one does,
+else to have the same k-point spacing. Only exact grids isolate errors that
+are not from k-point sampling, so only crystals with exact grids pass or
+fail. No diagonal grids are exact for fcc and bcc, whose discrepancies are
+reported, but not compared to the tolerance.
+
+Run from this folder, as cif paths are relative to it:
+
+    cd energy_per_atom && PYTHONPATH=.. python batch.py
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import typing
+import numpy as np
+
+from crystal_system import cubic, tetragonal, hexagonal, orthorhombic, monoclinic, trigonal, triclinic
+from src import lattice_vectors
+from src.space_groups import conventional_bravais
+from src import qcore_input_strings as qcore_input
+from src.run_qcore import run_qcore
+from src.pymatgen_wrappers import cif_parser_wrapper
+from src.xtb_potential import xtb_potential_str, PotentialType
+from src.utils import Set
+from converged_inputs.kpoint_convergence import crystal_lattice, reciprocal_lengths
+
+crystal_system_modules = (cubic, tetragonal, hexagonal, orthorhombic, monoclinic, trigonal, triclinic)
+
+# Energy tolerance in Ha per atom
+default_tolerance = 1.e-6
+default_monkhorst_pack = [4, 4, 4]
+
+
+def catalogue(modules=crystal_system_modules) -> typing.Dict[str, tuple]:
+    """
+    Crystals with both a primitive and a conventional cif, whose files exist
+
+    Returns
+    -------
+    crystals : dict
+        Keys = crystal names. Values = (primitive FileUrl, conventional FileUrl)
+    """
+    crystals = {}
+    for module in modules:
+        for attribute, conventional_cifs in vars(module).items():
+            if not (attribute.startswith('conventional_') and attribute.endswith('_cifs')):
+                continue
+            primitive_cifs = getattr(module, attribute[len('conventional_'):], {})
+            for name in sorted(set(primitive_cifs) & set(conventional_cifs)):
+                files = (primitive_cifs[name], conventional_cifs[name])
+                missing = [file.file for file in files if not os.path.isfile('../' + file.file)]
+                if missing:
+                    print('Skipping', name + ', missing', ', '.join(missing))
+                    continue
+                crystals[name] = files
+    return crystals
+
+
+def primitive_crystal(conventional: dict, bravais: str) -> dict:
+
+    """
+    Primitive cell of a conventional cell, with qcore's lattice vectors for bravais
+
+    Parameters
+    ----------
+    conventional : dict
+        Conventional cell, with fractional positions
+    bravais : str
+        Bravais lattice of the primitive cell, for example 'fcc'
+
+    Returns
+    -------
+    crystal : dict
+        Shares the conventional lattice parameters, with fractional positions in [0, 1)
+    """
+
+    transformation = transformation_matrix(conventional, bravais)
+    n_cells = int(round(abs(np.linalg.det(transformation))))
+    # Fractional positions in the primitive cell: x_p = M x_c, wrapped into the cell
+    fractional = np.asarray(conventional['fractional'], dtype=float) @ transformation.T
+    fractional = np.round(np.mod(fractional, 1.), 8) % 1.
+    _, unique = np.unique(np.column_stack((fractional, np.unique(conventional['species'], return_inverse=True)[1])),
+                          axis=0, return_index=True)
+    unique = np.sort(unique)
+    assert unique.size * n_cells == conventional['n_atoms'], \
+        "Conventional cell does not reduce to " + bravais + " primitive cell"
+
+    return dict(conventional,
+                fractional=fractional[unique].tolist(),
+                species=[conventional['species'][i] for i in unique],
+                bravais=bravais,
+                n_atoms=int(unique.size))
+
+
+def transformation_matrix(conventional: dict, bravais: str) -> np.ndarray:
+    """ Integer matrix M with conventional lattice vectors C = P M, for qcore's primitive lattice vectors P """
+    primitive_lattice = lattice_vectors.lattice_vectors_from_parameters(bravais, conventional['lattice_parameters'])
+    transformation = np.linalg.solve(primitive_lattice, crystal_lattice(conventional))
+    assert np.allclose(transformation, np.round(transformation), atol=1.e-6), \
+        "Conventional lattice vectors are not integer combinations of " + bravais + " lattice vectors"
+    return np.round(transformation)
+
+
+def monkhorst_pack_points(mesh: typing.Sequence[int]) -> np.ndarray:
+    """ k-points of a Monkhorst-Pack grid in fractional coordinates, in [0, 1) """
+    axes = [(2. * np.arange(1, m + 1) - m - 1) / (2. * m) for m in mesh]
+    return np.mod(np.array(list(itertools.product(*axes))), 1.)
+
+
+def _point_set(points: np.ndarray) -> set:
+    return set(map(tuple, np.round(np.mod(np.round(points, 8), 1.), 8)))
+
+
+def samples_same_k_points(primitive_mesh: typing.Sequence[int], conventional_mesh: typing.Sequence[int],
+                          transformation: np.ndarray) -> bool:
+    """ Whether a conventional grid, folded into the primitive cell's Brillouin zone, gives the primitive grid """
+    n_cells = int(round(abs(np.linalg.det(transformation))))
+    if np.prod(conventional_mesh) * n_cells != np.prod(primitive_mesh):
+        return False
+    # Reciprocal lattice vectors of the conventional cell, modulo those of the primitive cell
+    shifts = np.array(list(itertools.product(range(n_cells), repeat=3)), dtype=float)
+    points = (monkhorst_pack_points(conventional_mesh)[:, None, :] + shifts[None, :, :]).reshape(-1, 3)
+    folded = np.linalg.solve(transformation.T, points.T).T
+    return _point_set(folded) == _point_set(monkhorst_pack_points(primitive_mesh))
+
+
+def conventional_k_grid(primitive: dict, conventional: dict, mesh: typing.Sequence[int]) -> typing.Tuple[list, bool]:
+
+    """
+    Monkhorst-Pack grid of the conventional cell equivalent to mesh of the primitive cell
+
+    Returns
+    -------
+    grid : list of int
+        A grid sampling exactly the same k-points, if one exists, else the grid
+        with the k-point spacing of the coarsest direction of mesh
+    exact : bool
+        Whether grid samples exactly the same k-points
+    """
+
+    transformation = transformation_matrix(conventional, primitive['bravais'])
+    spacing = np.max(reciprocal_lengths(primitive) / np.asarray(mesh))
+    grid = [int(n) for n in np.maximum(1, np.ceil(reciprocal_lengths(conventional) / spacing - 1.e-8))]
+
+    # Exact grids have prod(mesh) / det(M) points. Prefer the one closest to the equal-spacing grid
+    candidates = itertools.product(*[range(1, max(mesh) + 1)] * 3)
+    for candidate in sorted(candidates, key=lambda candidate: np.sum(np.abs(np.subtract(candidate, grid)))):
+        if samples_same_k_points(mesh, candidate, transformation):
+            return list(candidate), True
+    return grid, False
+
+
+def default_settings(monkhorst_pack: list) -> collections.OrderedDict:
+    """ Settings of the energy per atom tests, as in crystals.py """
+    return collections.OrderedDict([
+        ('h0_cutoff',               Set(40, 'bohr')),
+        ('overlap_cutoff',          Set(40, 'bohr')),
+        ('repulsive_cutoff',        Set(40, 'bohr')),
+        ('ewald_real_cutoff',       Set(10, 'bohr')),
+        ('ewald_reciprocal_cutoff', Set(1)),
+        ('ewald_alpha',             Set(0.5)),
+        ('monkhorst_pack',          Set(monkhorst_pack)),
+        ('temperature',             Set(0, 'kelvin')),
+        ('potential_type',          Set(xtb_potential_str(PotentialType.TRUNCATED)))
+    ])
+
+
+def cell_pair(primitive_file, conventional_file, mesh=default_monkhorst_pack) -> dict:
+
+    """
+    Primitive and conventional cells of a catalogue entry, and their k-grids
+
+    Returns
+    -------
+    pair : dict
+        'primitive' and 'conventional' crystals, their 'primitive_monkhorst_pack'
+        and 'conventional_monkhorst_pack', and 'exact_k_grid'
+    """
+
+    expected = cif_parser_wrapper('../' + primitive_file.file, is_primitive_cell=True)
+    bravais = expected['bravais']
+    conventional = cif_parser_wrapper('../' + conventional_file.file, is_primitive_cell=False,
+                                      bravais=conventional_bravais.get(bravais, bravais))
+    primitive = primitive_crystal(conventional, bravais) if bravais in conventional_bravais else conventional
+    if primitive['n_atoms'] != expected['n_atoms']:
+        print(primitive_file.file, 'has', expected['n_atoms'], 'atoms, reduced cell has', primitive['n_atoms'])
+    grid, exact = conventional_k_grid(primitive, conventional, mesh)
+    return {'primitive': primitive,
+            'conventional': conventional,
+            'primitive_monkhorst_pack': list(mesh),
+            'conventional_monkhorst_pack': grid,
+            'exact_k_grid': exact}
+
+
+def run_catalogue(crystals=None, mesh=default_monkhorst_pack, tolerance=default_tolerance,
+                  max_workers=None) -> typing.Dict[str, dict]:
+
+    """
+    Run the primitive and conventional cells of every crystal concurrently
+
+    Parameters
+    ----------
+    crystals : dict, optional
+        Keys = names, values = (primitive FileUrl, conventional FileUrl). Defaults to catalogue()
+    mesh : list of int, optional
+        Monkhorst-Pack grid of the primitive cells
+    tolerance : float, optional
+        Tolerance on the difference in energy per atom, in Ha, for crystals with exact k-grids
+    max_workers : int, optional
+        Number of concurrent qcore processes. Defaults to one per run
+
+    Returns
+    -------
+    results : dict
+        Keys = names. Values = cell_pair entries without the crystals, the
+        'primitive_n_atoms' and 'conventional_n_atoms', 'primitive_energy_per_atom'
+        and 'conventional_energy_per_atom', the 'discrepancy' (conventional - primitive)
+        and 'passed', None if the k-grids are not exact, as the cells then sample
+        different k-points. NaN energies signify failed runs
+    """
+
+    crystals = catalogue() if crystals is None else crystals
+    pairs = {name: cell_pair(*files, mesh=mesh) for name, files in crystals.items()}
+
+    def energy_per_atom(crystal, monkhorst_pack, named_result):
+        input_string = qcore_input.xtb_input_string_cleaner(crystal=crystal,
+                                                            options=default_settings(monkhorst_pack),
+                                                            named_result=named_result)
+        return run_qcore(input_string).get(named_result, {}).get('energy', np.nan) / crystal['n_atoms']
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or max(1, 2 * len(pairs))) as executor:
+        futures = {(name, cell): executor.submit(energy_per_atom, pair[cell], pair[cell + '_monkhorst_pack'],
+                                                 cell + '_' + name)
+                   for name, pair in pairs.items() for cell in ('primitive', 'conventional')}
+        energies = {key: future.result() for key, future in futures.items()}
+
+    results = {}
+    for name, pair in pairs.items():
+        result = {key: value for key, value in pair.items() if key not in ('primitive', 'conventional')}
+        for cell in ('primitive', 'conventional'):
+            result[cell + '_n_atoms'] = pair[cell]['n_atoms']
+            result[cell + '_energy_per_atom'] = energies[(name, cell)]
+        result['discrepancy'] = result['conventional_energy_per_atom'] - result['primitive_energy_per_atom']
+        result['passed'] = bool(abs(result['discrepancy']) <= tolerance) if result['exact_k_grid'] else None
+        results[name] = result
+    return results
+
+
+def print_results(results: typing.Dict[str, dict]) -> None:
+    """ Table of the energy per atom discrepancy of every crystal """
+    print('crystal'.ljust(20) + 'atoms'.ljust(8) + 'k-grids'.ljust(24) + 'dE/atom (Ha)'.ljust(14) + 'result')
+    for name, result in results.items():
+        k_grids = str(result['primitive_monkhorst_pack']) + ' ' + str(result['conventional_monkhorst_pack']) + \
+                  ('' if result['exact_k_grid'] else '*')
+        print(name.ljust(20) + '{}/{}'.format(result['primitive_n_atoms'], result['conventional_n_atoms']).ljust(8) +
+              k_grids.ljust(24) + '{:<14.1e}'.format(result['discrepancy']) +
+              {True: 'pass', False: 'FAIL', None: 'n/a'}[result['passed']])
+    if any(not result['exact_k_grid'] for result in results.values()):
+        print('* Same k-point spacing, but not the same k-points: discrepancies include k-point sampling errors, '
+              'so are not compared (n/a)')
+
+
+if __name__ == '__main__':
+    print_results(run_catalogue())
@@ -9,16 +9,21 @@
 from collections import OrderedDict
 
 from crystal_system import cubic
-from src.pymatgen_wrappers import cif_parser_wrapper
+from src.pymatgen_wrappers import load_cif
 from src.xtb_potential import xtb_potential_str, PotentialType
 from src import qcore_input_strings as qcore_input
 from src.utils import Set, SetAssert
+from src.registry import Registry
 
 
 # Variable used by WHOLE script
 potential_type = PotentialType.TRUNCATED
 
+# Generators of this module and their metadata, see src/registry.py
+registry = Registry('energy_per_atom')
 
+
+@registry.register(bravais='fcc', n_atoms=2, k_points=8, tags=('silicon', 'primitive'))
 def primitive_silicon(named_result='primitive_cell_si') -> str:
     """
     Primitive silicon
@@ -32,8 +37,7 @@ def primitive_silicon(named_result='primitive_cell_si') -> str:
     """
 
     fname = '../' + cubic.conventional_fcc_cifs['silicon'].file
-    crystal = cif_parser_wrapper(fname, is_primitive_cell=True, fractional=True,
-                                 bravais='fcc')
+    crystal = load_cif(fname, is_primitive_cell=True, fractional=True, bravais='fcc')
     assert crystal['n_atoms'] == 2, "Expect 2-atom basis for primitive si"
 
     options = OrderedDict([
@@ -60,11 +64,11 @@ def primitive_silicon(named_result='primitive_cell_si') -> str:
 
 
 
+@registry.register(bravais='cubic', n_atoms=8, k_points=8, tags=('silicon', 'conventional'))
 def conventional_silicon(named_result='conventional_cell_si'):
 
     fname = '../' + cubic.conventional_fcc_cifs['silicon'].file
-    crystal = cif_parser_wrapper(fname, is_primitive_cell=False, fractional=True,
-                                 bravais='cubic')
+    crystal = load_cif(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
     assert crystal['n_atoms'] == 8, "Expect 8-atom basis for primitive si"
 
     options = OrderedDict([
@@ -82,11 +86,12 @@ def conventional_silicon(named_result='conventional_cell_si'):
                                                 named_result=named_result)
 
 
+@registry.register(bravais='fcc', n_atoms=1, k_points=216, tags=('copper', 'primitive', 'metal'))
 def primitive_copper():
 
     named_result = 'primitive_copper'
     fname = '../' + cubic.fcc_cifs['copper'].file
-    crystal = cif_parser_wrapper(fname,  is_primitive_cell=True, fractional=True)
+    crystal = load_cif(fname, is_primitive_cell=True, fractional=True)
     settings = OrderedDict([
         ('h0_cutoff',               Set(40, 'bohr')),
         ('overlap_cutoff',          Set(40, 'bohr')),
@@ -103,11 +108,12 @@ def primitive_copper():
     return input_string
 
 
+@registry.register(bravais='cubic', n_atoms=4, k_points=64, tags=('copper', 'conventional', 'metal'))
 def conventional_copper():
 
     named_result = 'conventional_copper'
     fname = '../' + cubic.conventional_fcc_cifs['copper'].file
-    crystal = cif_parser_wrapper(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
+    crystal = load_cif(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
     settings = OrderedDict([
         ('h0_cutoff',               Set(40, 'bohr')),
         ('overlap_cutoff',          Set(40, 'bohr')),
@@ -124,11 +130,12 @@ def conventional_copper():
     return input_string
 
 
+@registry.register(bravais='fcc', n_atoms=2, k_points=64, tags=('sodium_chloride', 'primitive'))
 def primitive_sodium_chloride():
 
     named_result = 'primitive_nacl'
     fname = '../' + cubic.fcc_cifs['sodium_chloride'].file
-    crystal = cif_parser_wrapper(fname,  is_primitive_cell=True, fractional=True)
+    crystal = load_cif(fname, is_primitive_cell=True, fractional=True)
     settings = OrderedDict([
         ('h0_cutoff',               Set(40, 'bohr')),
         ('overlap_cutoff',          Set(40, 'bohr')),
@@ -145,11 +152,12 @@ def primitive_sodium_chloride():
     return input_string
 
 
+@registry.register(bravais='cubic', n_atoms=8, k_points=64, tags=('sodium_chloride', 'conventional'))
 def convention_sodium_chloride():
 
     named_result = 'conventional_nacl'
     fname = '../' + cubic.conventional_fcc_cifs['sodium_chloride'].file
-    crystal = cif_parser_wrapper(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
+    crystal = load_cif(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
     settings = OrderedDict([
         ('h0_cutoff',               Set(40, 'bohr')),
         ('overlap_cutoff',          Set(40, 'bohr')),
@@ -1,24 +1,20 @@
 # Probably look into entos tests that use python
 # and make this one that runs with ctest
 
-from inspect import getmembers, isfunction
-
-import energy_per_atom.crystals as crystals_module
+from energy_per_atom.crystals import registry
 
 
 def total_input_generator(crystals: list) -> str:
     """
-    Retrieve functions from crystals_module with names
-    that contain entries in crystals, then add input strings
-    :param crystals: list of strings, containing crystal system names
+    Add the input strings of the registered generators tagged with any of crystals.
+    Only the selected generators are called
+    :param crystals: list of strings, containing crystal names, i.e. 'silicon'
     :return: total input string
     """
-    functions = [item for item in getmembers(crystals_module) if isfunction(item[1])]
     total_string = ''
     for crystal in crystals:
-        for (name, function) in functions:
-            if crystal in name:
-                total_string += function() + '\n'
+        for name, input_string in registry.build(registry.select(tags=crystal)):
+            total_string += input_string + '\n'
 
     return total_string
 
@@ -26,8 +22,3 @@ def total_input_generator(crystals: list) -> str:
 crystals = ['silicon']
 
 print(total_input_generator(crystals))
-
-
-
-
-
@@ -0,0 +1,142 @@
+"""
+Adaptive volume sampling for energy vs volume curves.
+
+Start from a few lattice constant factors about the bulk value, fit the
+equation of state, then add the candidate volume that most reduces the
+uncertainty in (V0, B0, B1), until target tolerances are met.
+
+The reduction in the variance of each parameter from adding a point at V
+follows from the Sherman-Morrison update of the parameter covariance,
+  Sigma' = Sigma - (Sigma j)(Sigma j)^T / (sigma^2 + j^T Sigma j)
+where j is the Jacobian of the equation of state at V, and sigma the
+uncertainty in the energies. Candidates are scored by the reduction in
+the sum of squared parameter uncertainties, each relative to its tolerance.
+"""
+
+import typing
+import numpy as np
+
+from energy_vs_volume import ev_functions
+
+# Target uncertainties: relative for V0 and B0, absolute for B1
+default_tolerances = {'V0': 1.e-3, 'B0': 1.e-2, 'B1': 0.1}
+
+default_initial_factors = (0.94, 0.97, 1.0, 1.03, 1.06)
+default_candidate_factors = np.linspace(0.8, 1.2, 41)
+
+
+def parameter_covariance(volumes: np.ndarray, params: np.ndarray, energy_noise: float,
+                         eos='birch_murnaghan') -> np.ndarray:
+    """
+    Covariance of the equation of state parameters, energy_noise^2 (J^T J)^{-1}
+
+    :param volumes: Sampled volumes
+    :param params: Fitted parameters (E0, V0, B0, B1)
+    :param energy_noise: Absolute uncertainty in the energies
+    :return: Covariance matrix, (4, 4)
+    """
+    jacobian = ev_functions.equations_of_state[eos][1](np.asarray(volumes), *params)
+    return energy_noise**2 * np.linalg.pinv(jacobian.T @ jacobian)
+
+
+def tolerance_scales(params: np.ndarray, tolerances: dict) -> np.ndarray:
+    """ Absolute tolerance on each of (E0, V0, B0, B1). E0 is not targeted, hence inf """
+    return np.array([np.inf,
+                     tolerances['V0'] * abs(params[1]),
+                     tolerances['B0'] * abs(params[2]),
+                     tolerances['B1']])
+
+
+def candidate_scores(candidate_volumes: np.ndarray, params: np.ndarray, covariance: np.ndarray,
+                     energy_noise: float, scales: np.ndarray, eos='birch_murnaghan') -> np.ndarray:
+    """
+    Reduction in the tolerance-weighted variance of (V0, B0, B1) from adding
+    a single point at each candidate volume
+
+    :return: Score per candidate. Larger is better
+    """
+    j = ev_functions.equations_of_state[eos][1](np.asarray(candidate_volumes), *params)
+    sigma_j = j @ covariance
+    denominator = energy_noise**2 + np.sum(j * sigma_j, axis=-1)
+    return np.sum(sigma_j**2 / scales**2, axis=-1) / denominator
+
+
+def adaptive_energy_vs_volume(energy: typing.Callable,
+                              reference_volume: float,
+                              initial_factors=default_initial_factors,
+                              candidate_factors=default_candidate_factors,
+                              tolerances=None,
+                              energy_noise=1.e-6,
+                              max_points=21,
+                              eos='birch_murnaghan') -> dict:
+    """
+    Sample an energy vs volume curve adaptively, scaling the lattice isotropically.
+
+    :param energy: Function of the lattice constant factor, returning the total energy,
+    or None if the calculation failed
+    :param reference_volume: Cell volume at a lattice constant factor of 1
+    :param initial_factors: Lattice constant factors sampled before the first fit. At least 4
+    :param candidate_factors: Lattice constant factors from which further points are chosen
+    :param tolerances: Target uncertainties, with keys V0, B0 (relative) and B1 (absolute)
+    :param energy_noise: Absolute uncertainty in the energies, i.e. the SCF energy tolerance
+    :param max_points: Maximum number of energy evaluations
+    :param eos: Equation of state. One of ev_functions.equations_of_state
+    :return: Dictionary of sampled lattice constant factors, volumes and energies, the
+    fitted parameters (E0, V0, B0, B1) and their standard deviations, the number of
+    energy evaluations and whether the tolerances were met
+    """
+    assert len(initial_factors) >= 4, "Require at least 4 initial points to fit the equation of state"
+    tolerances = default_tolerances if tolerances is None else tolerances
+    candidates = [f for f in candidate_factors if not np.any(np.isclose(f, initial_factors))]
+
+    factors, energies = [], []
+    n_evaluations = 0
+
+    def evaluate(factor):
+        nonlocal n_evaluations
+        n_evaluations += 1
+        result = energy(factor)
+        if result is not None:
+            factors.append(factor)
+            energies.append(result)
+
+    for factor in initial_factors:
+        evaluate(factor)
+
+    params, sd, converged = None, None, False
+    while True:
+        volumes = reference_volume * np.asarray(factors)**3
+        try:
+            _, params, sd = ev_functions.fit_equation_of_state({'V': volumes, 'E': np.asarray(energies)},
+                                                               volumes, eos=eos, energy_noise=energy_noise)
+        except (RuntimeError, ValueError, TypeError):
+            params, sd = None, None
+
+        if params is not None:
+            scales = tolerance_scales(params, tolerances)
+            converged = bool(np.all(sd[1:] <= scales[1:]))
+        if converged or n_evaluations >= max_points or not candidates:
+            break
+
+        if not factors:
+            # Every evaluation failed: try the candidates in order
+            choice = 0
+        elif params is None:
+            # Fit failed: widen the sampling with the candidate furthest from the sampled points
+            distances = [np.amin(np.abs(np.asarray(factors) - c)) for c in candidates]
+            choice = int(np.argmax(distances))
+        else:
+            covariance = parameter_covariance(volumes, params, energy_noise, eos)
+            candidate_volumes = reference_volume * np.asarray(candidates)**3
+            choice = int(np.argmax(candidate_scores(candidate_volumes, params, covariance,
+                                                    energy_noise, scales, eos)))
+        evaluate(candidates.pop(choice))
+
+    order = np.argsort(factors)
+    return {'lattice_constant_factors': np.asarray(factors)[order],
+            'volumes': reference_volume * np.asarray(factors)[order]**3,
+            'energies': np.asarray(energies)[order],
+            'params': params,
+            'standard_deviations': sd,
+            'n_evaluations': n_evaluations,
+            'converged': converged}
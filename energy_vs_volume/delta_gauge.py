@@ -0,0 +1,95 @@
+"""
+Delta gauge: the root mean squared energy difference between two equations
+of state, over a volume range about the equilibrium volume.
+
+  Delta = \sqrt{ \frac{1}{V_f - V_i} \int_{V_i}^{V_f} (E(V) - E_{ref}(V))^2 dV }
+
+with both curves aligned at their minima, V_i = 0.94 <V0> and V_f = 1.06 <V0>,
+where <V0> is the mean of the computed and reference equilibrium volumes.
+
+Using the polynomial form of the Birch-Murnaghan relation, the integral has
+the closed form [\sum_n x_n V^{-(2n+1)/3}]_{V_i}^{V_f}, with the coefficients
+x_n given by ev_functions.delta_coefficients_array. All functions operate on
+N pairs of equations of state at once.
+
+Error Estimates for Solid-State Density-Functional Theory Predictions:
+An Overview by Means of the Ground-State Elemental Crystals, Critical Reviews in
+Solid State and Materials Sciences, 39:1, 1-24, DOI: 10.1080/10408436.2013.772503
+"""
+
+import numpy as np
+
+from energy_vs_volume import ev_functions
+
+# Exponents of V in the antiderivative, -(2n+1)/3 for n = -2, ..., 4
+_antiderivative_exponents = -(2. * ev_functions.delta_n_values + 1.) / 3.
+
+# Relative half-width of the integration range about <V0>
+default_volume_range = 0.06
+
+
+def birch_murnaghan_to_polynomial(params: np.ndarray, include_E0=False) -> np.ndarray:
+    """
+    Coefficients of the polynomial form of the Birch-Murnaghan relation,
+      E(V) = a_0 + a_1 V^{-2/3} + a_2 V^{-4/3} + a_3 V^{-2}
+    from the parameters (E0, V0, B0, B1).
+
+    :param params: Parameters (E0, V0, B0, B1), with shape (..., 4)
+    :param include_E0: Include E0 in a_0. If false, curves are aligned at E = 0
+    :return: Coefficients [a_0, a_1, a_2, a_3], with shape (..., 4)
+    """
+    params = np.asarray(params, dtype=float)
+    E0, V0, B0, B1 = [params[..., i] for i in range(4)]
+    prefactor = 9. / 16. * V0 * B0
+    coefficients = np.stack([prefactor * (6. - B1),
+                             prefactor * V0**(2/3) * (3. * B1 - 16.),
+                             prefactor * V0**(4/3) * (14. - 3. * B1),
+                             prefactor * V0**2 * (B1 - 4.)], axis=-1)
+    if include_E0:
+        coefficients[..., 0] += E0
+    return coefficients
+
+
+def delta(params: np.ndarray, params_ref: np.ndarray, volume_range=default_volume_range) -> np.ndarray:
+    """
+    Delta gauge between N computed and N reference equations of state.
+
+    :param params: Birch-Murnaghan parameters (E0, V0, B0, B1), with shape (N, 4) or (4)
+    :param params_ref: Reference parameters, with the same shape
+    :param volume_range: Relative half-width of the integration range about <V0>
+    :return: Delta for each pair, with shape (N) (or a float), in the energy unit of E0
+    """
+    params = np.asarray(params, dtype=float)
+    params_ref = np.asarray(params_ref, dtype=float)
+    assert params.shape == params_ref.shape, "params and params_ref must have the same shape"
+
+    x = ev_functions.delta_coefficients_array(birch_murnaghan_to_polynomial(params),
+                                              birch_murnaghan_to_polynomial(params_ref))
+    V0_mean = 0.5 * (params[..., 1] + params_ref[..., 1])
+    V_i = (1. - volume_range) * V0_mean
+    V_f = (1. + volume_range) * V0_mean
+
+    antiderivative = lambda V: np.sum(x * V[..., None] ** _antiderivative_exponents, axis=-1)
+    integral = antiderivative(V_f) - antiderivative(V_i)
+
+    # Cancellation can leave tiny negative integrals for near-identical curves
+    return np.sqrt(np.maximum(integral, 0.) / (V_f - V_i))
+
+
+def delta_from_curves(volumes: np.ndarray, energies: np.ndarray,
+                      volumes_ref: np.ndarray, energies_ref: np.ndarray,
+                      volume_range=default_volume_range) -> np.ndarray:
+    """
+    Delta gauge between N computed and N reference E(V) curves, each fitted to
+    the polynomial form of the Birch-Murnaghan relation by linear least squares.
+
+    :param volumes: Volumes with shape (N, n_points). Pad shorter curves with NaN
+    :param energies: Energies with shape (N, n_points)
+    :param volumes_ref: Reference volumes with shape (N, n_ref_points)
+    :param energies_ref: Reference energies with shape (N, n_ref_points)
+    :param volume_range: Relative half-width of the integration range about <V0>
+    :return: Delta for each pair, with shape (N)
+    """
+    to_params = lambda V, E: ev_functions.polynomial_to_birch_murnaghan(
+        ev_functions.birch_murnaghan_polynomial_coefficients(V, E))
+    return delta(to_params(volumes, energies), to_params(volumes_ref, energies_ref), volume_range)
@@ -2,9 +2,13 @@
 
 import numpy as np
 import matplotlib.pyplot as plt
-import itertools
+import math
 import scipy.optimize
 
+from src import lattice_vectors
+from src import space_groups
+from src.lattice_vectors import isotropic_lattice_parameters, get_bravais
+
 def cubic_lattice_constants(crystal: dict, lattice_constant_factors: np.ndarray)\
         -> np.ndarray:
     """
@@ -45,6 +49,33 @@ def get_position_unit(crystal) -> str:
     return units[0]
 
 
+def energy_vs_volume_crystals(crystal: dict, lattice_constant_factors: np.ndarray) -> list:
+    """
+    Crystals for an energy vs volume curve of any qcore bravais lattice.
+    Volume is scaled isotropically: c/a, b/a and lattice angles are fixed.
+
+    :param crystal : dictionary containing crystal information from cif file
+    :param lattice_constant_factors : Lattice constant scaling factors
+    :return : List of shallow copies of crystal, one per factor, each with new
+    lattice parameters. Positions must be fractional, such that they scale with the cell.
+    """
+    assert get_bravais(crystal) in space_groups.qcore_bravais_lattices
+    assert 'fractional' in crystal, "Positions should be in fractional coordinates"
+    get_position_unit(crystal)
+
+    return [dict(crystal, lattice_parameters=isotropic_lattice_parameters(crystal['lattice_parameters'], factor))
+            for factor in lattice_constant_factors]
+
+
+def crystal_volume(crystal: dict) -> float:
+    """
+    :param crystal : dictionary containing crystal information
+    :return : Cell volume, in the cube of the lattice constants' unit
+    """
+    lattice = lattice_vectors.lattice_vectors_from_parameters(get_bravais(crystal), crystal['lattice_parameters'])
+    return float(lattice_vectors.volume(lattice))
+
+
 def plot_energy_vs_volume(crystal_input, labels):
     lattice_constant_factors, total_energies = crystal_input()
     plt.plot(lattice_constant_factors, total_energies, label=labels['crystal_cell'])
@@ -78,6 +109,179 @@ def birch_murnaghan_relation(V:np.ndarray, E0: float, V0: float, B0: float, B1:
     return E0 + (9 / 16 * V0 * B0) * ( (term1**3 * B1) + (term1**2 * (6 - 4 * (V0 / V)**(2/3))) )
 
 
+def birch_murnaghan_jacobian(V: np.ndarray, E0, V0, B0, B1) -> np.ndarray:
+    """
+    Analytic partial derivatives of the third-order Birch-Murnaghan relation
+    w.r.t. its parameters. Parameters broadcast against V, such that
+    V with shape (n_curves, n_points) and parameters with shape (n_curves, 1)
+    gives the Jacobian of every curve.
+
+    :param V: Volume data
+    :param E0: Parameter. Energy at Equilibrium volume
+    :param V0: Parameter. Equilibrium volume
+    :param B0: Parameter. bulk modulus
+    :param B1: Parameter. Derivative of the bulk modulus w.r.t. pressure
+    :return: Jacobian with shape V.shape + (4,), ordered (E0, V0, B0, B1)
+    """
+    t = (V0 / V)**(2/3)
+    u = t - 1
+    f = (u**3 * B1) + (u**2 * (6 - 4 * t))
+    df_dt = 3 * u**2 * B1 + 2 * u * (6 - 4 * t) - 4 * u**2
+    dE_dE0 = np.ones_like(t)
+    dE_dV0 = (9 / 16) * B0 * (f + (2 / 3) * t * df_dt)
+    dE_dB0 = (9 / 16) * V0 * f
+    dE_dB1 = (9 / 16) * V0 * B0 * u**3
+    return np.stack(np.broadcast_arrays(dE_dE0, dE_dV0, dE_dB0, dE_dB1), axis=-1)
+
+
+def birch_murnaghan_polynomial_coefficients(volumes: np.ndarray, energies: np.ndarray) -> np.ndarray:
+    """
+    Linear least-squares fit of E(V) curves to the polynomial form of the
+    Birch-Murnaghan relation:
+      E(V) = a_0 + a_1 V^{-2/3} + a_2 V^{-4/3} + a_3 V^{-2}
+
+    Curves with fewer points can be padded with NaN.
+
+    :param volumes: Volumes with shape (n_curves, n_points)
+    :param energies: Energies with shape (n_curves, n_points)
+    :return: Coefficients [a_0, a_1, a_2, a_3], with shape (n_curves, 4)
+    """
+    volumes = np.atleast_2d(np.asarray(volumes, dtype=float))
+    energies = np.atleast_2d(np.asarray(energies, dtype=float))
+    assert volumes.shape == energies.shape, "volumes and energies must have the same shape"
+
+    mask = np.isfinite(volumes) & np.isfinite(energies)
+    assert np.all(np.sum(mask, axis=-1) >= 4), "Every curve requires at least 4 points"
+    x = np.where(mask, volumes, 1.)**(-2/3)
+    y = np.where(mask, energies, 0.)
+
+    # Fit in z = (x - centre) / half_width, in [-1, 1], for well-conditioned normal equations
+    x_min = np.amin(np.where(mask, x, np.inf), axis=-1)
+    x_max = np.amax(np.where(mask, x, -np.inf), axis=-1)
+    centre, half_width = 0.5 * (x_max + x_min), 0.5 * (x_max - x_min)
+    z = (x - centre[:, None]) / half_width[:, None]
+    design = z[..., None] ** np.arange(4) * mask[..., None]
+    b = np.linalg.solve(np.einsum('cpi,cpj->cij', design, design),
+                        np.einsum('cpi,cp->ci', design, y)[..., None])[..., 0]
+
+    # Expand sum_k b_k ((x - centre) / half_width)^k in powers of x
+    coefficients = np.zeros_like(b)
+    for k in range(4):
+        for j in range(k + 1):
+            coefficients[:, j] += b[:, k] * math.comb(k, j) * (-centre)**(k - j) / half_width**k
+    return coefficients
+
+
+def polynomial_to_birch_murnaghan(coefficients: np.ndarray) -> np.ndarray:
+    """
+    Convert coefficients of the polynomial form of the Birch-Murnaghan relation
+    to the parameters (E0, V0, B0, B1).
+
+    With x = V^{-2/3}, V0 is given by the root of dE/dx = 0 with positive
+    curvature, B0 = V d^2E/dV^2 and B1 = -1 - V (d^3E/dV^3) / (d^2E/dV^2), at V0.
+    Curves without a minimum return NaN parameters.
+
+    :param coefficients: [a_0, a_1, a_2, a_3], with shape (n_curves, 4)
+    :return: Parameters (E0, V0, B0, B1), with shape (n_curves, 4)
+    """
+    a = np.atleast_2d(np.asarray(coefficients, dtype=float))
+    a0, a1, a2, a3 = a[:, 0], a[:, 1], a[:, 2], a[:, 3]
+
+    # Roots of a_1 + 2 a_2 x + 3 a_3 x^2 = 0. The minimum, d2E/dx2 = 2 a_2 + 6 a_3 x > 0,
+    # is always the + root, for which d2E/dx2 = sqrt(discriminant)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discriminant = np.sqrt(4 * a2**2 - 12 * a1 * a3)
+        x0 = np.where(np.abs(a3) > 0,
+                      (-2 * a2 + discriminant) / (6 * a3),
+                      -a1 / (2 * a2))
+
+        E_x = lambda x: a1 + 2 * a2 * x + 3 * a3 * x**2
+        E_xx = 2 * a2 + 6 * a3 * x0
+        E_xxx = 6 * a3
+        V0 = x0**(-3/2)
+        E0 = a0 + a1 * x0 + a2 * x0**2 + a3 * x0**3
+
+        # Derivatives of x = V^{-2/3} w.r.t. V, at V0
+        dx = -(2/3) * V0**(-5/3)
+        d2x = (10/9) * V0**(-8/3)
+        d3x = -(80/27) * V0**(-11/3)
+
+        E_VV = E_xx * dx**2 + E_x(x0) * d2x
+        E_VVV = E_xxx * dx**3 + 3 * E_xx * dx * d2x + E_x(x0) * d3x
+        B0 = V0 * E_VV
+        B1 = -1 - V0 * E_VVV / E_VV
+
+    parameters = np.stack([E0, V0, B0, B1], axis=-1)
+    no_minimum = ~np.isfinite(V0) | (x0 <= 0) | ~(E_xx > 0)
+    parameters[no_minimum] = np.nan
+    return parameters
+
+
+def fit_equation_of_state_batch(volumes: np.ndarray, energies: np.ndarray,
+                                max_iterations=20, tolerance=1.e-10) -> tuple:
+    """
+    Fit many E(V) curves to the Birch-Murnaghan relation at once.
+
+    The linear least-squares fit to the polynomial form of the relation provides
+    a closed-form initial guess, which is refined with batched Gauss-Newton
+    iterations, using the analytic Jacobian of birch_murnaghan_relation.
+    Standard deviations are defined as in scipy.optimize.curve_fit.
+
+    :param volumes: Volumes with shape (n_curves, n_points). Pad shorter curves with NaN
+    :param energies: Energies with shape (n_curves, n_points)
+    :param max_iterations: Maximum number of Gauss-Newton iterations
+    :param tolerance: Convergence threshold on the relative change in parameters
+    :return: parameters (E0, V0, B0, B1) and their standard deviations, both with
+    shape (n_curves, 4), and a mask of converged curves, with shape (n_curves)
+    """
+    volumes = np.atleast_2d(np.asarray(volumes, dtype=float))
+    energies = np.atleast_2d(np.asarray(energies, dtype=float))
+    mask = np.isfinite(volumes) & np.isfinite(energies)
+    V = np.where(mask, volumes, 1.)
+    E = np.where(mask, energies, 0.)
+
+    params = polynomial_to_birch_murnaghan(birch_murnaghan_polynomial_coefficients(volumes, energies))
+    converged = np.all(np.isfinite(params), axis=-1)
+    active = converged.copy()
+    converged[:] = False
+
+    for _ in range(max_iterations):
+        if not np.any(active):
+            break
+        p = params[active]
+        args = [p[:, i:i+1] for i in range(4)]
+        residuals = (E[active] - birch_murnaghan_relation(V[active], *args)) * mask[active]
+        jacobian = birch_murnaghan_jacobian(V[active], *args) * mask[active][..., None]
+
+        # Column scaling of the normal equations, as parameters differ by orders of magnitude
+        scale = np.sqrt(np.einsum('cpi,cpi->ci', jacobian, jacobian))
+        scale[scale == 0] = 1.
+        J = jacobian / scale[:, None, :]
+        step = np.linalg.solve(np.einsum('cpi,cpj->cij', J, J),
+                               np.einsum('cpi,cp->ci', J, residuals)[..., None])[..., 0] / scale
+        params[active] = p + step
+
+        done = np.all(np.abs(step) <= tolerance * np.maximum(np.abs(p), 1.e-12), axis=-1)
+        indices = np.flatnonzero(active)
+        converged[indices[done]] = True
+        active[indices[done]] = False
+
+    # Covariance as in curve_fit: inv(J^T J) * residual variance
+    args = [params[:, i:i+1] for i in range(4)]
+    residuals = (E - birch_murnaghan_relation(V, *args)) * mask
+    jacobian = birch_murnaghan_jacobian(V, *args) * mask[..., None]
+    dof = np.maximum(np.sum(mask, axis=-1) - 4, 1)
+    variance = np.sum(residuals**2, axis=-1) / dof
+    finite = np.all(np.isfinite(jacobian), axis=(-2, -1))
+    p_standard_deviations = np.full(params.shape, np.nan)
+    if np.any(finite):
+        jtj = np.einsum('cpi,cpj->cij', jacobian[finite], jacobian[finite])
+        pcov = np.linalg.pinv(jtj) * variance[finite, None, None]
+        p_standard_deviations[finite] = np.sqrt(np.abs(np.diagonal(pcov, axis1=-2, axis2=-1)))
+
+    return params, p_standard_deviations, converged
+
+
 def check_keys(a: dict, expected_keys: list):
     """
 
@@ -89,24 +293,177 @@ def check_keys(a: dict, expected_keys: list):
         assert key in expected_keys
 
 
-def fit_equation_of_state(data:dict, volume_grid:np.ndarray):
+def vinet_relation(V: np.ndarray, E0, V0, B0, B1):
+    """
+    Vinet relation, relating energy to volume.
+    Vinet et al, J. Phys. C: Solid State Phys. 19 L467 (1986)
+
+    :param V: Volume data
+    :param E0: Parameter. Energy at Equilibrium volume
+    :param V0: Parameter. Equilibrium volume
+    :param B0: Parameter. bulk modulus
+    :param B1: Parameter. Derivative of the bulk modulus w.r.t. pressure
+    :return: Vinet relation
+    """
+    k = B1 - 1
+    y = (V / V0)**(1/3) - 1
+    return E0 + (2 * B0 * V0 / k**2) * (2 - (2 + 3 * k * y) * np.exp(-1.5 * k * y))
+
+
+def vinet_jacobian(V: np.ndarray, E0, V0, B0, B1) -> np.ndarray:
+    """
+    Analytic partial derivatives of the Vinet relation w.r.t. its parameters
+
+    :return: Jacobian with shape V.shape + (4,), ordered (E0, V0, B0, B1)
+    """
+    k = B1 - 1
+    eta = (V / V0)**(1/3)
+    y = eta - 1
+    exponential = np.exp(-1.5 * k * y)
+    h = 2 - (2 + 3 * k * y) * exponential
+    A = 2 * B0 * V0 / k**2
+    dE_dE0 = np.ones_like(eta)
+    dE_dV0 = (A / V0) * (h - 1.5 * k**2 * y * eta * exponential)
+    dE_dB0 = (2 * V0 / k**2) * h
+    dE_dB1 = -2 * A * h / k + 4.5 * A * k * y**2 * exponential
+    return np.stack(np.broadcast_arrays(dE_dE0, dE_dV0, dE_dB0, dE_dB1), axis=-1)
+
+
+def murnaghan_relation(V: np.ndarray, E0, V0, B0, B1):
+    """
+    Murnaghan relation, relating energy to volume.
+    F. D. Murnaghan, Proc. Natl. Acad. Sci. 30, 244 (1944)
+
+    :param V: Volume data
+    :param E0: Parameter. Energy at Equilibrium volume
+    :param V0: Parameter. Equilibrium volume
+    :param B0: Parameter. bulk modulus
+    :param B1: Parameter. Derivative of the bulk modulus w.r.t. pressure
+    :return: Murnaghan relation
+    """
+    return E0 + B0 * V / B1 * ((V0 / V)**B1 / (B1 - 1) + 1) - V0 * B0 / (B1 - 1)
+
+
+def murnaghan_jacobian(V: np.ndarray, E0, V0, B0, B1) -> np.ndarray:
+    """
+    Analytic partial derivatives of the Murnaghan relation w.r.t. its parameters
+
+    :return: Jacobian with shape V.shape + (4,), ordered (E0, V0, B0, B1)
+    """
+    r = (V0 / V)**B1
+    dE_dE0 = np.ones_like(r)
+    dE_dV0 = B0 / (B1 - 1) * (V * r / V0 - 1)
+    dE_dB0 = V / B1 * (r / (B1 - 1) + 1) - V0 / (B1 - 1)
+    dE_dB1 = B0 * V * (r * np.log(V0 / V) / (B1 * (B1 - 1)) - r * (2 * B1 - 1) / (B1 * (B1 - 1))**2) \
+             - B0 * V / B1**2 + V0 * B0 / (B1 - 1)**2
+    return np.stack(np.broadcast_arrays(dE_dE0, dE_dV0, dE_dB0, dE_dB1), axis=-1)
+
+
+# Equations of state with four parameters (E0, V0, B0, B1), and their Jacobians
+equations_of_state = {'birch_murnaghan': (birch_murnaghan_relation, birch_murnaghan_jacobian),
+                      'vinet':           (vinet_relation, vinet_jacobian),
+                      'murnaghan':       (murnaghan_relation, murnaghan_jacobian)}
+
+
+def parabola_initial_guess(volumes: np.ndarray, energies: np.ndarray, B1=4.) -> np.ndarray:
+    """
+    Initial guess for (E0, V0, B0, B1) from a parabola fitted to E(V):
+    V0 at the minimum of the parabola, B0 = V0 d^2E/dV^2.
+
+    If the parabola has no minimum, or its minimum lies outside of the data,
+    V0 is taken as the volume of the lowest energy and B0 from the curvature
+    of the three points around it.
+
+    :param volumes: Volume data
+    :param energies: Energy data
+    :param B1: Guess for the derivative of the bulk modulus. ~4 for most solids
+    :return: Initial guess [E0, V0, B0, B1]
+    """
+    volumes = np.asarray(volumes, dtype=float)
+    energies = np.asarray(energies, dtype=float)
+    c2, c1, c0 = np.polyfit(volumes, energies, 2)
+
+    if c2 > 0 and np.amin(volumes) <= -c1 / (2 * c2) <= np.amax(volumes):
+        V0 = -c1 / (2 * c2)
+        return np.array([c0 + c1 * V0 + c2 * V0**2, V0, 2 * c2 * V0, B1])
+
+    order = np.argsort(volumes)
+    i_min = np.clip(np.argmin(energies[order]), 1, volumes.size - 2)
+    local = order[i_min - 1: i_min + 2]
+    c2_local = np.polyfit(volumes[local], energies[local], 2)[0]
+    V0 = volumes[order[np.argmin(energies[order])]]
+    B0 = 2 * c2_local * V0 if c2_local > 0 else 2 * abs(c2) * V0
+    return np.array([np.amin(energies), V0, B0, B1])
+
+
+def polynomial_equation_of_state(data: dict, volume_grid: np.ndarray, order=3):
+    """
+    Fit E(V) to a polynomial in V, by linear least squares, and extract
+    (E0, V0, B0, B1) at the minimum of the polynomial.
+    Standard deviations are propagated from the covariance of the polynomial coefficients.
+
+    :return: Energies corresponding to volumes in volume_grid, fitting parameters
+    and their standard deviations
+    """
+    def parameters(coefficients):
+        polynomial = np.poly1d(coefficients)
+        d1, d2, d3 = polynomial.deriv(1), polynomial.deriv(2), polynomial.deriv(3)
+        roots = d1.roots
+        roots = roots[np.isreal(roots)].real
+        minima = roots[d2(roots) > 0]
+        if minima.size == 0:
+            return np.full(4, np.nan)
+        V0 = minima[np.argmin(np.abs(minima - np.mean(data['V'])))]
+        return np.array([polynomial(V0), V0, V0 * d2(V0), -1 - V0 * d3(V0) / d2(V0)])
+
+    coefficients, cov = np.polyfit(data['V'], data['E'], order, cov=True)
+    params = parameters(coefficients)
+
+    # Linear error propagation, with a central-difference Jacobian of the parameters
+    # w.r.t. the coefficients
+    jacobian = np.zeros(shape=(4, coefficients.size))
+    for i in range(coefficients.size):
+        h = 1.e-6 * max(abs(coefficients[i]), 1.e-12)
+        shift = np.zeros_like(coefficients)
+        shift[i] = h
+        jacobian[:, i] = (parameters(coefficients + shift) - parameters(coefficients - shift)) / (2 * h)
+    p_standard_deviations = np.sqrt(np.abs(np.diag(jacobian @ cov @ jacobian.T)))
+
+    return np.polyval(coefficients, volume_grid), params, p_standard_deviations
+
+
+def fit_equation_of_state(data:dict, volume_grid:np.ndarray, eos='birch_murnaghan', energy_noise=None):
     """
     Given a set of volumes, return corresponding energies via
-    fitting to the birch murnaghan relation
+    fitting to an equation of state
 
     Alternatively could have interpolated but birch murnaghan relation
     should provide an excellent fit to the data:
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.interp1d.html#scipy.interpolate.interp1d
 
+    Nonlinear fits use the analytic Jacobian of the relation, from an initial
+    guess given by parabola_initial_guess.
+
+    :param eos: Equation of state. One of equations_of_state, or 'polynomial'
+    :param energy_noise: Absolute uncertainty in the energies. If given, standard deviations
+    are defined w.r.t. it rather than the residual of the fit
     :return: Energies corresponding to volumes in volume_grid, fitting parameters
     and their standard deviations
     """
     check_keys(data, ['E', 'V'])
-    param_guesses = [np.amin(data['E']), np.amin(data['V']), 1., 1.]
+    if eos == 'polynomial':
+        return polynomial_equation_of_state(data, volume_grid)
+
+    assert eos in equations_of_state, "eos must be 'polynomial' or one of " + str(list(equations_of_state))
+    relation, jacobian = equations_of_state[eos]
+    param_guesses = parabola_initial_guess(data['V'], data['E'])
+    sigma = None if energy_noise is None else np.full(len(data['E']), energy_noise)
     params, pcov = scipy.optimize.curve_fit(
-        birch_murnaghan_relation, data['V'], data['E'], param_guesses)
+        relation, data['V'], data['E'], param_guesses, sigma=sigma,
+        absolute_sigma=energy_noise is not None,
+        jac=lambda V, *p: jacobian(V, *p))
     p_standard_deviations = np.sqrt(np.diag(pcov))
-    return birch_murnaghan_relation(volume_grid, *params), params, p_standard_deviations
+    return relation(volume_grid, *params), params, p_standard_deviations
 
 
 def equation_of_states_rms(data: dict, data_ref: dict):
@@ -128,47 +485,32 @@ def equation_of_states_rms(data: dict, data_ref: dict):
 
     e_computed, p, sd = fit_equation_of_state(data, volume_grid)
     e_reference, p_ref, sd_ref = fit_equation_of_state(data_ref, volume_grid)
-    error()
 
     # TODO(Alex) Check parameter SDs
     return np.sqrt(np.mean((e_computed - e_reference) ** 2))
 
 
+# Index table for the Delta coefficients: delta_index_table[n + 2, i, j] = 1 if i + j = n + 2,
+# for polynomial coefficient indices i, j = 0, ..., 3 and n = -2, ..., 4
+delta_n_values = np.arange(-2, 5)
+delta_index_table = (np.add.outer(np.arange(4), np.arange(4))[None, :, :] ==
+                     (delta_n_values + 2)[:, None, None]).astype(float)
+delta_prefactors = -3. / (2. * delta_n_values + 1.)
 
-# def delta_error():
-#     """
-#
-#     $ \Delta = $
-#
-#     The root mean squared (rms) energy difference between two E vs V curves
-#     averaged over all elemental crystals. (i.e. over all􏰀 volumes).
-#
-#     Provides an intuitive measure of the energy distance between equations of state.
-#
-#     :return:
-#     """
 
-
-def i_plus_j_equal_to_n_plus_2(n_values, i_plus_j):
+def delta_coefficients_array(a: np.ndarray, a_ref: np.ndarray) -> np.ndarray:
     """
+    Vectorised Delta coefficients, x_n, for n = -2, ..., 4 (see delta_coefficients),
+    for any number of pairs of equations of state.
 
-    Reference:
-    https://stackoverflow.com/questions/34517540/find-all-combinations-of-a-list-of-numbers-with-a-given-sum
-
-    :param n_values:
-    :param i_plus_j:
-    :return:
+    :param a: coefficients [a_0, a_1, a_2, a_3] of the polynomial form of the
+              Birch-Murnaghan equation, with shape (..., 4)
+    :param a_ref: reference coefficients, with shape (..., 4)
+    :return: Delta coefficients with shape (..., 7), ordered by n = -2, ..., 4
     """
-    i_j_values_equal_to_n_plus_2 = {}
-    for n_plus_2 in n_values:
-        # Might be better to not have this all in-place (i.e creating extra work)
-        result = [seq for index in range(len(i_plus_j), 0, -1)
-                  for seq in itertools.combinations(i_plus_j, index)
-                  if sum(seq) == n_plus_2]
-        # where list(set( )) removes duplicates
-        meaningful_results = list(set([ij for ij in result if len(ij) == 2]))
-        i_j_values_equal_to_n_plus_2[n_plus_2 - 2] = meaningful_results
-    return i_j_values_equal_to_n_plus_2
+    d = np.asarray(a, dtype=float) - np.asarray(a_ref, dtype=float)
+    assert d.shape[-1] == 4, "Expect coefficients [a_0, a_1, a_2, a_3]"
+    return delta_prefactors * np.einsum('nij,...i,...j->...n', delta_index_table, d, d)
 
 
 def delta_coefficients(a, a_ref):
@@ -189,33 +531,7 @@ def delta_coefficients(a, a_ref):
     :param a_ref: coefficients of the Birch-Murnaghan equation, for the reference data
     :return: Delta coefficients, x_n
     """
-    assert len(a) == 4, "Expect coefficients [a_0, a_1, a_2, a_3, a_4]"
-
-    i = (0, 1, 2, 3)
-    j = (0, 1, 2, 3)
-    i_plus_j = i + j
-    n_values = (-2, -1, 0, 1, 2, 3, 4)
-    n_plus_two = [n + 2 for n in n_values]
-    # Could just compute once and tabulate
-    ij_values = i_plus_j_equal_to_n_plus_2(n_plus_two, i_plus_j)
-
-    x = {}
-    for n, ij_permutations in ij_values.items():
-        prefactor = - 3 / (2 * n + 1)
-        x_value = 0
-        for ij in ij_permutations:
-            i, j = ij
-            x_value += (a[i] - a_ref[i]) * (a[j] - a_ref[j])
-        x[n] = prefactor * x_value
-
-    return x
-
-
-
-
-
-
-
-
-
-
+    assert len(a) == 4, "Expect coefficients [a_0, a_1, a_2, a_3]"
+    assert len(a_ref) == 4, "Expect coefficients [a_0, a_1, a_2, a_3]"
+    x = delta_coefficients_array(a, a_ref)
+    return {int(n): float(x[i]) for i, n in enumerate(delta_n_values)}
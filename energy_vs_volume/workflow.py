@@ -0,0 +1,149 @@
+"""
+Energy vs volume curves for any qcore bravais lattice, with all volume points
+of all crystals submitted concurrently.
+
+Each point is an independent qcore process, so points are run in a thread pool:
+threads only wait on their subprocess. Crystals are never modified; every point
+is generated from a shallow copy with its own lattice parameters.
+
+Optionally, curves are warm-started: see src/warm_start.py.
+"""
+
+import concurrent.futures
+import typing
+import numpy as np
+
+from src import qcore_input_strings as qcore_input
+from src.warm_start import run_chain, outward_chains
+
+from energy_vs_volume import ev_functions
+
+default_lattice_constant_factors = np.linspace(0.8, 1.2, 21, endpoint=True)
+
+
+def energy_vs_volume_inputs(crystal: dict,
+                            settings: dict,
+                            named_result: str,
+                            lattice_constant_factors=default_lattice_constant_factors) -> typing.Iterator:
+
+    """
+    Generate qcore inputs for an energy vs volume curve, without modifying crystal.
+
+    Parameters
+    ----------
+    crystal : dict
+        Crystal data, with fractional positions
+    settings : dict
+        qcore xtb options
+    named_result : str
+        qcore named result
+    lattice_constant_factors : np.ndarray, optional
+        Isotropic lattice constant scaling factors
+
+    Returns
+    -------
+    inputs : iterator of tuple(float, float, str)
+        Lattice constant factor, cell volume and qcore input string of each point.
+        Volume is in the cube of the crystal's lattice constant unit.
+    """
+
+    crystals = ev_functions.energy_vs_volume_crystals(crystal, lattice_constant_factors)
+    for factor, scaled_crystal in zip(lattice_constant_factors, crystals):
+        input_string = qcore_input.xtb_input_string(scaled_crystal, settings, named_result=named_result)
+        yield factor, ev_functions.crystal_volume(scaled_crystal), input_string
+
+
+def _submit_curve(executor, crystal, settings, named_result, lattice_constant_factors, warm_start,
+                  store=None) -> list:
+    """
+    Submit the points of one curve. Cold points are submitted individually.
+    Warm-started points are submitted as two chains, walking outward from
+    the factor closest to 1.
+    """
+    crystals = ev_functions.energy_vs_volume_crystals(crystal, lattice_constant_factors)
+    parameters = [{'lattice_constant_factor': factor, 'volume': ev_functions.crystal_volume(scaled_crystal)}
+                  for factor, scaled_crystal in zip(lattice_constant_factors, crystals)]
+    if warm_start:
+        start = int(np.argmin(np.abs(np.asarray(lattice_constant_factors) - 1.)))
+        chains = [chain for chain in outward_chains(len(crystals), start) if chain]
+    else:
+        chains = [[i] for i in range(len(crystals))]
+    return [(chain, executor.submit(run_chain, [(crystals[i], settings) for i in chain], named_result,
+                                    warm_start=warm_start, store=store,
+                                    parameters=[parameters[i] for i in chain]))
+            for chain in chains]
+
+
+def run_energy_vs_volume(crystals: typing.Dict[str, dict],
+                         settings: dict,
+                         lattice_constant_factors=default_lattice_constant_factors,
+                         max_workers=None,
+                         executor=None,
+                         warm_start=False,
+                         store=None) -> typing.Dict[str, dict]:
+
+    """
+    Compute energy vs volume curves of several crystals, submitting every
+    (crystal, volume) point concurrently.
+
+    Parameters
+    ----------
+    crystals : dict
+        Keys = crystal names, values = crystal data. Any qcore bravais lattice.
+    settings : dict
+        qcore xtb options, common to all crystals
+    lattice_constant_factors : np.ndarray, optional
+        Isotropic lattice constant scaling factors
+    max_workers : int, optional
+        Number of concurrent qcore processes. Only used if executor is None
+    executor : concurrent.futures.Executor, optional
+        Executor to submit qcore runs to
+    warm_start : bool, optional
+        If True, each curve is run as two chains walking outward from the
+        bulk lattice constant, with each point's SCF starting from the
+        converged charges of its neighbour. Chains of all crystals run
+        concurrently, but points within a chain run in order.
+    store : results_store.ResultsStore, optional
+        If given, every run is recorded, with sweep name '<crystal name>_volume'
+
+    Returns
+    -------
+    results : dict
+        Keys = crystal names. Values = dict with keys 'lattice_constant_factors',
+        'volumes', 'energies', 'n_iter' and 'n_runs', as np.ndarrays.
+        Energies of failed runs are NaN, and their iteration counts are 0.
+        n_iter and n_runs include warm-started runs that qcore rejected
+    """
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    futures = {}
+    try:
+        for name, crystal in crystals.items():
+            futures[name] = _submit_curve(executor, crystal, settings, name + '_volume',
+                                          lattice_constant_factors, warm_start, store)
+
+        results = {}
+        for name, crystal in crystals.items():
+            point_results = [{}] * len(lattice_constant_factors)
+            for chain, future in futures[name]:
+                for i, result in zip(chain, future.result()):
+                    point_results[i] = result
+
+            energies = np.array([result.get('energy', np.nan) for result in point_results])
+            for factor in np.asarray(lattice_constant_factors)[np.isnan(energies)]:
+                print(name, 'no result:', factor)
+            volumes = [ev_functions.crystal_volume(scaled_crystal) for scaled_crystal in
+                       ev_functions.energy_vs_volume_crystals(crystal, lattice_constant_factors)]
+            results[name] = {'lattice_constant_factors': np.array(lattice_constant_factors),
+                             'volumes': np.array(volumes),
+                             'energies': energies,
+                             'n_iter': np.array([result.get('n_iter', 0) for result in point_results], dtype=int),
+                             'n_runs': np.array([result.get('n_runs', 1) for result in point_results], dtype=int)}
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return results
@@ -6,7 +6,8 @@ from ewald_convergence.crystals import *  # Import all crystals
 from src.run_qcore import run_qcore
 
 from modules.electronic_structure.structure import atoms
-from modules.electronic_structure.structure import bravais, supercell
+from modules.electronic_structure.structure import supercell
+from src import lattice_vectors
 
 # ewald = {"real": 40, "reciprocal": 20, "alpha": 0.2}
 # named_result = "conventional_mgo"
@@ -27,7 +28,7 @@ def super_cell_from_crystal(rutile: dict, cell_integers: list) -> dict:
     # Extract data
     a = rutile['lattice_parameters']['a'].value
     c = rutile['lattice_parameters']['c'].value
-    lattice = bravais.simple_tetragonal(a, c)
+    lattice = lattice_vectors.simple_tetragonal(a, c)
     positions_angstrom = [np.matmul(lattice, pos) for pos in rutile['fractional']]
     species = rutile['species']
 
@@ -0,0 +1,264 @@
+"""
+Automated convergence of the Ewald parameters (real cutoff, k_max, alpha).
+
+Procedure (see notes in plot_ewald.py and
+https://www.scd.stfc.ac.uk/Pages/DL_POLY-FAQs.aspx#FAQQ5):
+ 1. Fix the real-space cutoff, and start from a generous k_max.
+ 2. Probe alpha on a logarithmic grid to locate the plateau in E(alpha),
+    then bisect for the smallest alpha on the plateau. Below it, the real-space
+    sum is not converged. The smallest alpha minimises the k_max required.
+ 3. Shrink k_max at fixed alpha, stopping before the energy changes by more
+    than the tolerance.
+
+Probes of each stage are submitted concurrently. Bisection is generalised
+to n-section: each round evaluates n_probes interior points of the bracket
+at once, shrinking the bracket by a factor of n_probes + 1.
+"""
+
+import concurrent.futures
+import typing
+import numpy as np
+
+# Energy tolerance in Ha
+default_tolerance = 1.e-6
+default_alpha_range = (0.01, 2.)
+
+
+def ewald_key(ewald: dict) -> tuple:
+    return ewald['real'], ewald['reciprocal'], ewald['alpha']
+
+
+class EnergyCache:
+    """
+    Memoise energies of parameter sets, such that no parameter set is
+    run twice. Failed runs (None, NaN or exactly zero) are stored as NaN.
+
+    Parameter sets are identified by key, which defaults to the Ewald parameters.
+    """
+    __slots__ = ('energy', 'executor', 'energies', 'key')
+
+    def __init__(self, energy: typing.Callable[[dict], float], executor: concurrent.futures.Executor,
+                 key=ewald_key):
+        self.energy = energy
+        self.executor = executor
+        self.energies = {}
+        self.key = key
+
+    def __call__(self, ewald_points: typing.List[dict]) -> np.ndarray:
+        """ Energies of several parameter sets, evaluating new ones concurrently """
+        keys = [self.key(ewald) for ewald in ewald_points]
+        new = {key: ewald for key, ewald in zip(keys, ewald_points) if key not in self.energies}
+        futures = {key: self.executor.submit(self.energy, ewald) for key, ewald in new.items()}
+        for key, future in futures.items():
+            energy = future.result()
+            self.energies[key] = np.nan if (energy is None or energy == 0) else float(energy)
+        return np.array([self.energies[key] for key in keys])
+
+    @property
+    def n_runs(self) -> int:
+        return len(self.energies)
+
+
+def n_section(converged: typing.Callable[[np.ndarray], np.ndarray],
+              lower, upper, n_probes: int, resolution, integer=False, log=False):
+
+    """
+    Find the smallest x in (lower, upper] for which converged(x) is True,
+    assuming converged(lower) is False and converged(upper) is True.
+
+    Parameters
+    ----------
+    converged : callable
+        Maps an array of x to an array of bool. Each call is one concurrent batch
+    lower, upper : float or int
+        Bracket
+    n_probes : int
+        Number of points evaluated per round. 1 = bisection
+    resolution : float
+        Stop when upper - lower (or upper / lower, if log) is below resolution
+    integer : bool, optional
+        Search over integers
+    log : bool, optional
+        Place probes uniformly in log(x)
+
+    Returns
+    -------
+    upper : float or int
+        Smallest x found to be converged
+    """
+
+    def width(lower, upper):
+        return upper / lower if log else upper - lower
+
+    while width(lower, upper) > resolution:
+        if log:
+            x = np.geomspace(lower, upper, n_probes + 2)[1:-1]
+        else:
+            x = np.linspace(lower, upper, n_probes + 2)[1:-1]
+        if integer:
+            x = np.unique(np.round(x).astype(int))
+            x = x[(x > lower) & (x < upper)]
+            if x.size == 0:
+                break
+
+        is_converged = converged(x)
+        lower = x[~is_converged].max() if (~is_converged).any() else lower
+        larger = x[is_converged & (x > lower)]
+        upper = larger.min() if larger.size else upper
+
+    return upper
+
+
+def alpha_plateau(energies: EnergyCache, real: float, reciprocal: int,
+                  alpha_range=default_alpha_range, n_probes=8, tolerance=default_tolerance, n_coarse=8) \
+        -> typing.Tuple[float, float]:
+
+    """
+    Locate the plateau in E(alpha) at fixed cutoffs, and bisect for its lower edge.
+
+    Parameters
+    ----------
+    energies : EnergyCache
+    real : float
+        Real-space cutoff
+    reciprocal : int
+        k_max
+    alpha_range : tuple of float, optional
+        Range of alpha to search
+    n_probes : int, optional
+        Number of concurrent probes per batch
+    tolerance : float, optional
+        Energy tolerance defining the plateau
+    n_coarse : int, optional
+        Number of logarithmically-spaced alphas used to locate the plateau
+
+    Returns
+    -------
+    alpha : float
+        Smallest alpha, to within 5%, for
+        which the energy agrees with the plateau energy
+    plateau_energy : float
+        Energy of the plateau. NaN if no plateau was found
+    """
+
+    def ewald(alpha):
+        return {'real': real, 'reciprocal': reciprocal, 'alpha': float(alpha)}
+
+    alphas = np.geomspace(*alpha_range, n_coarse)
+    coarse = energies([ewald(alpha) for alpha in alphas])
+    differences = np.abs(np.diff(coarse))
+    if np.all(np.isnan(differences)):
+        return np.nan, np.nan
+
+    # Plateau = flattest pair of neighbouring probes
+    i = int(np.nanargmin(differences))
+    plateau_energy = coarse[i + 1]
+    if differences[i] > tolerance:
+        print("No plateau in E(alpha) to within tolerance. Increase k_max or the real-space cutoff")
+        return np.nan, np.nan
+
+    def converged(alpha):
+        return np.abs(energies([ewald(a) for a in alpha]) - plateau_energy) < tolerance
+
+    # Walk down to the first coarse probe off the plateau
+    on_plateau = np.abs(coarse - plateau_energy) < tolerance
+    off = np.nonzero(~on_plateau[:i + 1])[0]
+    if off.size == 0:
+        return alphas[0], plateau_energy
+
+    alpha = n_section(converged, alphas[off[-1]], alphas[off[-1] + 1], n_probes, resolution=1.05, log=True)
+    return float(alpha), plateau_energy
+
+
+def shrink_k_max(energies: EnergyCache, real: float, alpha: float, reciprocal: int,
+                 n_probes=8, tolerance=default_tolerance) -> int:
+
+    """
+    Smallest k_max for which the energy agrees with that at reciprocal
+
+    Parameters
+    ----------
+    energies : EnergyCache
+    real : float
+        Real-space cutoff
+    alpha : float
+        Ewald broadening
+    reciprocal : int
+        Converged k_max to shrink from
+    n_probes : int, optional
+        Number of concurrent probes per batch
+    tolerance : float, optional
+        Energy tolerance
+
+    Returns
+    -------
+    k_max : int
+    """
+
+    def ewald(k):
+        return {'real': real, 'reciprocal': int(k), 'alpha': alpha}
+
+    reference = energies([ewald(reciprocal)])[0]
+
+    def converged(k):
+        return np.abs(energies([ewald(ki) for ki in k]) - reference) < tolerance
+
+    if converged(np.array([1]))[0]:
+        return 1
+    return int(n_section(converged, 1, reciprocal, n_probes, resolution=1, integer=True))
+
+
+def converge_ewald(energy: typing.Callable[[dict], float],
+                   real: float,
+                   reciprocal=20,
+                   alpha_range=default_alpha_range,
+                   tolerance=default_tolerance,
+                   n_probes=8,
+                   n_coarse=8,
+                   max_workers=None) -> dict:
+
+    """
+    Find converged Ewald parameters for a fixed real-space cutoff.
+
+    Parameters
+    ----------
+    energy : callable
+        Total energy for a dictionary {'real': float, 'reciprocal': int, 'alpha': float},
+        as used in ewald.py. None, NaN or zero signifies a failed run.
+        Called concurrently from a thread pool.
+    real : float
+        Real-space cutoff, fixed
+    reciprocal : int, optional
+        Starting k_max. Should be large enough to give a plateau in E(alpha)
+    alpha_range : tuple of float, optional
+        Range of alpha to search
+    tolerance : float, optional
+        Energy tolerance in Ha, with respect to the plateau energy.
+        Split equally between the alpha and k_max searches
+    n_probes : int, optional
+        Number of concurrent probes per batch
+    n_coarse : int, optional
+        Number of alphas in the initial, concurrent, search for the plateau
+    max_workers : int, optional
+        Number of concurrent runs. Defaults to n_probes
+
+    Returns
+    -------
+    ewald : dict
+        Converged 'real', 'reciprocal' and 'alpha', the converged 'energy',
+        and 'n_runs', the number of energy evaluations
+    """
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or max(n_probes, n_coarse)) as executor:
+        energies = EnergyCache(energy, executor)
+        alpha, plateau_energy = alpha_plateau(energies, real, reciprocal, alpha_range, n_probes,
+                                              0.5 * tolerance, n_coarse)
+        if np.isnan(alpha):
+            return {'real': real, 'reciprocal': reciprocal, 'alpha': np.nan,
+                    'energy': np.nan, 'n_runs': energies.n_runs}
+
+        k_max = shrink_k_max(energies, real, alpha, reciprocal, n_probes, 0.5 * tolerance)
+        final_energy = energies([{'real': real, 'reciprocal': k_max, 'alpha': alpha}])[0]
+
+    return {'real': real, 'reciprocal': k_max, 'alpha': alpha,
+            'energy': final_energy, 'n_runs': energies.n_runs}
@@ -1,6 +1,7 @@
 """ See if Ewald converges """
 
 import collections
+import concurrent.futures
 import numpy as np
 import subprocess
 import json
@@ -9,12 +10,19 @@ from crystal_system import cubic
 from src.pymatgen_wrappers import cif_parser_wrapper
 from src import qcore_input_strings as qcore_input
 from src.utils import Set
+from src.results_store import ResultsStore
+from src import sweep
+from src.warm_start import run_chain
+from ewald_convergence import convergence
 
 
-def convention_sodium_chloride(named_result, ewald):
+def conventional_sodium_chloride_crystal():
     fname = '../' + cubic.conventional_fcc_cifs['sodium_chloride'].file
-    crystal = cif_parser_wrapper(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
-    settings = collections.OrderedDict([
+    return cif_parser_wrapper(fname, is_primitive_cell=False, fractional=True, bravais='cubic')
+
+
+def ewald_settings(ewald):
+    return collections.OrderedDict([
         ('h0_cutoff',               Set(40, 'bohr')),
         ('overlap_cutoff',          Set(40, 'bohr')),
         ('repulsive_cutoff',        Set(40, 'bohr')),
@@ -26,7 +34,10 @@ def convention_sodium_chloride(named_result, ewald):
         ('temperature',             Set(0, 'kelvin'))
     ])
 
-    input_string = qcore_input.xtb_input_string(crystal, settings, named_result=named_result)
+
+def convention_sodium_chloride(named_result, ewald):
+    crystal = conventional_sodium_chloride_crystal()
+    input_string = qcore_input.xtb_input_string(crystal, ewald_settings(ewald), named_result=named_result)
     return input_string
 
 named_result = "conventional_nacl"
@@ -45,22 +56,28 @@ def run_qcore(input_string):
 
 
 
-def sweep_values():
+def sweep_values(max_workers=None, warm_start=False):
     # Should also do this for primitive NaCl
     # Want to repeat this for real = 10, 15, 25, 30
     # Want to see if this will need redoing for higher k-sampling
 
-    ewald = {'real': 20}
-    k_cutoffs = [1, 2, 3, 4, 6, 8, 10]
+    settings = ewald_settings({'real': 20, 'reciprocal': 1, 'alpha': 0.5})
+    crystal = conventional_sodium_chloride_crystal()
+    reciprocal_cutoffs = [1, 2, 3, 4, 6, 8, 10]
     alphas = [0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 1]
 
-    for k in k_cutoffs:
-        for alpha in alphas:
-            ewald['reciprocal'] = k
-            ewald['alpha'] = alpha
-            input_string = convention_sodium_chloride(named_result, ewald)
-            result = run_qcore(input_string)
-            print(ewald['real'], ewald['reciprocal'], ewald['alpha'], result[named_result]['energy'])
+    # One chain per reciprocal cutoff, along increasing alpha, which can be warm-started
+    # once src/warm_start.guess_result is verified. Chains run concurrently
+    chains = [[{'ewald_reciprocal_cutoff': k, 'ewald_alpha': alpha} for alpha in alphas]
+              for k in reciprocal_cutoffs]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_chain, [sweep.apply_point(crystal, settings, point) for point in chain],
+                                   named_result, warm_start=warm_start)
+                   for chain in chains]
+        for chain, future in zip(chains, futures):
+            for point, result in zip(chain, future.result()):
+                print(settings['ewald_real_cutoff'].value, point['ewald_reciprocal_cutoff'], point['ewald_alpha'],
+                      result.get('energy', np.nan), result.get('n_iter'))
 
 
 # Procedure described here: https://www.scd.stfc.ac.uk/Pages/DL_POLY-FAQs.aspx#FAQQ5
@@ -82,4 +99,18 @@ def ewald_energy_minimum():
         print(ewald['real'], ewald['reciprocal'], ewald['alpha'], result[named_result]['energy'])
 
 
-ewald_energy_minimum()
\ No newline at end of file
+def automated_ewald_convergence(ewald_real=20):
+    """ Replace the grids above with an automated search at fixed real-space cutoff.
+        Every run is recorded in the results store """
+    with ResultsStore() as store:
+        def energy(ewald):
+            input_string = convention_sodium_chloride(named_result, ewald)
+            output = store.run_qcore(input_string, named_result, ewald)
+            return output.get(named_result, {}).get('energy')
+
+        converged = convergence.converge_ewald(energy, ewald_real)
+    print(converged['real'], converged['reciprocal'], converged['alpha'], converged['energy'],
+          'in', converged['n_runs'], 'runs')
+
+
+automated_ewald_convergence()
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Size extensivity and scaling of periodic xTB with supercell size.
+
+For each material, n x n x n supercells are built from its cell and run with
+qcore one at a time, with the Monkhorst-Pack grid divided by n such that the
+k-point sampling density stays constant. For each run, the energy, wall time
+and peak memory of qcore are recorded.
+
+ * Size extensivity: the energy per atom of every supercell should equal that
+   of the cell. This is only exact if the supercell's k-points fold onto the
+   cell's grid, see supercell_k_grid.
+ * Scaling: exponents p of wall time ~ N^p and peak memory ~ N^p against the
+   number of atoms N, from a least-squares fit in log-log. With constant
+   k-point density, the number of k-points falls as 1/N, so the exponent of
+   the wall time per k-point is also given.
+
+Run from this folder, as cif paths are relative to it:
+
+    cd size_extensive && PYTHONPATH=.. python scaling.py
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import typing
+import numpy as np
+
+from src import qcore_input_strings as qcore_input, lattice_vectors
+from src.run_qcore import run_qcore_profiled
+from src.utils import Set
+from src.xtb_potential import xtb_potential_str, PotentialType
+from src.pymatgen_wrappers import cif_parser_wrapper
+from crystal_system import cubic
+
+# Energy tolerance in Ha per atom
+default_tolerance = 1.e-6
+default_sizes = (1, 2, 4)
+
+
+def supercell(crystal: dict, n: int) -> dict:
+    """
+    n x n x n supercell of a crystal with fractional positions
+
+    Scaling all lattice vectors by n preserves the Bravais lattice and
+    lattice angles, so only the lattice constants are scaled.
+    """
+    assert 'fractional' in crystal, "Supercells are built from fractional positions"
+    cells = np.array(list(itertools.product(range(n), repeat=3)), dtype=float)
+    fractional = np.asarray(crystal['fractional'], dtype=float)
+    positions = ((cells[:, None, :] + fractional[None, :, :]) / n).reshape(-1, 3)
+    lattice_parameters = {key: (Set(n * parameter.value, parameter.unit)
+                                if key in lattice_vectors.length_keys else parameter)
+                          for key, parameter in crystal['lattice_parameters'].items()}
+    return dict(crystal,
+                fractional=positions.tolist(),
+                species=list(crystal['species']) * len(cells),
+                lattice_parameters=lattice_parameters,
+                n_atoms=len(crystal['species']) * len(cells))
+
+
+def supercell_k_grid(mesh: typing.Sequence[int], n: int) -> typing.Tuple[list, bool]:
+
+    """
+    Monkhorst-Pack grid of an n x n x n supercell with the k-point density of mesh
+
+    Returns
+    -------
+    grid : list of int
+        ceil(mesh / n), at least 1
+    exact : bool
+        Whether the supercell's k-points fold onto exactly the k-points of mesh.
+        This requires n to divide mesh, and, as even grids are offset from Gamma
+        and odd grids are not, mesh / n to be even where mesh is even
+    """
+
+    grid = [max(1, -(-m // n)) for m in mesh]
+    exact = all(m % n == 0 and (m % 2 == 1 or (m // n) % 2 == 0) for m in mesh)
+    return grid, exact
+
+
+def fit_exponent(n_atoms: np.ndarray, values: np.ndarray) -> float:
+    """ Exponent p of values ~ n_atoms^p, from a least-squares fit in log-log. NaN with fewer than two points """
+    usable = np.isfinite(values) & (values > 0)
+    if np.unique(n_atoms[usable]).size < 2:
+        return np.nan
+    return np.polyfit(np.log(n_atoms[usable]), np.log(values[usable]), 1)[0]
+
+
+def run_scaling(materials: typing.Dict[str, tuple],
+                sizes=default_sizes,
+                tolerance=default_tolerance,
+                max_workers=1) -> typing.Dict[str, dict]:
+
+    """
+    Run the supercells of several materials, one at a time by default
+
+    Parameters
+    ----------
+    materials : dict
+        Keys = names, used as named results. Values = (crystal, settings), where
+        settings contain the 'monkhorst_pack' of the cell
+    sizes : sequence of int, optional
+        Supercell sizes n, for n x n x n supercells. Should include 1
+    tolerance : float, optional
+        Tolerance on the energy per atom of supercells, relative to the smallest size
+        with an exact k-grid, in Ha
+    max_workers : int, optional
+        Number of concurrent qcore processes. Defaults to 1, as concurrent runs
+        compete for cores, and their wall times then measure contention rather
+        than scaling. Peak memory is per process, so is unaffected
+
+    Returns
+    -------
+    results : dict
+        Keys = names. Values = dict of 'runs', a list with the 'size', 'n_atoms',
+        'monkhorst_pack', 'exact_k_grid', 'energy_per_atom', 'wall_time' (s) and
+        'peak_memory' (MB) of each supercell, the 'time_exponent', 'memory_exponent'
+        and 'time_per_k_point_exponent', the 'max_deviation' in energy per atom
+        over supercells with exact k-grids, NaN if there are fewer than two, and 'extensive'
+    """
+
+    def run(name, crystal, settings, n):
+        mesh, exact = supercell_k_grid(settings['monkhorst_pack'].value, n)
+        settings = collections.OrderedDict(settings)
+        settings['monkhorst_pack'] = Set(mesh)
+        named_result = name + '_' + str(n) + 'x' + str(n) + 'x' + str(n)
+        cell = supercell(crystal, n)
+        input_string = qcore_input.xtb_input_string_cleaner(crystal=cell, options=settings, named_result=named_result)
+        output, wall_time, peak_memory = run_qcore_profiled(input_string)
+        energy = output.get(named_result, {}).get('energy', np.nan)
+        return {'size': n, 'n_atoms': cell['n_atoms'], 'monkhorst_pack': mesh, 'exact_k_grid': exact,
+                'energy_per_atom': energy / cell['n_atoms'], 'wall_time': wall_time, 'peak_memory': peak_memory}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: [executor.submit(run, name, crystal, settings, n) for n in sorted(sizes)]
+                   for name, (crystal, settings) in materials.items()}
+        runs = {name: [future.result() for future in material_futures]
+                for name, material_futures in futures.items()}
+
+    results = {}
+    for name, material_runs in runs.items():
+        column = {key: np.array([run[key] for run in material_runs], dtype=float)
+                  for key in ('n_atoms', 'energy_per_atom', 'wall_time', 'peak_memory')}
+        n_k_points = np.array([np.prod(run['monkhorst_pack']) for run in material_runs], dtype=float)
+        exact = np.array([run['exact_k_grid'] for run in material_runs])
+        # Relative to the first run with an exact k-grid. NaN if any of those runs failed, or there is
+        # nothing to compare: fewer than two exact runs
+        exact_energies = column['energy_per_atom'][exact]
+        max_deviation = np.max(np.abs(exact_energies - exact_energies[0])) if exact_energies.size > 1 else np.nan
+        results[name] = {'runs': material_runs,
+                         'time_exponent': fit_exponent(column['n_atoms'], column['wall_time']),
+                         'memory_exponent': fit_exponent(column['n_atoms'], column['peak_memory']),
+                         'time_per_k_point_exponent': fit_exponent(column['n_atoms'],
+                                                                   column['wall_time'] / n_k_points),
+                         'max_deviation': max_deviation,
+                         'extensive': bool(max_deviation <= tolerance)}
+    return results
+
+
+def print_scaling(results: typing.Dict[str, dict]) -> None:
+    """ Table of the runs of each material, and their scaling exponents """
+    for name, result in results.items():
+        print(name, 'max |dE/atom| = {:.1e} Ha, {}'.format(
+            result['max_deviation'], 'size extensive' if result['extensive'] else 'NOT size extensive'))
+        print('size'.ljust(6) + 'atoms'.ljust(7) + 'monkhorst_pack'.ljust(16) + 'E/atom (Ha)'.ljust(18) +
+              'wall time (s)'.ljust(15) + 'peak memory (MB)')
+        for run in result['runs']:
+            print(str(run['size']).ljust(6) + str(run['n_atoms']).ljust(7) +
+                  (str(run['monkhorst_pack']) + ('' if run['exact_k_grid'] else '*')).ljust(16) +
+                  '{:<18.9f}{:<15.2f}{:.1f}'.format(run['energy_per_atom'], run['wall_time'], run['peak_memory']))
+        print('Exponents: wall time {:.2f}, wall time per k-point {:.2f}, peak memory {:.2f}'.format(
+            result['time_exponent'], result['time_per_k_point_exponent'], result['memory_exponent']))
+    if any(not run['exact_k_grid'] for result in results.values() for run in result['runs']):
+        print('* k-points do not fold onto those of the cell: energy per atom not compared')
+
+
+def default_settings(monkhorst_pack: list) -> collections.OrderedDict:
+    """ Settings of the size extensivity tests, as in nacl.py """
+    return collections.OrderedDict([
+        ('h0_cutoff',               Set(40, 'bohr')),
+        ('overlap_cutoff',          Set(40, 'bohr')),
+        ('repulsive_cutoff',        Set(40, 'bohr')),
+        ('ewald_real_cutoff',       Set(10, 'bohr')),
+        ('ewald_reciprocal_cutoff', Set(1)),
+        ('ewald_alpha',             Set(0.5)),
+        ('monkhorst_pack',          Set(monkhorst_pack)),
+        ('symmetry_reduction',      Set(True)),
+        ('temperature',             Set(0, 'kelvin')),
+        ('potential_type',          Set(xtb_potential_str(PotentialType.TRUNCATED)))
+    ])
+
+
+def default_materials() -> typing.Dict[str, tuple]:
+    """ Conventional NaCl and MgO, and primitive silicon, with k-grids that fold exactly for default_sizes """
+    materials = {}
+    for name in ['sodium_chloride', 'magnesium_oxide']:
+        crystal = cif_parser_wrapper('../' + cubic.conventional_fcc_cifs[name].file,
+                                     is_primitive_cell=False, bravais='cubic')
+        materials[name] = (crystal, default_settings([8, 8, 8]))
+    materials['silicon'] = (cubic.silicon(), default_settings([8, 8, 8]))
+    return materials
+
+
+if __name__ == '__main__':
+    print_scaling(run_scaling(default_materials()))
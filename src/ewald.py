@@ -0,0 +1,234 @@
+""" Reference Ewald summation for point charges in arbitrary periodic cells.
+
+    Evaluates the real-space, reciprocal-space, self and neutralising-background
+    terms of the Ewald energy, and optionally the xTB correction that replaces
+    1/r with the xTB Coulomb kernel 1 / sqrt(r^2 + eta^-2) (see
+    ewald_convergence/xtb_real_space.py). Together with analytic error
+    estimates, this allows Ewald parameters to be screened in milliseconds,
+    before spending qcore time.
+
+    Conventions follow qcore's inputs:
+     * alpha is the square of the Ewald splitting parameter, such that the
+       real-space kernel is erfc(sqrt(alpha) r) / r
+     * Atomic units: positions in bohr, charges in e, energies in Ha
+     * Lattice vectors are the columns of a 3x3 matrix (see lattice_vectors.py)
+
+    Error estimates are those of Kolafa and Perram, Mol. Simul. 9, 351 (1992),
+    https://doi.org/10.1080/08927029208049126
+"""
+
+import typing
+import numpy as np
+import scipy.optimize
+import scipy.special
+
+from src import lattice_vectors
+from src import neighbour_list
+
+# Upper bound on the number of elements of temporary arrays
+_chunk_size = 2 ** 20
+
+
+def _pair_eta(eta: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """ xTB pair hardness, the harmonic mean of the atomic hardnesses """
+    return 2. / (1. / eta[i] + 1. / eta[j])
+
+
+def real_space_energy(lattice: np.ndarray, positions: np.ndarray, charges: np.ndarray,
+                      alpha: float, cutoff: float, eta=None, neighbours=None) -> typing.Tuple[float, float]:
+
+    """
+    Real-space Ewald energy, and the xTB correction, 1/2 sum_ij q_i q_j (gamma_ij - 1/r_ij)
+
+    neighbours is an optional neighbour_list.NeighbourList with a cutoff of
+    at least cutoff, such that one list is reused across alphas or sweep points.
+
+    Returns
+    -------
+    real, xtb : float
+        xtb is zero if eta is None
+    """
+
+    if neighbours is None:
+        neighbours = neighbour_list.NeighbourList(lattice, positions, cutoff)
+    assert neighbours.cutoff >= cutoff, "Neighbour list cutoff is smaller than the real-space cutoff"
+
+    beta = np.sqrt(alpha)
+    real, xtb = 0., 0.
+    # Each unordered pair is stored once, hence no factor of 1/2
+    for i, j, r in neighbours.distance_batches(positions, lattice):
+        within = r < cutoff
+        i, j, r = i[within], j[within], r[within]
+        qq = charges[i] * charges[j]
+        real += np.sum(qq * scipy.special.erfc(beta * r) / r)
+        if eta is not None:
+            xtb += np.sum(qq * (1. / np.sqrt(r * r + _pair_eta(eta, i, j) ** -2) - 1. / r))
+
+    # On-site term of the xTB kernel, gamma_ii(0) = eta_i
+    if eta is not None:
+        xtb += 0.5 * np.sum(charges ** 2 * eta)
+    return real, xtb
+
+
+def reciprocal_space_energy(lattice: np.ndarray, positions: np.ndarray, charges: np.ndarray,
+                            alpha: float, cutoff: float) -> float:
+
+    """
+    Reciprocal-space Ewald energy, (2 pi / V) sum_{G != 0} exp(-G^2 / 4 alpha) / G^2 |S(G)|^2
+
+    The structure factor is separable in the Miller indices (m1, m2, m3) of G:
+    S(G) = sum_j q_j e1_j^m1 e2_j^m2 e3_j^m3, with e_j = exp(i b . r_j). It is
+    evaluated on the box of Miller indices enclosing |G| < cutoff as a matrix
+    product over charges, for the half space m1 >= 0, using S(-G) = S(G)*.
+    """
+
+    reciprocal = lattice_vectors.reciprocal_lattice_vectors(lattice)
+    volume = lattice_vectors.volume(lattice)
+    m_max = np.floor(cutoff * np.linalg.norm(lattice, axis=0) / (2. * np.pi)).astype(int)
+    if not np.any(m_max):
+        return 0.
+
+    # Phase factors exp(i m b_k . r_j) for each lattice direction k, shape (n, 2 m_k + 1)
+    m = [np.arange(-mk, mk + 1) for mk in m_max]
+    phases = positions @ reciprocal
+    e1, e2, e3 = [np.exp(1j * phases[:, k, None] * m[k][None, :]) for k in range(3)]
+    e1 = e1[:, m_max[0]:] * charges[:, None]
+
+    # G vectors and weights of the half-space box
+    m1, m2, m3 = np.meshgrid(m[0][m_max[0]:], m[1], m[2], indexing='ij')
+    G = np.stack([m1, m2, m3], -1) @ reciprocal.T
+    G2 = np.sum(G * G, axis=-1)
+    G2[G2 == 0.] = np.inf
+    weight = np.where(G2 < cutoff ** 2, np.exp(-G2 / (4. * alpha)) / G2, 0.)
+    weight[1:] *= 2.
+
+    energy = 0.
+    batch = max(1, _chunk_size // (positions.shape[0] * e2.shape[1]))
+    for start in range(0, e1.shape[1], batch):
+        planes = slice(start, start + batch)
+        product = (e1[:, planes, None] * e2[:, None, :]).reshape(positions.shape[0], -1)
+        structure_factor = (product.T @ e3).reshape(weight[planes].shape)
+        energy += np.sum(weight[planes] * np.abs(structure_factor) ** 2)
+
+    return 2. * np.pi / volume * energy
+
+
+def ewald_energy(lattice: np.ndarray,
+                 positions: np.ndarray,
+                 charges: np.ndarray,
+                 alpha: float,
+                 real_cutoff: float,
+                 reciprocal_cutoff: float,
+                 eta=None,
+                 neighbours=None) -> typing.Dict[str, float]:
+
+    """
+    Ewald energy of point charges in a periodic cell.
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns, in bohr
+    positions : np.ndarray
+        Cartesian positions with shape (n, 3), in bohr
+    charges : np.ndarray
+        Charges with shape (n)
+    alpha : float
+        Square of the Ewald splitting parameter, in bohr^-2
+    real_cutoff : float
+        Real-space cutoff, in bohr
+    reciprocal_cutoff : float
+        Cutoff on |G|, in bohr^-1
+    eta : np.ndarray, optional
+        xTB atomic hardnesses, with shape (n). If given, the difference
+        between the xTB kernel and 1/r is added in real space. This decays
+        as -1 / (2 eta^2 r^3), so converges more slowly with real_cutoff
+        than the Ewald terms.
+    neighbours : neighbour_list.NeighbourList, optional
+        Prebuilt neighbour list with a cutoff of at least real_cutoff
+
+    Returns
+    -------
+    energy : dict
+        Keys = 'real', 'reciprocal', 'self', 'background', 'xtb', 'total', in Ha.
+        The background term neutralises a net cell charge.
+    """
+
+    lattice = np.asarray(lattice, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    charges = np.asarray(charges, dtype=float)
+    assert positions.shape == (charges.size, 3), "Expect positions with shape (n_charges, 3)"
+    if eta is not None:
+        eta = np.broadcast_to(np.asarray(eta, dtype=float), charges.shape)
+
+    volume = lattice_vectors.volume(lattice)
+    real, xtb = real_space_energy(lattice, positions, charges, alpha, real_cutoff, eta, neighbours)
+    energy = {'real': real,
+              'reciprocal': reciprocal_space_energy(lattice, positions, charges, alpha, reciprocal_cutoff),
+              'self': -np.sqrt(alpha / np.pi) * np.sum(charges ** 2),
+              'background': -np.pi * np.sum(charges) ** 2 / (2. * volume * alpha),
+              'xtb': xtb}
+    energy['total'] = sum(energy.values())
+    return energy
+
+
+def real_space_error(charges: np.ndarray, volume: float, alpha: float, real_cutoff: float) -> float:
+
+    """
+    Kolafa-Perram estimate of the RMS error in the real-space energy,
+    Q sqrt(R / 2V) exp(-alpha R^2) / (alpha R^2), with Q = sum_i q_i^2
+    """
+
+    q2 = np.sum(np.asarray(charges) ** 2)
+    ar2 = alpha * real_cutoff ** 2
+    return q2 * np.sqrt(real_cutoff / (2. * volume)) * np.exp(-ar2) / ar2
+
+
+def reciprocal_space_error(charges: np.ndarray, volume: float, alpha: float, reciprocal_cutoff: float) -> float:
+
+    """
+    Estimate of the error in the reciprocal-space energy, the sum of:
+     * The systematic error from the truncated self-interaction (i = j) part
+       of |S(G)|^2, Q sqrt(alpha / pi) erfc(G / 2 sqrt(alpha)), in the continuum limit
+     * The Kolafa-Perram RMS error of the remaining terms,
+       Q sqrt(alpha) / pi^2 K^(-3/2) exp(-G^2 / 4 alpha), where K = G L / 2 pi
+       is the cutoff in units of the reciprocal lattice constant of a cube of equal volume
+    with Q = sum_i q_i^2
+    """
+
+    q2 = np.sum(np.asarray(charges) ** 2)
+    beta = np.sqrt(alpha)
+    k = reciprocal_cutoff * volume ** (1. / 3.) / (2. * np.pi)
+    systematic = q2 * beta / np.sqrt(np.pi) * scipy.special.erfc(reciprocal_cutoff / (2. * beta))
+    rms = q2 * beta / np.pi ** 2 * k ** -1.5 * np.exp(-reciprocal_cutoff ** 2 / (4. * alpha))
+    return systematic + rms
+
+
+def ewald_parameters(charges: np.ndarray, volume: float, real_cutoff: float,
+                     tolerance=1.e-6) -> typing.Tuple[float, float]:
+
+    """
+    Smallest alpha, and smallest reciprocal cutoff at that alpha, for which
+    both error estimates are below tolerance, for a fixed real-space cutoff.
+
+    Returns
+    -------
+    alpha : float
+        In bohr^-2
+    reciprocal_cutoff : float
+        In bohr^-1
+    """
+
+    # Errors decrease monotonically with alpha in real space, and with G in reciprocal space
+    def log_ratio(error):
+        return np.log(max(error, np.finfo(float).tiny) / tolerance)
+
+    log_alpha = scipy.optimize.brentq(
+        lambda log_a: log_ratio(real_space_error(charges, volume, np.exp(log_a), real_cutoff)),
+        np.log(1.e-3 / real_cutoff ** 2), np.log(1.e3 / real_cutoff ** 2))
+    alpha = np.exp(log_alpha)
+    g_min = 2. * np.pi / volume ** (1. / 3.)
+    log_g = scipy.optimize.brentq(
+        lambda log_g: log_ratio(reciprocal_space_error(charges, volume, alpha, np.exp(log_g))),
+        np.log(1.e-3 * g_min), np.log(1.e3 * np.sqrt(alpha)))
+    return alpha, np.exp(log_g)
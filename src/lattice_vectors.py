@@ -0,0 +1,352 @@
+""" Lattice vectors, reciprocal lattice vectors and cell volumes for every
+    Bravais lattice in space_groups.qcore_bravais_lattices.
+
+    Lattice vectors are stored as the columns of a 3x3 matrix, such that
+    cartesian = lattice @ fractional. All functions broadcast over leading
+    dimensions: passing arrays of n lattice constants returns an array of
+    shape (n, 3, 3), one set of lattice vectors per parameter set.
+
+    Primitive lattice vectors follow the conventions of
+    Setyawan and Curtarolo, Comp. Mat. Sci. 49, 299 (2010),
+    https://doi.org/10.1016/j.commatsci.2010.05.010
+    where a, b and c are the lattice constants of the conventional cell.
+"""
+
+import typing
+import numpy as np
+
+from src import space_groups
+
+
+def _from_vectors(a1: tuple, a2: tuple, a3: tuple) -> np.ndarray:
+
+    """
+    Pack three lattice vectors into an array with the vectors as columns.
+
+    Parameters
+    ----------
+    a1, a2, a3 : tuple
+        (x, y, z) components of each lattice vector. Components can be
+        floats or arrays of any broadcast-compatible shape.
+
+    Returns
+    -------
+    lattice : np.ndarray
+        Lattice vectors with shape (..., 3, 3), where lattice[..., :, i]
+        is the ith lattice vector.
+    """
+
+    components = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in a1 + a2 + a3])
+    lattice = np.stack(components, axis=-1).reshape(components[0].shape + (3, 3))
+    return np.swapaxes(lattice, -1, -2)
+
+
+def _radians(angle, angle_unit: str):
+    assert angle_unit in ['degree', 'radian']
+    angle = np.asarray(angle, dtype=float)
+    return np.radians(angle) if angle_unit == 'degree' else angle
+
+
+def simple_cubic(a) -> np.ndarray:
+    zero = np.zeros_like(a, dtype=float)
+    return _from_vectors((a, zero, zero), (zero, a, zero), (zero, zero, a))
+
+
+def body_centred_cubic(a) -> np.ndarray:
+    h = 0.5 * np.asarray(a, dtype=float)
+    return _from_vectors((-h, h, h), (h, -h, h), (h, h, -h))
+
+
+def face_centred_cubic(a) -> np.ndarray:
+    h = 0.5 * np.asarray(a, dtype=float)
+    zero = np.zeros_like(h)
+    return _from_vectors((zero, h, h), (h, zero, h), (h, h, zero))
+
+
+def simple_tetragonal(a, c) -> np.ndarray:
+    return simple_orthorhombic(a, a, c)
+
+
+def body_centred_tetragonal(a, c) -> np.ndarray:
+    return body_centred_orthorhombic(a, a, c)
+
+
+def simple_orthorhombic(a, b, c) -> np.ndarray:
+    a, b, c = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (a, b, c)])
+    zero = np.zeros_like(a)
+    return _from_vectors((a, zero, zero), (zero, b, zero), (zero, zero, c))
+
+
+def body_centred_orthorhombic(a, b, c) -> np.ndarray:
+    a, b, c = [0.5 * np.asarray(x, dtype=float) for x in (a, b, c)]
+    return _from_vectors((-a, b, c), (a, -b, c), (a, b, -c))
+
+
+def base_centred_orthorhombic(a, b, c) -> np.ndarray:
+    """ C-centred setting """
+    a, b = [0.5 * np.asarray(x, dtype=float) for x in (a, b)]
+    c = np.asarray(c, dtype=float)
+    zero = np.zeros_like(a + b + c)
+    return _from_vectors((a, -b, zero), (a, b, zero), (zero, zero, c))
+
+
+def face_centred_orthorhombic(a, b, c) -> np.ndarray:
+    a, b, c = [0.5 * np.asarray(x, dtype=float) for x in (a, b, c)]
+    zero = np.zeros_like(a + b + c)
+    return _from_vectors((zero, b, c), (a, zero, c), (a, b, zero))
+
+
+def hexagonal(a, c) -> np.ndarray:
+    h = 0.5 * np.asarray(a, dtype=float)
+    c = np.asarray(c, dtype=float)
+    zero = np.zeros_like(h + c)
+    return _from_vectors((h, -np.sqrt(3) * h, zero), (h, np.sqrt(3) * h, zero), (zero, zero, c))
+
+
+def rhombohedral(a, alpha, angle_unit='degree') -> np.ndarray:
+    a = np.asarray(a, dtype=float)
+    alpha = _radians(alpha, angle_unit)
+    cos_half, sin_half = np.cos(0.5 * alpha), np.sin(0.5 * alpha)
+    ratio = np.cos(alpha) / cos_half
+    zero = np.zeros_like(a + alpha)
+    return _from_vectors((a * cos_half, -a * sin_half, zero),
+                         (a * cos_half, a * sin_half, zero),
+                         (a * ratio, zero, a * np.sqrt(1 - ratio**2)))
+
+
+def simple_monoclinic(a, b, c, alpha, angle_unit='degree') -> np.ndarray:
+    alpha = _radians(alpha, angle_unit)
+    a, b, c = [np.asarray(x, dtype=float) for x in (a, b, c)]
+    zero = np.zeros_like(a + b + c + alpha)
+    return _from_vectors((a, zero, zero), (zero, b, zero), (zero, c * np.cos(alpha), c * np.sin(alpha)))
+
+
+def base_centred_monoclinic(a, b, c, alpha, angle_unit='degree') -> np.ndarray:
+    alpha = _radians(alpha, angle_unit)
+    a, b = [0.5 * np.asarray(x, dtype=float) for x in (a, b)]
+    c = np.asarray(c, dtype=float)
+    zero = np.zeros_like(a + b + c + alpha)
+    return _from_vectors((a, b, zero), (-a, b, zero), (zero, c * np.cos(alpha), c * np.sin(alpha)))
+
+
+def triclinic(a, b, c, alpha, beta, gamma, angle_unit='degree') -> np.ndarray:
+    alpha, beta, gamma = [_radians(x, angle_unit) for x in (alpha, beta, gamma)]
+    a, b, c = [np.asarray(x, dtype=float) for x in (a, b, c)]
+    cos_a, cos_b, cos_g, sin_g = np.cos(alpha), np.cos(beta), np.cos(gamma), np.sin(gamma)
+    c_y = c * (cos_a - cos_b * cos_g) / sin_g
+    c_z = np.sqrt(c**2 - (c * cos_b)**2 - c_y**2)
+    zero = np.zeros_like(a + b + c + alpha + beta + gamma)
+    return _from_vectors((a, zero, zero), (b * cos_g, b * np.sin(gamma), zero), (c * cos_b, c_y, c_z))
+
+
+# Lattice vector function and the lattice parameters qcore requires, per bravais lattice.
+# Parameter names are consistent with pymatgen_wrappers.remove_superflous_parameters
+bravais_lattice_vectors = {
+    'triclinic':                 (triclinic, ('a', 'b', 'c', 'alpha', 'beta', 'gamma')),
+    'monoclinic':                (simple_monoclinic, ('a', 'b', 'c', 'alpha')),
+    'base_centred_monoclinic':   (base_centred_monoclinic, ('a', 'b', 'c', 'alpha')),
+    'orthorhombic':              (simple_orthorhombic, ('a', 'b', 'c')),
+    'body_centred_orthorhombic': (body_centred_orthorhombic, ('a', 'b', 'c')),
+    'base_centred_orthorhombic': (base_centred_orthorhombic, ('a', 'b', 'c')),
+    'face_centred_orthorhombic': (face_centred_orthorhombic, ('a', 'b', 'c')),
+    'tetragonal':                (simple_tetragonal, ('a', 'c')),
+    'body_centred_tetragonal':   (body_centred_tetragonal, ('a', 'c')),
+    'rhombohedral':              (rhombohedral, ('a', 'alpha')),
+    'hexagonal':                 (hexagonal, ('a', 'c')),
+    'cubic':                     (simple_cubic, ('a',)),
+    'bcc':                       (body_centred_cubic, ('a',)),
+    'fcc':                       (face_centred_cubic, ('a',))
+}
+
+assert set(bravais_lattice_vectors.keys()) == set(space_groups.qcore_bravais_lattices)
+
+length_keys = ('a', 'b', 'c')
+angle_keys = ('alpha', 'beta', 'gamma')
+
+
+def get_bravais(crystal: typing.Dict) -> str:
+
+    """
+    Bravais lattice of a crystal, from crystal['bravais'] if present,
+    else from its space group number
+
+    Parameters
+    ----------
+    crystal : dict
+        Crystal data
+
+    Returns
+    -------
+    bravais : str
+        Bravais lattice, as named in space_groups.qcore_bravais_lattices
+    """
+
+    if 'bravais' in crystal:
+        return crystal['bravais']
+    return space_groups.space_group_to_bravais(crystal['space_group'][1])
+
+
+def isotropic_lattice_parameters(lattice_parameters: typing.Dict, lattice_constant_factor: float) -> typing.Dict:
+
+    """
+    Scale all lattice constants by the same factor, leaving the angles and
+    ratios such as c/a fixed. The volume scales by lattice_constant_factor**3.
+
+    Parameters
+    ----------
+    lattice_parameters : dict
+        Lattice constants and angles. Each value has a value and str unit
+    lattice_constant_factor : float
+        Lattice constant scaling factor
+
+    Returns
+    -------
+    lattice_parameters : dict
+        New lattice parameter dictionary. The input dictionary is not modified
+    """
+
+    scaled = {}
+    for key, parameter in lattice_parameters.items():
+        if key in length_keys:
+            scaled[key] = type(parameter)(lattice_constant_factor * parameter.value, parameter.unit)
+        else:
+            scaled[key] = parameter
+    return scaled
+
+
+def lattice_vectors(bravais: str, angle_unit='degree', **parameters) -> np.ndarray:
+
+    """
+    Lattice vectors for any qcore bravais lattice.
+
+    Parameters
+    ----------
+    bravais : str
+        Bravais lattice, as named in space_groups.qcore_bravais_lattices
+    angle_unit : str, optional
+        Unit of lattice angles. Valid options = ['degree', 'radian']
+    **parameters : float or np.ndarray
+        Lattice constants and angles required by the bravais lattice.
+        Arrays of parameters return a batch of lattice vectors.
+        Parameters not required by the bravais lattice are ignored.
+
+    Returns
+    -------
+    lattice : np.ndarray
+        Lattice vectors as columns, with shape (..., 3, 3)
+    """
+
+    assert bravais in space_groups.qcore_bravais_lattices, "bravais lattice not valid: " + str(bravais)
+    function, required_keys = bravais_lattice_vectors[bravais]
+
+    missing_keys = [key for key in required_keys if key not in parameters]
+    assert not missing_keys, bravais + " requires lattice parameters: " + str(missing_keys)
+
+    args = [parameters[key] for key in required_keys]
+    if any(key in angle_keys for key in required_keys):
+        return function(*args, angle_unit=angle_unit)
+    return function(*args)
+
+
+def lattice_vectors_from_parameters(bravais: str, lattice_parameters: typing.Dict) -> np.ndarray:
+
+    """
+    Lattice vectors from a lattice parameter dictionary, as returned by
+    pymatgen_wrappers.cif_parser_wrapper.
+
+    Parameters
+    ----------
+    bravais : str
+        Bravais lattice, as named in space_groups.qcore_bravais_lattices
+    lattice_parameters : dict
+        Lattice constants and angles. Each dictionary value has a value and str unit.
+        Values may be floats or arrays (for batches of parameter sets).
+
+    Returns
+    -------
+    lattice : np.ndarray
+        Lattice vectors as columns, with shape (..., 3, 3), in the
+        length unit of the lattice constants
+    """
+
+    angle_units = set(rhs.unit for key, rhs in lattice_parameters.items() if key in angle_keys)
+    length_units = set(rhs.unit for key, rhs in lattice_parameters.items() if key in length_keys)
+    assert len(angle_units) <= 1, "Units of lattice angles not consistent"
+    assert len(length_units) <= 1, "Units of lattice constants not consistent"
+    angle_unit = angle_units.pop() if angle_units else 'degree'
+
+    parameters = {key: rhs.value for key, rhs in lattice_parameters.items()
+                  if key in length_keys + angle_keys}
+    return lattice_vectors(bravais, angle_unit=angle_unit, **parameters)
+
+
+def volume(lattice: np.ndarray) -> np.ndarray:
+
+    """
+    Cell volume, |a1 . (a2 x a3)|
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns, with shape (..., 3, 3)
+
+    Returns
+    -------
+    volume : float or np.ndarray
+        Cell volume/s, with shape (...)
+    """
+
+    return np.abs(np.linalg.det(lattice))
+
+
+def reciprocal_lattice_vectors(lattice: np.ndarray) -> np.ndarray:
+
+    """
+    Reciprocal lattice vectors, b_i, defined such that a_i . b_j = 2 pi delta_ij
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns, with shape (..., 3, 3)
+
+    Returns
+    -------
+    reciprocal_lattice : np.ndarray
+        Reciprocal lattice vectors as columns, with shape (..., 3, 3)
+    """
+
+    return 2. * np.pi * np.swapaxes(np.linalg.inv(lattice), -1, -2)
+
+
+def lattice_parameters_from_vectors(lattice: np.ndarray, angle_unit='degree') -> typing.Dict:
+
+    """
+    Lengths of, and angles between, lattice vectors
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns, with shape (..., 3, 3)
+    angle_unit : str, optional
+        Unit of returned angles. Valid options = ['degree', 'radian']
+
+    Returns
+    -------
+    parameters : dict
+        Keys = a, b, c, alpha, beta, gamma. Values are floats or
+        arrays with shape (...)
+    """
+
+    assert angle_unit in ['degree', 'radian']
+    lengths = np.linalg.norm(lattice, axis=-2)
+    a1, a2, a3 = [lattice[..., :, i] for i in range(3)]
+
+    def angle(u, v, norm):
+        theta = np.arccos(np.clip(np.sum(u * v, axis=-1) / norm, -1., 1.))
+        return np.degrees(theta) if angle_unit == 'degree' else theta
+
+    a, b, c = lengths[..., 0], lengths[..., 1], lengths[..., 2]
+    return {'a': a, 'b': b, 'c': c,
+            'alpha': angle(a2, a3, b * c),
+            'beta': angle(a1, a3, a * c),
+            'gamma': angle(a1, a2, a * b)}
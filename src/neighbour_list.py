@@ -0,0 +1,284 @@
+""" Cell-list neighbour search over periodic images, for any lattice.
+
+    All pairs (i, j, n) with |r_j + L n - r_i| < cutoff are found by binning
+    atoms into cells of at least half the cutoff, and only searching cells
+    (and their periodic images) within the cutoff. This works for cutoffs
+    larger than the cell, where the number of images grows quickly.
+
+    Pairs are stored once per unordered pair, in compressed sparse row (CSR)
+    form: the neighbours of atom i are j[row_ptr[i]:row_ptr[i + 1]], with
+    integer image vectors n. Distances are not stored. They are recomputed
+    from positions and lattice vectors when needed, so one list is reused
+    across sweep points (Ewald alpha, small displacements, strains) as long
+    as no atom has moved further than half the Verlet skin.
+
+    Lattice vectors are the columns of a 3x3 matrix (see lattice_vectors.py).
+"""
+
+import itertools
+import typing
+import numpy as np
+
+from src import lattice_vectors
+
+# Upper bound on the number of elements of temporary arrays
+_chunk_size = 2 ** 20
+
+
+def cell_widths(lattice: np.ndarray) -> np.ndarray:
+    """ Perpendicular distances between opposite faces of the cell """
+    reciprocal = lattice_vectors.reciprocal_lattice_vectors(lattice)
+    return 2. * np.pi / np.linalg.norm(reciprocal, axis=0)
+
+
+def bin_atoms(lattice: np.ndarray, positions: np.ndarray, width: float):
+
+    """
+    Sort atoms into a grid of bins with widths of at least min(width, cell width).
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns
+    positions : np.ndarray
+        Cartesian positions with shape (n, 3)
+    width : float
+        Minimum bin width
+
+    Returns
+    -------
+    bins : np.ndarray
+        Atom indices per bin, with shape (n_bins, max_occupancy), padded with -1
+    n_bins : np.ndarray
+        Number of bins along each lattice vector
+    fractional : np.ndarray
+        Fractional positions, wrapped into [0, 1)
+    """
+
+    fractional = np.linalg.solve(lattice, positions.T).T
+    fractional -= np.floor(fractional)
+
+    n_bins = np.maximum(1, np.floor(cell_widths(lattice) / width)).astype(int)
+    indices = np.minimum((fractional * n_bins).astype(int), n_bins - 1)
+    flat = np.ravel_multi_index(indices.T, n_bins)
+
+    order = np.argsort(flat, kind='stable')
+    occupancy = np.bincount(flat, minlength=np.prod(n_bins))
+    starts = np.concatenate(([0], np.cumsum(occupancy)[:-1]))
+    slot = np.arange(flat.size) - starts[flat[order]]
+    bins = np.full((np.prod(n_bins), max(1, occupancy.max())), -1, dtype=int)
+    bins[flat[order], slot] = order
+
+    return bins, n_bins, fractional
+
+
+def _half_offsets(reach: np.ndarray) -> typing.List[tuple]:
+    """ Bin offsets o with o >= 0 lexicographically. The reverse of a pair found at o is found at -o """
+    return [offset for offset in itertools.product(*[range(-m, m + 1) for m in reach]) if offset >= (0, 0, 0)]
+
+
+def pair_batches(lattice: np.ndarray, positions: np.ndarray, cutoff: float) -> typing.Iterator:
+
+    """
+    Generate every unordered pair of atoms, including periodic images, closer than cutoff.
+
+    Each pair is generated once: i < j for the zero image, and for i == j
+    only one of the images n and -n.
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns
+    positions : np.ndarray
+        Cartesian positions with shape (n, 3)
+    cutoff : float
+        Real-space cutoff
+
+    Returns
+    -------
+    pairs : iterator of tuple(np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+        Batches of (i, j, n, r_ij): atom indices, integer image vectors with
+        shape (n_pairs, 3), and the distance from atom i to image n of atom j,
+        where positions are first wrapped into the cell. Batches are grouped
+        by bins of atom i.
+    """
+
+    lattice = np.asarray(lattice, dtype=float)
+    bins, n_bins, fractional = bin_atoms(lattice, np.asarray(positions, dtype=float), 0.5 * cutoff)
+    wrapped = fractional @ lattice.T
+    reach = np.ceil(cutoff * n_bins / cell_widths(lattice)).astype(int)
+    bin_index = np.array(np.unravel_index(np.arange(bins.shape[0]), n_bins)).T
+
+    occupied = bins >= 0
+    bin_positions = wrapped[bins]
+    batch = max(1, _chunk_size // bins.shape[1] ** 2)
+    offsets = _half_offsets(reach)
+
+    for start in range(0, bins.shape[0], batch):
+        b = slice(start, start + batch)
+        for offset in offsets:
+            target = bin_index[b] + offset
+            image = np.floor_divide(target, n_bins)
+            t = np.ravel_multi_index((target - image * n_bins).T, n_bins)
+            shifts = image @ lattice.T
+
+            r = (bin_positions[t] + shifts[:, None, :])[:, None, :, :] - bin_positions[b][:, :, None, :]
+            distance = np.sqrt(np.einsum('...k,...k->...', r, r))
+            i, j = np.broadcast_arrays(bins[b][:, :, None], bins[t][:, None, :])
+            mask = occupied[b][:, :, None] & occupied[t][:, None, :] & (distance < cutoff)
+            if offset == (0, 0, 0):
+                mask &= i < j
+            yield i[mask], j[mask], np.broadcast_to(image[:, None, None, :], r.shape)[mask], distance[mask]
+
+
+class NeighbourList:
+    """
+    Periodic neighbour list in CSR form, with a Verlet skin.
+
+    Built with cutoff + skin, the list contains every pair within cutoff
+    until an atom has moved by more than skin / 2, including displacements
+    from changes to the lattice vectors.
+
+    Attributes
+    ----------
+    cutoff, skin : float
+    row_ptr : np.ndarray
+        Shape (n_atoms + 1). Pairs of atom i are row_ptr[i]:row_ptr[i + 1]
+    j : np.ndarray
+        Neighbour indices, int32
+    image : np.ndarray
+        Image of each neighbour, in units of lattice vectors, int8, shape (n_pairs, 3)
+    positions, lattice : np.ndarray
+        Wrapped positions and lattice vectors the list was built for.
+        Image vectors refer to these wrapped positions.
+    """
+    __slots__ = ('cutoff', 'skin', 'row_ptr', 'j', 'image', 'positions', 'lattice')
+
+    def __init__(self, lattice: np.ndarray, positions: np.ndarray, cutoff: float, skin=0.):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.lattice = np.array(lattice, dtype=float)
+        positions = np.asarray(positions, dtype=float)
+        n_atoms = positions.shape[0]
+
+        # Rows of atoms in one batch of bins are complete, so each batch is
+        # sorted independently, then scattered into place
+        chunks = []
+        counts = np.zeros(n_atoms, dtype=np.int64)
+        batch_i, batch_j, batch_image = [], [], []
+        for i, j, image, _ in pair_batches(self.lattice, positions, cutoff + skin):
+            batch_i.append(i), batch_j.append(j), batch_image.append(image)
+            if sum(x.size for x in batch_i) > _chunk_size:
+                chunks.append(self._sort_chunk(batch_i, batch_j, batch_image, counts))
+                batch_i, batch_j, batch_image = [], [], []
+        chunks.append(self._sort_chunk(batch_i, batch_j, batch_image, counts))
+
+        self.row_ptr = np.concatenate(([0], np.cumsum(counts)))
+        n_pairs = int(self.row_ptr[-1])
+        self.j = np.empty(n_pairs, dtype=np.int32)
+        self.image = np.empty((n_pairs, 3), dtype=np.int8)
+        filled = np.zeros(n_atoms, dtype=np.int64)
+        while chunks:
+            i, j, image = chunks.pop()
+            rank = np.arange(i.size) - np.searchsorted(i, i)
+            destination = self.row_ptr[i] + filled[i] + rank
+            self.j[destination] = j
+            self.image[destination] = image
+            np.add.at(filled, *np.unique(i, return_counts=True))
+
+        fractional = np.linalg.solve(self.lattice, positions.T).T
+        self.positions = (fractional - np.floor(fractional)) @ self.lattice.T
+
+    @staticmethod
+    def _sort_chunk(batch_i, batch_j, batch_image, counts):
+        i = np.concatenate(batch_i) if batch_i else np.empty(0, dtype=int)
+        j = np.concatenate(batch_j) if batch_j else np.empty(0, dtype=int)
+        image = np.concatenate(batch_image) if batch_image else np.empty((0, 3), dtype=int)
+        assert np.all(np.abs(image) <= np.iinfo(np.int8).max), "Too many periodic images for int8 storage"
+        order = np.argsort(i, kind='stable')
+        i = i[order].astype(np.int32)
+        counts += np.bincount(i, minlength=counts.size)
+        return i, j[order].astype(np.int32), image[order].astype(np.int8)
+
+    @property
+    def n_atoms(self) -> int:
+        return self.row_ptr.size - 1
+
+    @property
+    def n_pairs(self) -> int:
+        return self.j.size
+
+    def row_indices(self) -> np.ndarray:
+        """ Atom i of each pair """
+        return np.repeat(np.arange(self.n_atoms, dtype=np.int32), np.diff(self.row_ptr))
+
+    def memory_footprint(self) -> typing.Dict[str, int]:
+        """ Bytes used by each array of the list, and the total """
+        footprint = {name: getattr(self, name).nbytes for name in ('row_ptr', 'j', 'image', 'positions', 'lattice')}
+        footprint['total'] = sum(footprint.values())
+        return footprint
+
+    def _displaced(self, positions, lattice) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """ Positions in the wrapping convention of the list, for new positions and/or lattice """
+        lattice = self.lattice if lattice is None else np.asarray(lattice, dtype=float)
+        if positions is None:
+            # Strain the reference cell: fractional positions are fixed
+            fractional = np.linalg.solve(self.lattice, self.positions.T).T
+            return fractional @ lattice.T, lattice
+        positions = np.asarray(positions, dtype=float)
+        # Follow each atom to the image closest to its reference position
+        shift = np.round(np.linalg.solve(lattice, (self.positions - positions).T).T)
+        return positions + shift @ lattice.T, lattice
+
+    def is_valid(self, positions=None, lattice=None) -> bool:
+
+        """
+        Whether the list still contains every pair within cutoff, for new
+        positions and/or lattice vectors
+
+        The separation of a pair changes by at most |dr_i| + |dr_j| + |dL n|,
+        which must not exceed the skin.
+        """
+
+        positions, lattice = self._displaced(positions, lattice)
+        max_displacement = np.max(np.linalg.norm(positions - self.positions, axis=1), initial=0.)
+        max_image = np.max(np.abs(self.image), initial=0)
+        max_strain = np.linalg.norm(lattice - self.lattice, ord=2) * np.sqrt(3.) * max_image
+        # Tolerance for round-off in re-wrapping positions
+        return 2. * max_displacement + max_strain <= self.skin + 1.e-8 * self.cutoff
+
+    def distance_batches(self, positions=None, lattice=None) -> typing.Iterator:
+
+        """
+        Distances of all pairs within cutoff, in batches
+
+        Parameters
+        ----------
+        positions : np.ndarray, optional
+            New Cartesian positions. Defaults to those the list was built with
+        lattice : np.ndarray, optional
+            New lattice vectors. If positions is None, fractional positions are fixed
+
+        Returns
+        -------
+        batches : iterator of tuple(np.ndarray, np.ndarray, np.ndarray)
+            (i, j, r_ij) for pairs with r_ij < cutoff
+        """
+
+        assert self.is_valid(positions, lattice), "Atoms have moved by more than the skin. Rebuild the list"
+        positions, lattice = self._displaced(positions, lattice)
+        for start in range(0, self.n_pairs, _chunk_size):
+            pairs = slice(start, start + _chunk_size)
+            i = np.searchsorted(self.row_ptr, np.arange(start, start + self.j[pairs].size), side='right') - 1
+            j = self.j[pairs]
+            r = positions[j] + self.image[pairs] @ lattice.T - positions[i]
+            distance = np.sqrt(np.einsum('ij,ij->i', r, r))
+            mask = distance < self.cutoff
+            yield i[mask], j[mask], distance[mask]
+
+    def distances(self, positions=None, lattice=None) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ All (i, j, r_ij) with r_ij < cutoff, as single arrays. See distance_batches """
+        batches = list(self.distance_batches(positions, lattice))
+        if not batches:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0)
+        return tuple(np.concatenate(x) for x in zip(*batches))
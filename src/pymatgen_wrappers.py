@@ -2,19 +2,17 @@
      extract data from  pymatgen's Structure object for use in qCore
 """
 
-import typing
+import copy
 import os
+import threading
+import typing
+import warnings
+import concurrent.futures
 import pymatgen.io.cif
 from pymatgen.core.structure import Structure
 
-from src.utils import Set
-from src import space_groups
-
-# If Alex's set of modules is available
-python_paths = os.environ['PYTHONPATH'].split(os.pathsep)
-sub_dirs = [path.split('/')[-1] for path in python_paths]
-if 'Python' in sub_dirs:
-    import modules.electronic_structure.structure.bravais as lattices
+from src.utils import Set, hashable
+from src import space_groups, lattice_vectors
 
 
 def lattice_parameters_from_cif(structure, length_unit='angstrom', angle_unit='degree') \
@@ -115,8 +113,247 @@ def remove_superflous_parameters(lattice_parameters: dict, bravais: str) -> dict
 
 
 
+def check_lattice_parameters(structure: Structure, lattice_parameters: dict, bravais: str,
+                             rel_tolerance=1.e-4) -> bool:
+
+    """
+    Compare the cell volume implied by the qcore bravais lattice and its
+    lattice parameters against the volume of the structure's lattice vectors.
+
+    A mismatch implies the tabulated lattice parameters do not describe
+    the cell qcore will construct, for example, primitive FCC lattice
+    constants passed with bravais = fcc, which expects the conventional constant.
+
+    Parameters
+    ----------
+    structure : Structure
+        pymatgen structure the lattice parameters were extracted from
+    lattice_parameters : dict
+        Lattice constants and angles, in angstrom and degrees
+    bravais : str
+        bravais lattice
+    rel_tolerance : float, optional
+        Relative tolerance on the volume difference
+
+    Returns
+    -------
+    volumes_agree : bool
+    """
+
+    lattice = lattice_vectors.lattice_vectors_from_parameters(bravais, lattice_parameters)
+    qcore_volume = lattice_vectors.volume(lattice)
+    volumes_agree = abs(qcore_volume - structure.volume) <= rel_tolerance * structure.volume
+    if not volumes_agree:
+        warnings.warn("Volume of the " + bravais + " cell constructed from the lattice parameters, " +
+                      str(qcore_volume) + ", differs from the structure volume, " + str(structure.volume))
+    return volumes_agree
+
+
+# Space group resolution:
+#  'declared' trusts a space group passed by the caller, or declared in the cif,
+#             and only runs spglib if neither is available and bravais is not given
+#  'full'     always runs spglib symmetry detection
+symmetry_modes = ('declared', 'full')
+
+# Default tolerance for spglib, consistent with pymatgen
+default_symprec = 0.01
+
+
+def declared_space_group(parser: pymatgen.io.cif.CifParser) -> typing.Optional[tuple]:
+
+    """
+    Read the space group declared in a cif file.
+
+    Materials Project cifs are written in the P1 setting, listing every atom,
+    hence declare '_symmetry_Int_Tables_number 1' irrespective of the true
+    space group. A declared P1 is therefore not trusted.
+
+    Parameters
+    ----------
+    parser : CifParser
+        pymatgen cif parser
+
+    Returns
+    -------
+    space_group : tuple(str, int) or None
+        Space group symbol and number, or None if not declared (or P1)
+    """
+
+    number_keys = ['_symmetry_Int_Tables_number', '_space_group_IT_number']
+    symbol_keys = ['_symmetry_space_group_name_H-M', '_space_group_name_H-M_alt']
+
+    for block in parser.as_dict().values():
+        numbers = [block[key] for key in number_keys if key in block]
+        if not numbers:
+            continue
+        number = int(numbers[0])
+        if number <= 1:
+            return None
+        symbols = [block[key] for key in symbol_keys if key in block]
+        symbol = symbols[0].replace(' ', '').strip("'") if symbols else ''
+        return (symbol, number)
+
+    return None
+
+
+def resolve_space_group(structure: Structure,
+                        parser=None,
+                        space_group=None,
+                        bravais=None,
+                        symmetry='declared',
+                        symprec=default_symprec) -> typing.Optional[tuple]:
+
+    """
+    Get the space group of a structure, only running spglib when required.
+
+    Parameters
+    ----------
+    structure : Structure
+        pymatgen structure
+    parser : CifParser, optional
+        cif parser the structure was read with
+    space_group : int or tuple(str, int), optional
+        Space group, if already known
+    bravais : str, optional
+        bravais lattice, if already known
+    symmetry : str, optional
+        Space group resolution mode. Valid options = symmetry_modes
+    symprec : float, optional
+        Distance tolerance for spglib symmetry detection, in angstrom
+
+    Returns
+    -------
+    space_group : tuple(str, int) or None
+        Space group symbol and number. None if bravais is given and the
+        space group is neither known nor declared.
+    """
+
+    assert symmetry in symmetry_modes, "symmetry must be one of " + str(symmetry_modes)
+
+    if symmetry == 'full':
+        return structure.get_space_group_info(symprec=symprec)
+
+    if space_group is not None:
+        return ('', space_group) if isinstance(space_group, int) else tuple(space_group)
+
+    if parser is not None:
+        declared = declared_space_group(parser)
+        if declared is not None:
+            return declared
+
+    if bravais is not None:
+        return None
+
+    return structure.get_space_group_info(symprec=symprec)
+
+
+def detected_space_group(fname: str, symprec=default_symprec) -> tuple:
+
+    """
+    Space group of a cif, from spglib symmetry detection.
+    Read as the conventional cell, as the space group is independent of the
+    choice of cell and this avoids the primitive reduction.
+    """
+    parser = pymatgen.io.cif.CifParser(fname)
+    structure = parser.get_structures(primitive=False)[0]
+    return structure.get_space_group_info(symprec=symprec)
+
+
+def declared_bravais_lattices(space_group_number: int) -> set:
+    """
+    Bravais lattices a crystal of a space group may be declared with: that of the
+    space group, the conventional lattice of a centred lattice, or, for trigonal
+    space groups, hexagonal axes
+    """
+    bravais = space_groups.space_group_to_bravais(space_group_number)
+    lattices = {bravais, space_groups.conventional_bravais.get(bravais, bravais)}
+    if bravais in ('trigonal', 'rhombohedral'):
+        lattices.add('hexagonal')
+    return lattices
+
+
+def check_space_group(fname: str, crystal: dict, detected: tuple) -> bool:
+    """
+    Compare a crystal with its detected space group, and warn if they disagree.
+
+    Crystals with a space group are compared by space group number. Crystals
+    read with a given bravais lattice, and no declared space group, are compared
+    by bravais lattice. True if they agree, or if there is nothing to compare
+    """
+    expected = crystal.get('space_group')
+    if expected is not None:
+        if expected[1] != detected[1]:
+            warnings.warn(fname + ": space group " + str(expected[1]) +
+                          " disagrees with detected space group " + str(detected[1]))
+            return False
+        return True
+
+    bravais = crystal.get('bravais')
+    if bravais is not None and bravais not in declared_bravais_lattices(detected[1]):
+        warnings.warn(fname + ": bravais lattice " + bravais + " disagrees with detected space group " +
+                      str(detected[1]) + ", of a " + space_groups.space_group_to_bravais(detected[1]) + " lattice")
+        return False
+    return True
+
+
+def verify_space_groups(crystals: typing.Dict[str, dict],
+                        symprec=default_symprec,
+                        max_workers=None,
+                        executor=None) -> typing.Dict:
+
+    """
+    Verify the space groups of crystals ingested with symmetry = 'declared'
+    against full spglib symmetry detection, in worker processes.
+
+    Parameters
+    ----------
+    crystals : dict
+        Keys = cif file names, values = crystal data from cif_parser_wrapper
+    symprec : float, optional
+        Distance tolerance for spglib symmetry detection, in angstrom
+    max_workers : int, optional
+        Number of worker processes. Only used if executor is None
+    executor : concurrent.futures.Executor, optional
+        If given, detection is submitted to the executor and futures are
+        returned immediately, allowing verification to run in the background.
+        Each crystal is checked, with check_space_group, as its future completes
+
+    Returns
+    -------
+    detected : dict
+        Keys = cif file names. Values = detected space group tuple(str, int),
+        or a Future of it if an executor is given.
+        A warning is raised for any crystal with a space group, or, without one,
+        a bravais lattice, that disagrees with the detected one. See check_space_group
+    """
+
+    def check_when_done(fname):
+        def callback(future):
+            if not future.cancelled() and future.exception() is None:
+                check_space_group(fname, crystals[fname], future.result())
+        return callback
+
+    if executor is not None:
+        futures = {}
+        for fname in crystals:
+            futures[fname] = executor.submit(detected_space_group, fname, symprec)
+            futures[fname].add_done_callback(check_when_done(fname))
+        return futures
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {fname: pool.submit(detected_space_group, fname, symprec) for fname in crystals}
+        detected = {fname: future.result() for fname, future in futures.items()}
+
+    for fname, space_group in detected.items():
+        check_space_group(fname, crystals[fname], space_group)
+
+    return detected
+
+
 def cif_parser_wrapper(fname:str, is_primitive_cell=True, fractional=True, bravais=None,
-                       remove_unused_parameters=True, supercell_coefficients=None) -> typing.Dict:
+                       remove_unused_parameters=True, supercell_coefficients=None,
+                       check_lattice=False, space_group=None, symmetry='declared',
+                       symprec=default_symprec) -> typing.Dict:
     """
     Wrapper for pymatgen's cif parser.
 
@@ -143,6 +380,16 @@ def cif_parser_wrapper(fname:str, is_primitive_cell=True, fractional=True, brava
     supercell_coefficients : list of 3 integers, optional
        Integers to expand cell to supercell
        See structure.make_supercell() in https://pymatgen.org/usage.html
+    check_lattice : bool, optional
+       Warn if the lattice parameters do not reproduce the cell volume
+       for the given bravais lattice
+    space_group : int or tuple(str, int), optional
+       Space group, if already known. Skips symmetry detection
+    symmetry : str, optional
+       'declared' only runs spglib if the space group is not known, not declared
+       in the cif, and bravais is not given. 'full' always runs spglib
+    symprec : float, optional
+       Distance tolerance for spglib symmetry detection, in angstrom
 
     Returns
     -------
@@ -179,17 +426,15 @@ def cif_parser_wrapper(fname:str, is_primitive_cell=True, fractional=True, brava
         position_key = 'xyz'
         positions = structure.cart_coords.tolist()
 
-    sg = structure.get_space_group_info()
+    sg = resolve_space_group(structure, parser, space_group, bravais, symmetry, symprec)
     if bravais is None:
         bravais = space_groups.space_group_to_bravais(sg[1])
 
     lattice_parameters = lattice_parameters_from_cif(structure)
 
-    # Compare tabulated lattice angles against those computed from lattice vectors
-    # Make sure they agree
-    #if 'Python' in sub_dirs:
-    # TODO(Alex) need to modify this function to take kargs
-    #    lattice_fn = lattices.get_lattice_vectors(bravais, lattice_parameters)
+    # Compare tabulated lattice parameters against those computed from lattice vectors
+    if check_lattice:
+        check_lattice_parameters(structure, lattice_parameters, bravais)
 
     # Required for qCore input
     if remove_unused_parameters:
@@ -207,10 +452,34 @@ def cif_parser_wrapper(fname:str, is_primitive_cell=True, fractional=True, brava
     return crystal_data
 
 
+# Parsed cif files, keyed by absolute path and cif_parser_wrapper arguments
+_parsed_cifs = {}
+_parsed_cifs_lock = threading.Lock()
+
+
+def load_cif(fname: str, **kwargs) -> typing.Dict:
+    """
+    cif_parser_wrapper, memoised per file and arguments.
+
+    Each file is parsed once per set of arguments. A deep copy is returned, such
+    that callers may modify their crystal without affecting later calls.
+    Arguments are passed by keyword, as the cache key depends on their names.
+    """
+    key = (os.path.abspath(fname), tuple(sorted((name, hashable(value)) for name, value in kwargs.items())))
+    with _parsed_cifs_lock:
+        if key not in _parsed_cifs:
+            _parsed_cifs[key] = cif_parser_wrapper(fname, **kwargs)
+    return copy.deepcopy(_parsed_cifs[key])
+
+
 def structure_parser_wrapper(structure:Structure,
                              is_primitive_cell=True,
                              fractional=True,
-                             remove_unused_parameters=True) -> typing.Dict:
+                             remove_unused_parameters=True,
+                             bravais=None,
+                             space_group=None,
+                             symmetry='declared',
+                             symprec=default_symprec) -> typing.Dict:
     """
     Same as above but expects pymatgen.core.structure.Structure object
 
@@ -226,8 +495,9 @@ def structure_parser_wrapper(structure:Structure,
         position_key = 'xyz'
         positions = structure.cart_coords.tolist()
 
-    sg = structure.get_space_group_info()
-    bravais = space_groups.space_group_to_bravais(sg[1])
+    sg = resolve_space_group(structure, None, space_group, bravais, symmetry, symprec)
+    if bravais is None:
+        bravais = space_groups.space_group_to_bravais(sg[1])
     lattice_parameters = lattice_parameters_from_cif(structure)
 
     # Required for qCore input
@@ -303,7 +303,8 @@ def xtb_input_string_cleaner(
             "assertions dictionary should be passed in with a choice made for xtb PotentialType" \
             "i.e. assertions[PotentialType]"
 
-    crystal['lattice_parameters'] = utils.angstrom_to_bohr(crystal['lattice_parameters'])
+    # Shallow copy, such that the caller's crystal is not modified
+    crystal = dict(crystal, lattice_parameters=utils.angstrom_to_bohr(crystal['lattice_parameters']))
 
     structure_str = get_xtb_periodic_structure_string(crystal)
 
@@ -0,0 +1,171 @@
+""" Registry of crystal input generators.
+
+    Generators are registered with a decorator, together with metadata that
+    is known without calling them: bravais lattice, number of atoms, number
+    of k-points, expected cost and tags. Test suites select entries by
+    metadata, and only the selected generators are called, one at a time.
+
+    The decorator returns the generator unchanged, so registered functions
+    can still be called and passed around directly:
+
+        registry = Registry('translation_invariance')
+
+        @registry.register(bravais='fcc', n_atoms=2, k_points=8, tags=('app_test',))
+        def silicon(named_result='silicon', generator=translation_string):
+            ...
+
+        inputs = registry.build(registry.select(tags='app_test', max_cost=1.e4))
+"""
+
+import typing
+import numpy as np
+
+
+class Entry:
+    """ Registered generator and its metadata """
+
+    def __init__(self, function: typing.Callable, name: str, bravais=None, n_atoms=None, k_points=None,
+                 cost=None, tags=()) -> None:
+        self.function = function
+        self.name = name
+        self.bravais = bravais
+        self.n_atoms = n_atoms
+        self.k_points = k_points
+        self.tags = frozenset([tags] if isinstance(tags, str) else tags)
+        self._cost = cost
+
+    @property
+    def cost(self) -> typing.Optional[float]:
+        """ Expected cost, if given, else n_atoms^3 x k-points, relative to one atom at Gamma """
+        if self._cost is not None:
+            return self._cost
+        if self.n_atoms is None:
+            return None
+        return float(self.n_atoms ** 3 * (self.k_points or 1))
+
+    def __call__(self, **kwargs) -> typing.Any:
+        return self.function(**kwargs)
+
+    def __repr__(self):
+        return "Entry(" + self.name + ", bravais=" + str(self.bravais) + ", n_atoms=" + str(self.n_atoms) + \
+               ", cost=" + str(self.cost) + ", tags=" + str(sorted(self.tags)) + ")"
+
+
+class Registry:
+    """ Generators in order of registration, keyed by name """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._entries = {}
+
+    def register(self, name=None, bravais=None, n_atoms=None, k_points=None, cost=None,
+                 tags=()) -> typing.Callable[[typing.Callable], typing.Callable]:
+
+        """
+        Decorator registering a generator
+
+        Parameters
+        ----------
+        name : str, optional
+            Registry key. Defaults to the function name
+        bravais : str, optional
+            Bravais lattice of the crystal
+        n_atoms : int, optional
+            Number of atoms in the cell
+        k_points : int, optional
+            Number of k-points of the Monkhorst-Pack grid
+        cost : float, optional
+            Expected cost, for example in seconds. Defaults to n_atoms^3 x k-points
+        tags : str or iterable of str, optional
+
+        Returns
+        -------
+        decorator : callable
+            Registers a function and returns it unchanged
+        """
+
+        def decorator(function):
+            key = name or function.__name__
+            assert key not in self._entries, "'" + key + "' is already registered in " + self.name
+            self._entries[key] = Entry(function, key, bravais, n_atoms, k_points, cost, tags)
+            return function
+
+        return decorator
+
+    def __getitem__(self, name: str) -> Entry:
+        return self._entries[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> typing.Iterator[Entry]:
+        return iter(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def names(self) -> typing.List[str]:
+        return list(self._entries)
+
+    def select(self, names=None, tags=None, exclude_tags=None, bravais=None, max_cost=None,
+               order_by_cost=False) -> typing.List[Entry]:
+
+        """
+        Entries matching all given criteria. No generator is called
+
+        Parameters
+        ----------
+        names : iterable of str, optional
+            Exact registry keys. Unknown names raise a KeyError
+        tags : str or iterable of str, optional
+            Entries must have every tag
+        exclude_tags : str or iterable of str, optional
+            Entries must have none of these tags
+        bravais : str or iterable of str, optional
+            Bravais lattices to include
+        max_cost : float, optional
+            Exclude entries with a larger, or unknown, cost
+        order_by_cost : bool, optional
+            Cheapest first, rather than in order of registration
+
+        Returns
+        -------
+        entries : list of Entry
+        """
+
+        def as_set(values):
+            return None if values is None else frozenset([values] if isinstance(values, str) else values)
+
+        tags, exclude_tags, bravais = as_set(tags), as_set(exclude_tags), as_set(bravais)
+        entries = [self._entries[name] for name in names] if names is not None else list(self)
+        selected = [entry for entry in entries
+                    if (tags is None or tags <= entry.tags)
+                    and (exclude_tags is None or not exclude_tags & entry.tags)
+                    and (bravais is None or entry.bravais in bravais)
+                    and (max_cost is None or (entry.cost is not None and entry.cost <= max_cost))]
+        if order_by_cost:
+            selected.sort(key=lambda entry: np.inf if entry.cost is None else entry.cost)
+        return selected
+
+    def functions(self, **criteria) -> typing.List[typing.Callable]:
+        """ Generator functions of the selected entries, for drivers that take functions. See select """
+        return [entry.function for entry in self.select(**criteria)]
+
+    def build(self, entries=None, **kwargs) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        """
+        Call the generators of entries one at a time, as the result is iterated over
+
+        Parameters
+        ----------
+        entries : list of Entry, optional
+            Defaults to every entry
+        **kwargs
+            Passed to every generator, for example generator=batch.translation_test
+
+        Returns
+        -------
+        outputs : iterator of tuple(str, any)
+            Name and output of each generator
+        """
+        for entry in (list(self) if entries is None else entries):
+            yield entry.name, entry(**kwargs)
@@ -0,0 +1,250 @@
+""" Persistent store of sweep results, in a single SQLite file.
+
+    Every run records its sweep name, numeric parameters, energy, number of
+    SCF iterations, wall time and the qcore build. Runs are first written
+    one row at a time to a pending table, such that nothing is lost if a
+    sweep is interrupted. Once enough runs are pending, they are compacted
+    into column-wise blocks: each block stores a float64 array as a blob,
+    with the minimum and maximum of every column in an indexed table.
+
+    Queries select blocks by sweep and by column ranges using the indexes,
+    then load whole blocks with np.frombuffer, so millions of rows load as
+    NumPy arrays without creating a Python object per row.
+
+    Parameters must be numeric. Lists (for example monkhorst_pack) are
+    stored as one column per element: monkhorst_pack_0, monkhorst_pack_1, ...
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import typing
+import warnings
+import numpy as np
+
+from src import run_qcore as qcore
+
+default_file_name = 'results.sqlite'
+default_block_size = 4096
+
+# Columns recorded for every run, in addition to its parameters
+result_columns = ('energy', 'n_iter', 'wall_time', 'created')
+
+_schema = """
+CREATE TABLE IF NOT EXISTS pending (
+    id INTEGER PRIMARY KEY,
+    sweep TEXT NOT NULL,
+    qcore_build TEXT NOT NULL,
+    row TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    sweep TEXT NOT NULL,
+    qcore_build TEXT NOT NULL,
+    n_rows INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS block_ranges (
+    block_id INTEGER NOT NULL REFERENCES blocks(id),
+    name TEXT NOT NULL,
+    min REAL,
+    max REAL
+);
+CREATE INDEX IF NOT EXISTS pending_sweep ON pending(sweep);
+CREATE INDEX IF NOT EXISTS blocks_sweep ON blocks(sweep, qcore_build);
+CREATE INDEX IF NOT EXISTS block_ranges_name ON block_ranges(name, min, max, block_id);
+"""
+
+
+def flatten_parameters(parameters: dict) -> typing.Dict[str, float]:
+    """ Numeric parameters as a flat dictionary, expanding lists and Set-like values """
+    flat = {}
+    for name, value in parameters.items():
+        value = getattr(value, 'value', value)
+        if np.ndim(value) == 0:
+            flat[name] = float(value)
+        else:
+            for i, element in enumerate(np.ravel(value)):
+                flat[name + '_' + str(i)] = float(element)
+    return flat
+
+
+class ResultsStore:
+    """
+    SQLite store of sweep results. Safe to share between the threads of a sweep runner.
+
+    Use as a context manager, or call close(), such that pending runs are compacted.
+    """
+    __slots__ = ('file_name', 'block_size', 'connection', 'lock')
+
+    def __init__(self, file_name=default_file_name, block_size=default_block_size):
+        self.file_name = file_name
+        self.block_size = block_size
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.executescript(_schema)
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> 'ResultsStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.compact()
+        self.connection.close()
+
+    def record(self, sweep: str, parameters: dict, result: dict, wall_time=np.nan, qcore_build='') -> None:
+
+        """
+        Record one run
+
+        Parameters
+        ----------
+        sweep : str
+            Name of the sweep, for example the named result
+        parameters : dict
+            Numeric parameters of the run. Values may be floats, lists or Set-like
+        result : dict
+            qcore result. 'energy' and 'n_iter' are stored if present, else NaN
+        wall_time : float, optional
+            Wall time of the run in seconds
+        qcore_build : str, optional
+            Identifier of the qcore executable, see run_qcore.qcore_build
+        """
+
+        row = flatten_parameters(parameters)
+        assert not set(row) & set(result_columns), "Parameter names clash with " + str(result_columns)
+        row.update({'energy': result.get('energy', np.nan), 'n_iter': result.get('n_iter', np.nan),
+                    'wall_time': wall_time, 'created': time.time()})
+        row = {name: (None if np.isnan(value) else float(value)) for name, value in row.items()}
+
+        with self.lock, self.connection:
+            self.connection.execute("INSERT INTO pending (sweep, qcore_build, row) VALUES (?, ?, ?)",
+                                    (sweep, qcore_build, json.dumps(row)))
+            n_pending = self.connection.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        if n_pending >= self.block_size:
+            self.compact()
+
+    def run_qcore(self, input_string: str, sweep: str, parameters: dict, exe_type="debug") -> dict:
+        """ Run qcore, record the run, and return the qcore output as run_qcore.run_qcore does """
+        start = time.perf_counter()
+        output = qcore.run_qcore(input_string, exe_type=exe_type)
+        wall_time = time.perf_counter() - start
+        result = output.get(qcore.get_named_result(input_string), {})
+        self.record(sweep, parameters, result, wall_time, qcore.qcore_build(exe_type))
+        return output
+
+    def record_arrays(self, sweep: str, columns: typing.Dict[str, np.ndarray], qcore_build='') -> None:
+        """ Record many runs at once, as columns of equal length, written directly as blocks """
+        columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        n_rows = len(next(iter(columns.values())))
+        columns.setdefault('created', np.full(n_rows, time.time()))
+        with self.lock, self.connection:
+            for start in range(0, n_rows, self.block_size):
+                block = {name: values[start:start + self.block_size] for name, values in columns.items()}
+                self._write_block(sweep, qcore_build, block)
+
+    def _write_block(self, sweep: str, qcore_build: str, columns: typing.Dict[str, np.ndarray]) -> None:
+        names = sorted(columns)
+        data = np.stack([columns[name] for name in names], axis=1)
+        cursor = self.connection.execute(
+            "INSERT INTO blocks (sweep, qcore_build, n_rows, columns, data) VALUES (?, ?, ?, ?, ?)",
+            (sweep, qcore_build, data.shape[0], json.dumps(names), np.ascontiguousarray(data).tobytes()))
+        with warnings.catch_warnings():
+            # Columns absent from every run of the block are all NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            ranges = [(cursor.lastrowid, name, _nan_to_none(np.nanmin(data[:, k])), _nan_to_none(np.nanmax(data[:, k])))
+                      for k, name in enumerate(names)]
+        self.connection.executemany("INSERT INTO block_ranges (block_id, name, min, max) VALUES (?, ?, ?, ?)", ranges)
+
+    def compact(self) -> None:
+        """ Move pending runs into column-wise blocks, one or more per (sweep, qcore_build) """
+        with self.lock, self.connection:
+            pending = self.connection.execute("SELECT sweep, qcore_build, row FROM pending ORDER BY id").fetchall()
+            groups = {}
+            for sweep, qcore_build, row in pending:
+                groups.setdefault((sweep, qcore_build), []).append(json.loads(row))
+            for (sweep, qcore_build), rows in groups.items():
+                names = sorted(set().union(*rows))
+                columns = {name: np.array([row.get(name) for row in rows], dtype=float) for name in names}
+                self._write_block(sweep, qcore_build, columns)
+            self.connection.execute("DELETE FROM pending")
+
+    def sweeps(self) -> typing.List[str]:
+        """ Names of all recorded sweeps """
+        with self.lock:
+            rows = self.connection.execute("SELECT sweep FROM blocks UNION SELECT sweep FROM pending").fetchall()
+        return sorted(row[0] for row in rows)
+
+    def query(self, sweep: str, columns=None, qcore_build=None, **ranges) -> typing.Dict[str, np.ndarray]:
+
+        """
+        Load the runs of a sweep as NumPy arrays
+
+        Parameters
+        ----------
+        sweep : str
+            Sweep name
+        columns : list of str, optional
+            Columns to return. Defaults to all columns of the selected runs
+        qcore_build : str, optional
+            Only return runs of this qcore build
+        **ranges : float or tuple(float, float)
+            Select runs by column value: name=value for equality, or
+            name=(lower, upper) for an inclusive range
+
+        Returns
+        -------
+        results : dict
+            Keys = column names, values = float64 arrays in the order runs were
+            recorded. Columns absent from some runs are NaN for those runs.
+        """
+
+        ranges = {name: (bounds if isinstance(bounds, tuple) else (bounds, bounds)) for name, bounds in ranges.items()}
+
+        sql = "SELECT id, columns, data FROM blocks WHERE sweep = ?"
+        args = [sweep]
+        if qcore_build is not None:
+            sql += " AND qcore_build = ?"
+            args.append(qcore_build)
+        for name, (lower, upper) in ranges.items():
+            sql += " AND id IN (SELECT block_id FROM block_ranges WHERE name = ? AND max >= ? AND min <= ?)"
+            args += [name, lower, upper]
+
+        with self.lock:
+            blocks = self.connection.execute(sql + " ORDER BY id", args).fetchall()
+            pending_sql = "SELECT row FROM pending WHERE sweep = ?" + \
+                          (" AND qcore_build = ?" if qcore_build is not None else "") + " ORDER BY id"
+            pending = self.connection.execute(pending_sql, args[:2 if qcore_build is not None else 1]).fetchall()
+
+        tables = []
+        for _, names, data in blocks:
+            names = json.loads(names)
+            tables.append((names, np.frombuffer(data, dtype=float).reshape(-1, len(names))))
+        if pending:
+            rows = [json.loads(row[0]) for row in pending]
+            names = sorted(set().union(*rows))
+            tables.append((names, np.array([[row.get(name) for name in names] for row in rows], dtype=float)))
+
+        if columns is None:
+            columns = sorted(set().union(*[names for names, _ in tables])) if tables else []
+        wanted = list(dict.fromkeys(list(columns) + list(ranges)))
+
+        results = {name: [] for name in wanted}
+        for names, data in tables:
+            index = {name: k for k, name in enumerate(names)}
+            for name in wanted:
+                results[name].append(data[:, index[name]] if name in index else np.full(data.shape[0], np.nan))
+        results = {name: np.concatenate(values) if values else np.empty(0) for name, values in results.items()}
+
+        mask = np.ones(len(next(iter(results.values()))) if results else 0, dtype=bool)
+        for name, (lower, upper) in ranges.items():
+            mask &= (results[name] >= lower) & (results[name] <= upper)
+        return {name: results[name][mask] for name in columns}
+
+
+def _nan_to_none(value: float) -> typing.Optional[float]:
+    return None if np.isnan(value) else float(value)
@@ -2,6 +2,11 @@
 
 import subprocess
 import json
+import os
+import time
+import functools
+import sys
+import typing
 
 # Specific to Alex's machine
 _PATH_TO_ENTOS = "/Users/alexanderbuccheri/Codes/entos/"
@@ -17,6 +22,16 @@ def get_named_result(input_string: str) -> str:
         raise Exception("Unable to find named result in ", input_string)
 
 
+@functools.lru_cache(maxsize=None)
+def qcore_build(exe_type="debug") -> str:
+    """ Identify the qcore executable by its path and modification time """
+    qcore_exe = _QCORE_EXES[exe_type]
+    if not os.path.isfile(qcore_exe):
+        return qcore_exe + " (not found)"
+    modified = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(os.path.getmtime(qcore_exe)))
+    return qcore_exe + " " + modified
+
+
 #TODO(Alex) Tidy up the return if error
 def run_qcore(input_string: str, exe_type="debug") -> dict:
     """
@@ -33,4 +48,34 @@ def run_qcore(input_string: str, exe_type="debug") -> dict:
         return json.loads(qcore_json_result)
     except subprocess.CalledProcessError:  # as error:
         #print("subprocess error:", error.returncode, "found:", error.output)
-        return {named_result: {}}
\ No newline at end of file
+        return {named_result: {}}
+
+def run_qcore_profiled(input_string: str, exe_type="debug") -> typing.Tuple[dict, float, float]:
+    """
+    Run qcore as run_qcore does, and measure its wall time and peak memory
+
+    Returns
+    -------
+    output : dict
+        Results dictionary, {named_result: {}} if qcore failed
+    wall_time : float
+        Wall time in s
+    peak_memory : float
+        Maximum resident set size of the qcore process, in MB
+    """
+    qcore_exe = _QCORE_EXES[exe_type]
+    named_result = get_named_result(input_string)
+    qcore_command = [qcore_exe, '--format', 'json', '-s', input_string.replace('\n', ' ')]
+    start = time.perf_counter()
+    process = subprocess.Popen(qcore_command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    qcore_json_result = process.stdout.read()
+    # Resource usage of this process only, unlike resource.getrusage(RUSAGE_CHILDREN)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    process.stdout.close()
+    # ru_maxrss is in bytes on macOS, and in kB on Linux
+    peak_memory = usage.ru_maxrss / (1024. ** 2 if sys.platform == 'darwin' else 1024.)
+    if process.returncode != 0:
+        return {named_result: {}}, wall_time, peak_memory
+    return json.loads(qcore_json_result), wall_time, peak_memory
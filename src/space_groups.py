@@ -27,6 +27,16 @@ qcore_bravais_lattices = ('triclinic',
                           'fcc')
 
 
+# Bravais lattice of the conventional cell of each centred lattice
+conventional_bravais = {'fcc': 'cubic',
+                        'bcc': 'cubic',
+                        'body_centred_tetragonal': 'tetragonal',
+                        'body_centred_orthorhombic': 'orthorhombic',
+                        'base_centred_orthorhombic': 'orthorhombic',
+                        'face_centred_orthorhombic': 'orthorhombic',
+                        'base_centred_monoclinic': 'monoclinic'}
+
+
 # Note: I ASSUME A, B and C correspond to different base-centred configurations
 # P = simple, is omitted in qcore inputs
 configuration = {'P':'', 'I':'body_centred', 'F':'face_centred', 'A':'base_centred',
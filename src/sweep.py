@@ -0,0 +1,356 @@
+""" Declarative parameter sweeps over one base crystal and its xtb options.
+
+    A sweep is a base crystal, base settings and named axes. An axis name is
+    any xtb option key in the settings, any lattice parameter of the crystal,
+    or the name of a transform (see default_transforms). Axis values are
+    either a sequence of values, or a tuple (lower, upper) of bounds for
+    continuous axes.
+
+    A design is an iterator of points, each a dict {axis name: value}:
+     * full_factorial: every combination of the axis values
+     * latin_hypercube: n points, with every axis stratified into n intervals
+     * sparse_grid: Smolyak sparse grid of nested Clenshaw-Curtis points,
+       which grows polynomially rather than exponentially with the number of axes
+
+    Designs, inputs and runs are all lazy: a sweep of 10^5 points never holds
+    more than a bounded number of input strings at once.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import typing
+import numpy as np
+
+from src import lattice_vectors, utils
+from src import qcore_input_strings as qcore_input
+from src.run_qcore import run_qcore
+
+
+def _python_value(value) -> typing.Any:
+    """ NumPy scalars and arrays as Python objects, such that they print as qcore input """
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+
+def _axis_value(values, u: float) -> typing.Any:
+    """ Value of an axis at unit coordinate u in [0, 1]: linear between bounds, or the nearest element """
+    if isinstance(values, tuple):
+        lower, upper = values
+        return float(lower + u * (upper - lower))
+    return _python_value(values[int(round(u * (len(values) - 1)))])
+
+
+def full_factorial(axes: typing.Dict[str, typing.Sequence]) -> typing.Iterator[dict]:
+
+    """
+    Every combination of axis values, with the last axis varying fastest
+
+    Parameters
+    ----------
+    axes : dict
+        Keys = axis names, values = sequences of values. Bounds are not accepted
+
+    Returns
+    -------
+    points : iterator of dict
+    """
+
+    assert not any(isinstance(values, tuple) for values in axes.values()), \
+        "A full factorial design needs explicit values for every axis"
+    names = list(axes)
+    for values in itertools.product(*[axes[name] for name in names]):
+        yield {name: _python_value(value) for name, value in zip(names, values)}
+
+
+def latin_hypercube(axes: dict, n_points: int, seed=None) -> typing.Iterator[dict]:
+
+    """
+    Latin-hypercube design: each axis is split into n_points equal intervals,
+    and every interval is sampled exactly once
+
+    Parameters
+    ----------
+    axes : dict
+        Keys = axis names. Values = (lower, upper) bounds, sampled uniformly within
+        each interval, or sequences of values, sampled at the interval centres
+    n_points : int
+        Number of points
+    seed : int, optional
+        Random seed
+
+    Returns
+    -------
+    points : iterator of dict
+    """
+
+    rng = np.random.default_rng(seed)
+    names = list(axes)
+    # Only the interval order of each axis is stored: n_points integers per axis
+    strata = [rng.permutation(n_points) for _ in names]
+    for i in range(n_points):
+        point = {}
+        for name, stratum in zip(names, strata):
+            values = axes[name]
+            if isinstance(values, tuple):
+                point[name] = _axis_value(values, (stratum[i] + rng.random()) / n_points)
+            else:
+                point[name] = _python_value(values[stratum[i] * len(values) // n_points])
+        yield point
+
+
+def _clenshaw_curtis(level: int) -> np.ndarray:
+    """ Points of a 1D Clenshaw-Curtis level in [0, 1] that are not in any lower level """
+    if level == 1:
+        return np.array([0.5])
+    if level == 2:
+        return np.array([0., 1.])
+    n_intervals = 2 ** (level - 1)
+    return np.arange(1, n_intervals, 2) / n_intervals
+
+
+def _multi_indices(n_axes: int, max_sum: int) -> typing.Iterator[tuple]:
+    """ Levels (l_1, ..., l_d), each >= 1, with sum(l) <= max_sum """
+    if n_axes == 1:
+        for level in range(1, max_sum + 1):
+            yield (level,)
+        return
+    for level in range(1, max_sum - n_axes + 2):
+        for rest in _multi_indices(n_axes - 1, max_sum - level):
+            yield (level,) + rest
+
+
+def sparse_grid(axes: dict, level: int) -> typing.Iterator[dict]:
+
+    """
+    Smolyak sparse grid of nested Clenshaw-Curtis points
+
+    Level 1 is the centre of the parameter space, and each level adds points
+    that refine one or more axes. The number of points for d axes grows as
+    O(2^level level^(d - 1)), compared to O((2^level)^d) for the full grid.
+
+    Parameters
+    ----------
+    axes : dict
+        Keys = axis names. Values = (lower, upper) bounds, or sequences of
+        values, from which the element nearest each grid coordinate is taken
+    level : int
+        Sparse grid level, >= 1
+
+    Returns
+    -------
+    points : iterator of dict
+        Points are unique. Coarse levels come first
+    """
+
+    assert level >= 1, "Sparse grid level starts at 1"
+    names = list(axes)
+    # Nearest elements of discrete axes can coincide between levels
+    seen = set()
+    for levels in sorted(_multi_indices(len(names), level + len(names) - 1), key=sum):
+        for u in itertools.product(*[_clenshaw_curtis(l) for l in levels]):
+            point = {name: _axis_value(axes[name], ui) for name, ui in zip(names, u)}
+            key = tuple(utils.hashable(value) for value in point.values())
+            if key not in seen:
+                seen.add(key)
+                yield point
+
+
+def scale_lattice_constants(crystal: dict, settings: dict, factor: float) -> typing.Tuple[dict, dict]:
+    """ Scale all lattice constants by factor, leaving angles fixed """
+    lattice_parameters = lattice_vectors.isotropic_lattice_parameters(crystal['lattice_parameters'], factor)
+    return dict(crystal, lattice_parameters=lattice_parameters), settings
+
+
+def shift_positions(crystal: dict, settings: dict, shift: float) -> typing.Tuple[dict, dict]:
+    """ Rigid shift of all positions, in units of the crystal's positions """
+    return utils.update_positions(dict(crystal), shift), settings
+
+
+# Axes that are not an option or lattice parameter. Each maps
+# (crystal, settings, value) to a new (crystal, settings)
+default_transforms = {'lattice_constant_factor': scale_lattice_constants,
+                      'fractional_shift': shift_positions}
+
+
+def apply_point(crystal: dict, settings: dict, point: dict, transforms=None) -> typing.Tuple[dict, dict]:
+
+    """
+    Crystal and settings of one sweep point. Neither input is modified
+
+    Parameters
+    ----------
+    crystal : dict
+        Base crystal
+    settings : dict
+        Base xtb options. Axes that are options keep the unit of the base setting
+    point : dict
+        Keys = axis names, values = axis values
+    transforms : dict, optional
+        Additional transforms, see default_transforms
+
+    Returns
+    -------
+    crystal, settings : dict
+        Shallow copies, sharing unchanged entries with the inputs
+    """
+
+    transforms = dict(default_transforms, **(transforms or {}))
+    settings = collections.OrderedDict(settings)
+    lattice_parameters = dict(crystal['lattice_parameters'])
+
+    for name, value in point.items():
+        if name in transforms:
+            continue
+        elif name in lattice_parameters:
+            lattice_parameters[name] = utils.Set(value, lattice_parameters[name].unit)
+        else:
+            assert name in settings, "Axis '" + name + "' is not an option, lattice parameter or transform"
+            settings[name] = utils.Set(value, settings[name].unit)
+
+    crystal = dict(crystal, lattice_parameters=lattice_parameters)
+    # Transforms act last, such that lattice constant factors scale swept lattice constants
+    for name, value in point.items():
+        if name in transforms:
+            crystal, settings = transforms[name](crystal, settings, value)
+
+    return crystal, settings
+
+
+def point_energy(crystal: dict, settings: dict, named_result: str, sub_commands=None, transforms=None,
+                 store=None) -> typing.Callable[[dict], typing.Optional[float]]:
+
+    """
+    Energy as a function of a sweep point, for drivers that choose their points
+    adaptively, such as the convergence searches
+
+    Returns
+    -------
+    energy : callable
+        Maps a point {axis name: value} to the qcore energy, or None if the run
+        failed. Runs are recorded under the sweep named_result if store is given
+    """
+
+    def energy(point):
+        point = {name: _python_value(value) for name, value in point.items()}
+        point_crystal, point_settings = apply_point(crystal, settings, point, transforms)
+        input_string = qcore_input.xtb_input_string(point_crystal, point_settings, sub_commands, named_result)
+        if store is None:
+            output = run_qcore(input_string)
+        else:
+            output = store.run_qcore(input_string, named_result, point)
+        return output.get(named_result, {}).get('energy')
+
+    return energy
+
+
+def sweep_inputs(crystal: dict,
+                 settings: dict,
+                 design: typing.Iterable[dict],
+                 named_result: str,
+                 sub_commands=None,
+                 transforms=None) -> typing.Iterator[typing.Tuple[dict, str]]:
+
+    """
+    Generate the qcore input of each point of a design, one at a time
+
+    Returns
+    -------
+    inputs : iterator of tuple(dict, str)
+        Point and its qcore input string
+    """
+
+    for point in design:
+        point_crystal, point_settings = apply_point(crystal, settings, point, transforms)
+        yield point, qcore_input.xtb_input_string(point_crystal, point_settings, sub_commands, named_result)
+
+
+def run_sweep(crystal: dict,
+              settings: dict,
+              design: typing.Iterable[dict],
+              named_result: str,
+              sub_commands=None,
+              transforms=None,
+              max_workers=None,
+              executor=None,
+              store=None,
+              max_pending=None) -> typing.Dict[str, np.ndarray]:
+
+    """
+    Run every point of a design with qcore, concurrently
+
+    Inputs are generated as runs are submitted, and at most max_pending runs
+    are submitted but not collected at any time, such that memory does not
+    grow with the size of the design.
+
+    Parameters
+    ----------
+    crystal : dict
+        Base crystal
+    settings : dict
+        Base xtb options
+    design : iterable of dict
+        Points, for example from full_factorial, latin_hypercube or sparse_grid
+    named_result : str
+        qcore named result
+    sub_commands : dict, optional
+        xtb sub-commands, common to all points
+    transforms : dict, optional
+        Additional axis transforms, see apply_point
+    max_workers : int, optional
+        Number of concurrent qcore processes. Only used if executor is None
+    executor : concurrent.futures.Executor, optional
+        Executor to submit qcore runs to
+    store : results_store.ResultsStore, optional
+        If given, every run is recorded under the sweep named_result.
+        Axis values must then be numeric
+    max_pending : int, optional
+        Maximum number of submitted runs not yet collected. Defaults to
+        four per worker
+
+    Returns
+    -------
+    results : dict
+        Keys = axis names, 'energy' and 'n_iter'. Values = arrays, in design order.
+        Energies of failed runs are NaN, and their iteration counts are 0.
+    """
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    if max_pending is None:
+        max_pending = 4 * getattr(executor, '_max_workers', max_workers or 1)
+
+    def run(point, input_string):
+        if store is None:
+            output = run_qcore(input_string)
+        else:
+            output = store.run_qcore(input_string, named_result, point)
+        return output.get(named_result, {})
+
+    columns = collections.defaultdict(list)
+
+    def collect(point, future):
+        result = future.result()
+        for name, value in point.items():
+            columns[name].append(value)
+        columns['energy'].append(result.get('energy', np.nan))
+        columns['n_iter'].append(result.get('n_iter', 0))
+
+    pending = collections.deque()
+    try:
+        for point, input_string in sweep_inputs(crystal, settings, design, named_result, sub_commands, transforms):
+            if len(pending) >= max_pending:
+                collect(*pending.popleft())
+            pending.append((point, executor.submit(run, point, input_string)))
+        while pending:
+            collect(*pending.popleft())
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    results = {name: np.array(values) for name, values in columns.items()}
+    results['energy'] = results.get('energy', np.empty(0)).astype(float)
+    results['n_iter'] = results.get('n_iter', np.empty(0)).astype(int)
+    for index in np.flatnonzero(np.isnan(results['energy'])):
+        print(named_result, 'no result for point', index)
+    return results
@@ -0,0 +1,151 @@
+""" Array-backed unit conversion for lattice parameters and positions.
+
+    Conversions never modify their inputs, and operate on whole arrays,
+    such that a sweep of lattice constants or a full set of Cartesian
+    positions is converted in a single operation.
+"""
+
+import functools
+import typing
+import numpy as np
+
+from src import unit_conversions
+
+# Conversion factors to the atomic unit of each dimension
+length_units = {'bohr': 1.,
+                'angstrom': unit_conversions.angstrom_to_bohr,
+                'nm': 10. * unit_conversions.angstrom_to_bohr}
+
+angle_units = {'radian': 1.,
+               'degree': np.pi / 180.}
+
+dimensions = {'length': length_units, 'angle': angle_units}
+
+
+def dimension(unit: str) -> str:
+    """ Dimension of a unit, 'length' or 'angle' """
+    for name, units in dimensions.items():
+        if unit in units:
+            return name
+    raise ValueError("Unit not recognised: " + str(unit))
+
+
+@functools.lru_cache(maxsize=None)
+def conversion_factor(from_unit: str, to_unit: str) -> float:
+
+    """
+    Multiplicative factor converting from_unit to to_unit
+
+    Parameters
+    ----------
+    from_unit : str
+    to_unit : str
+        Must have the same dimension as from_unit
+
+    Returns
+    -------
+    factor : float
+    """
+
+    if from_unit == to_unit:
+        return 1.
+    units = dimensions[dimension(from_unit)]
+    assert to_unit in units, "Cannot convert " + from_unit + " to " + str(to_unit)
+    return units[from_unit] / units[to_unit]
+
+
+def convert(value, from_unit: str, to_unit: str) -> np.ndarray:
+    """ Convert a float or array from from_unit to to_unit, returning a new array """
+    return np.asarray(value, dtype=float) * conversion_factor(from_unit, to_unit)
+
+
+class Quantity:
+    """ Array-backed value with a unit. Conversions return new quantities """
+    __slots__ = ('value', 'unit')
+
+    def __init__(self, value, unit: str) -> None:
+        self.value = np.asarray(value, dtype=float)
+        self.unit = unit
+
+    def to(self, unit: str) -> 'Quantity':
+        return Quantity(self.value * conversion_factor(self.unit, unit), unit)
+
+    def __repr__(self) -> str:
+        return "Quantity(" + repr(self.value) + ", '" + self.unit + "')"
+
+
+def convert_lattice_parameters(lattice_parameters: typing.Dict,
+                               length_unit='bohr',
+                               angle_unit=None,
+                               precision=None) -> typing.Dict:
+
+    """
+    Convert the lattice constants (and optionally angles) of a lattice
+    parameter dictionary, returning a new dictionary.
+
+    Parameters
+    ----------
+    lattice_parameters : dict
+        Lattice constants and angles. Each dictionary value has a value and str unit.
+        Values may be floats or arrays (for example, a sweep of lattice constants).
+        Valid keys = a, b, c, alpha, beta, gamma
+    length_unit : str, optional
+        Unit to convert lattice constants to
+    angle_unit : str, optional
+        Unit to convert lattice angles to. Angles are left unchanged if None
+    precision : int, optional
+        Number of decimal places to round converted values to
+
+    Returns
+    -------
+    converted : dict
+        Lattice constants and angles. Each converted value is a new object of
+        the same type as the input value. Unconverted values are shared with
+        the input dictionary.
+    """
+
+    target_units = {'length': length_unit, 'angle': angle_unit}
+    converted = {}
+
+    for key, parameter in lattice_parameters.items():
+        to_unit = target_units[dimension(parameter.unit)]
+        if to_unit is None or to_unit == parameter.unit:
+            converted[key] = parameter
+            continue
+
+        factor = conversion_factor(parameter.unit, to_unit)
+        if np.ndim(parameter.value) == 0:
+            value = float(parameter.value) * factor
+            value = round(value, precision) if precision is not None else value
+        else:
+            value = np.asarray(parameter.value, dtype=float) * factor
+            value = np.round(value, precision) if precision is not None else value
+        converted[key] = type(parameter)(value, to_unit)
+
+    return converted
+
+
+def convert_positions(positions, from_unit: str, to_unit: str) -> np.ndarray:
+
+    """
+    Convert Cartesian positions in bulk
+
+    Parameters
+    ----------
+    positions : array_like
+        Cartesian positions with shape (..., n_atoms, 3)
+    from_unit : str
+        Length unit of positions
+    to_unit : str
+        Length unit to convert to
+
+    Returns
+    -------
+    positions : np.ndarray
+        New array of converted positions
+    """
+
+    assert dimension(from_unit) == 'length' and dimension(to_unit) == 'length'
+    positions = np.asarray(positions, dtype=float)
+    assert positions.shape[-1] == 3, "Expect Cartesian positions with shape (..., n_atoms, 3)"
+    return positions * conversion_factor(from_unit, to_unit)
@@ -3,24 +3,27 @@ import numpy as np
 import collections
 import sys
 import warnings
+import weakref
 
-from src import unit_conversions
+from src import units
 
 default_named_result = 'xtb_calc'
 
 class Set():
     """ Container for value and unit  """
+    __slots__ = ('value', 'unit')
+
     def __init__(self, value: float, unit=None) -> None:
         self.value = value
         if unit is not None:
-            self.unit = unit
+            self.unit = sys.intern(unit) if isinstance(unit, str) else unit
         else:
-            self.unit=''
+            self.unit = ''
 
     def update(self, value: float, unit=None):
         self.value = value
         if unit is not None:
-            self.unit = unit
+            self.unit = sys.intern(unit) if isinstance(unit, str) else unit
 
 
 class FileUrl():
@@ -43,16 +46,133 @@ class SetAssert:
     Container for use with asserts, setting value and
     corresponding margin of error
     """
+    __slots__ = ('value', 'margin')
+
     def __init__(self, value, margin=''):
         self.value = value
         self.margin = margin
 
 
+def hashable(value: typing.Any) -> typing.Any:
+    """ Hashable form of a container value: lists, i.e. monkhorst_pack, become tuples """
+    if isinstance(value, list):
+        return tuple(hashable(entry) for entry in value)
+    return value
+
+
+def _thawed(value: typing.Any) -> typing.Any:
+    """ Inverse of hashable: tuples become lists """
+    if isinstance(value, tuple):
+        return [_thawed(entry) for entry in value]
+    return value
+
+
+class _Interned:
+    """
+    Immutable, hashable (value, second-field) pair. Instances are interned:
+    constructing an equal container returns the existing instance, such that
+    sweeps repeating the same option share one object.
+
+    The value is stored as a private copy, in its hashable form, such that
+    modifying the caller's list cannot change an interned instance. List
+    values are rebuilt as new lists when accessed.
+    Unhashable values (i.e. np.ndarray) are copied, read-only, and not interned.
+    """
+    __slots__ = ('_value', '_is_list', '_second', '_key', '__weakref__')
+    _cache = None
+
+    def __new__(cls, value, second):
+        frozen = hashable(value)
+        key = (cls, type(value), frozen, second)
+        try:
+            instance = cls._cache.get(key)
+        except TypeError:
+            key, instance = None, None
+        if instance is not None:
+            return instance
+
+        if key is None and isinstance(value, np.ndarray):
+            frozen = np.array(value)
+            frozen.flags.writeable = False
+
+        instance = super().__new__(cls)
+        object.__setattr__(instance, '_value', frozen)
+        object.__setattr__(instance, '_is_list', isinstance(value, list))
+        object.__setattr__(instance, '_second', second)
+        object.__setattr__(instance, '_key', key)
+        if key is not None:
+            cls._cache[key] = instance
+        return instance
+
+    @property
+    def value(self):
+        return _thawed(self._value) if self._is_list else self._value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        if self._key is not None and other._key is not None:
+            return self._key == other._key
+        return self is other
+
+    def __hash__(self):
+        if self._key is None:
+            raise TypeError("unhashable value in " + type(self).__name__ + ": " + type(self._value).__name__)
+        return hash(self._key)
+
+    def __reduce__(self):
+        return type(self), (self.value, self._second)
+
+
+class ImmutableSet(_Interned):
+    """
+    Immutable, interned and hashable container for value and unit.
+    Drop-in replacement for Set in options dictionaries that are not
+    modified, and usable as a cache key.
+    """
+    __slots__ = ()
+    _cache = weakref.WeakValueDictionary()
+
+    def __new__(cls, value, unit=None):
+        if unit is None:
+            unit = ''
+        return super().__new__(cls, value, sys.intern(unit) if isinstance(unit, str) else unit)
+
+    @property
+    def unit(self) -> str:
+        return self._second
+
+    def __repr__(self):
+        return "ImmutableSet(" + repr(self.value) + ", " + repr(self._second) + ")"
+
+
+class ImmutableSetAssert(_Interned):
+    """
+    Immutable, interned and hashable container for an assertion value and
+    corresponding margin of error
+    """
+    __slots__ = ()
+    _cache = weakref.WeakValueDictionary()
+
+    def __new__(cls, value, margin=''):
+        return super().__new__(cls, value, margin)
+
+    @property
+    def margin(self):
+        return self._second
+
+    def __repr__(self):
+        return "ImmutableSetAssert(" + repr(self.value) + ", " + repr(self._second) + ")"
+
+
 def angstrom_to_bohr(lattice_parameters: typing.Dict, precision=6) -> typing.Dict:
 
     """
     Convert lattice constant entries in lattice parameter dictionary
-    to bohr, from angstrom.
+    to bohr, from angstrom. The input dictionary is not modified.
 
     Parameters
     ----------
@@ -66,17 +186,12 @@ def angstrom_to_bohr(lattice_parameters: typing.Dict, precision=6) -> typing.Dic
     Returns
     -------
     Lattice_parameters : dict
-        Lattice constants and angles.
+        New dictionary of lattice constants and angles.
         (a,b,c) will be in bohr.
 
     """
 
-    ang_to_bohr = unit_conversions.angstrom_to_bohr
-    for key, parameter in lattice_parameters.items():
-        if parameter.unit == 'angstrom':
-            new_value = round(parameter.value * ang_to_bohr, precision)
-            lattice_parameters[key] = Set(new_value, 'bohr')
-    return lattice_parameters
+    return units.convert_lattice_parameters(lattice_parameters, length_unit='bohr', precision=precision)
 
 
 def list_to_string(mylist: list, joiner=',', precision=None) -> str:
@@ -177,6 +292,81 @@ def generic_str(value: typing.Any) -> str:
         quit("Have not implemented type ", type(value), "in generic_str")
 
 
+def fractional_positions_bounds(positions) -> typing.Tuple[np.ndarray, dict]:
+
+    """
+    Vectorised check of which atoms have fractional coordinates outside of [0, 1].
+
+    Parameters
+    ----------
+       positions : list or np.ndarray
+          Positions with shape (n_atoms, 3). Must be in fractional coordinates.
+
+    Returns
+    -------
+        outside : np.ndarray
+            Boolean mask with shape (n_atoms). True => atom lies outside the cell
+        stats : dict
+            Summary of the bounds check:
+            n_outside, n_below_zero, n_exceed_one : int
+                Number of atoms outside the cell, with any component below 0
+                and with any component exceeding 1
+            min, max : float
+                Smallest and largest fractional component
+    """
+
+    xyz = np.asarray(positions, dtype=float).reshape(-1, 3)
+    # Per-atom extrema from columns, faster than reducing over the short axis
+    below_zero = np.minimum(np.minimum(xyz[:, 0], xyz[:, 1]), xyz[:, 2]) < 0
+    exceed_one = np.maximum(np.maximum(xyz[:, 0], xyz[:, 1]), xyz[:, 2]) > 1
+    outside = below_zero | exceed_one
+
+    stats = {'n_outside': int(np.count_nonzero(outside)),
+             'n_below_zero': int(np.count_nonzero(below_zero)),
+             'n_exceed_one': int(np.count_nonzero(exceed_one)),
+             'min': float(xyz.min()) if xyz.size else 0.,
+             'max': float(xyz.max()) if xyz.size else 0.}
+
+    return outside, stats
+
+
+def all_fractional_positions_in_cell(positions) -> bool:
+    """ True if all fractional coordinates are between 0 and 1. Two array reductions """
+    xyz = np.asarray(positions, dtype=float)
+    return xyz.size == 0 or (xyz.min() >= 0 and xyz.max() <= 1)
+
+
+def wrap_fractional_positions(positions, in_place=False) -> np.ndarray:
+
+    """
+    Wrap fractional coordinates into [0, 1)
+
+    Parameters
+    ----------
+       positions : list or np.ndarray
+          Positions with shape (n_atoms, 3), in fractional coordinates.
+       in_place : bool, optional
+          Overwrite positions, which must then be a float np.ndarray
+
+    Returns
+    -------
+        wrapped : np.ndarray
+            Wrapped positions. The same array as positions if in_place
+    """
+
+    if in_place:
+        assert isinstance(positions, np.ndarray) and positions.dtype.kind == 'f', \
+            "In-place wrapping requires a float np.ndarray"
+        wrapped = np.subtract(positions, np.floor(positions), out=positions)
+    else:
+        xyz = np.asarray(positions, dtype=float)
+        wrapped = xyz - np.floor(xyz)
+
+    # Tiny negative components, i.e. -1e-17, round to exactly 1
+    wrapped[wrapped >= 1.] = 0.
+    return wrapped
+
+
 def check_fractional_positions(named_result: str, positions: typing.List) -> bool:
 
     """
@@ -195,18 +385,16 @@ def check_fractional_positions(named_result: str, positions: typing.List) -> boo
             True => All positions in cell are within the limits of 0 and 1.
     """
 
-    all_positions_in_cell = True
-
-    for i,position in enumerate(positions):
-        xyz = np.asarray(position)
-        below_zero = np.where((xyz < 0))[0]
-        exceed_one = np.where((xyz > 1))[0]
-        if len(below_zero) > 0:
-            print("Component/s of atom position " + str(i) + " of " + named_result + " below 0: " + str(xyz), file=sys.stderr)
-            all_positions_in_cell = False
-        elif len(exceed_one) > 0:
-            print("Component/s of atom position " + str(i) + " of " + named_result + " exceed 1: " + str(xyz), file=sys.stderr)
-            all_positions_in_cell = False
+    outside, stats = fractional_positions_bounds(positions)
+    all_positions_in_cell = stats['n_outside'] == 0
+
+    if not all_positions_in_cell:
+        indices = np.flatnonzero(outside)
+        print(str(stats['n_outside']) + " atom positions of " + named_result + " lie outside the cell. " +
+              str(stats['n_below_zero']) + " with component/s below 0, " +
+              str(stats['n_exceed_one']) + " with component/s exceeding 1. " +
+              "Range of components: [" + str(stats['min']) + ", " + str(stats['max']) + "]. " +
+              "First indices: " + str(indices[:10].tolist()), file=sys.stderr)
 
     return all_positions_in_cell
 
@@ -0,0 +1,172 @@
+""" Warm-started SCF across neighbouring points of a parameter sweep.
+
+    Neighbouring points of a sweep (lattice constant, Ewald alpha, ...) have
+    nearly identical converged charges. Each point of a chain takes the
+    converged charges of the previous point as its initial guess, passed to
+    qcore as an xtb option, and so needs fewer SCF iterations.
+
+    qcore's documented initial-guess option is 'guess', which the inputs of
+    this repository only set to H0. No result key for the converged charges,
+    nor a guess option value that takes them, is documented, so guess_result
+    is None and warm starting raises until it is set for a qcore build that
+    provides both.
+"""
+
+import collections
+import sys
+import typing
+import numpy as np
+
+from src import qcore_input_strings as qcore_input
+from src.run_qcore import run_qcore
+from src.utils import Set
+
+# Key of the converged atomic charges in qcore's JSON result. Not documented by qcore
+guess_result = None
+# xtb option that sets the initial guess of the SCF, documented with the value H0
+guess_option = 'guess'
+
+
+def converged_guess(result: dict) -> typing.Optional[list]:
+    """ Converged charges of a qcore result, or None if absent """
+    guess = result.get(guess_result) if guess_result is not None else None
+    if guess is None:
+        return None
+    return [float(q) for q in np.ravel(guess)]
+
+
+def warm_started_settings(settings: dict, guess: typing.Optional[list]) -> dict:
+
+    """
+    Copy of xtb settings with the initial guess option set
+
+    Parameters
+    ----------
+    settings : dict
+        xtb options. Not modified
+    guess : list of float, optional
+        Converged charges of a neighbouring point. Settings are returned
+        unchanged if None
+
+    Returns
+    -------
+    settings : dict
+        New settings, with the guess option appended
+    """
+
+    if guess is None:
+        return settings
+    warm_settings = collections.OrderedDict(settings)
+    warm_settings[guess_option] = Set(guess)
+    return warm_settings
+
+
+def run_chain(points: typing.Sequence[typing.Tuple[dict, dict]],
+              named_result: str,
+              sub_commands=None,
+              guess=None,
+              warm_start=True,
+              store=None,
+              parameters=None) -> typing.List[dict]:
+
+    """
+    Run a chain of sweep points in order, warm-starting each point from
+    the converged charges of the previous one.
+
+    Parameters
+    ----------
+    points : sequence of tuple(dict, dict)
+        (crystal, settings) of each point, ordered such that neighbouring
+        points are close in parameter space
+    named_result : str
+        qcore named result
+    sub_commands : dict, optional
+        xtb sub-commands, common to all points
+    guess : list of float, optional
+        Initial guess for the first point
+    warm_start : bool, optional
+        If False, every point starts from qcore's default guess
+    store : results_store.ResultsStore, optional
+        If given, every run is recorded under the sweep named_result
+    parameters : sequence of dict, optional
+        Parameters of each point to record. Required if store is given
+
+    Returns
+    -------
+    results : list of dict
+        qcore result of each point, containing 'energy', 'n_iter' and 'n_runs'.
+        Without an energy if a run fails. A failed point does not reset the guess.
+        If qcore rejects the guess option, i.e. a warm-started point has no
+        energy, this is reported, the point is repeated from qcore's default
+        guess, and the rest of the chain runs cold. The rejected run counts
+        towards the point's 'n_runs' and 'n_iter', such that savings are not overstated.
+    """
+
+    assert store is None or parameters is not None, "Parameters of each point are required to record runs"
+    assert not warm_start or guess_result is not None, \
+        "Warm starting requires warm_start.guess_result, the qcore result key of the converged " \
+        "charges, which qcore does not document. Run with warm_start=False"
+
+    def run(k, crystal, settings, warm):
+        input_string = qcore_input.xtb_input_string(crystal, settings, sub_commands, named_result)
+        if store is None:
+            output = run_qcore(input_string)
+        else:
+            output = store.run_qcore(input_string, named_result, dict(parameters[k], warm_start=warm))
+        return output.get(named_result, {})
+
+    results = []
+    for k, (crystal, settings) in enumerate(points):
+        warm = warm_start and guess is not None
+        result = dict(run(k, crystal, warm_started_settings(settings, guess) if warm else settings, warm), n_runs=1)
+        if warm and 'energy' not in result:
+            print(named_result + ": warm-started point " + str(k) + " returned no energy, so qcore may reject '" +
+                  guess_option + "'. Repeating it, and the rest of the chain, from the default guess",
+                  file=sys.stderr)
+            rejected_iterations = int(result.get('n_iter', 0))
+            result = dict(run(k, crystal, settings, False), n_runs=2)
+            result['n_iter'] = int(result.get('n_iter', 0)) + rejected_iterations
+            warm_start = False
+        elif warm_start and 'energy' in result and converged_guess(result) is None and guess is None:
+            print(named_result + ": no '" + guess_result + "' in the qcore result of point " + str(k) +
+                  ", so the chain cannot be warm-started", file=sys.stderr)
+            warm_start = False
+        results.append(result)
+        guess = converged_guess(result) or guess
+    return results
+
+
+def outward_chains(n_points: int, start: int) -> typing.Tuple[list, list]:
+
+    """
+    Split the indices of a sweep into two chains that walk outward from start.
+
+    A sweep is usually centred on its best-known point (equilibrium lattice
+    constant, recommended alpha), where the default guess is closest to
+    converged. The two chains are independent, so can run concurrently.
+
+    Parameters
+    ----------
+    n_points : int
+        Number of sweep points
+    start : int
+        Index of the first point of the upward chain
+
+    Returns
+    -------
+    up, down : list of int
+        Indices [start, start + 1, ..., n_points - 1] and [start - 1, ..., 0]
+    """
+
+    assert 0 <= start < n_points, "start must index a sweep point"
+    return list(range(start, n_points)), list(range(start - 1, -1, -1))
+
+
+def total_iterations(results: typing.Iterable[dict]) -> int:
+    """ Total number of SCF iterations of a sweep, including rejected warm-started runs. Failed runs are skipped """
+    return sum(int(result['n_iter']) for result in results if 'n_iter' in result)
+
+
+def total_runs(results: typing.Iterable[dict]) -> int:
+    """ Total number of qcore runs of a sweep, including rejected warm-started runs """
+    return sum(int(result.get('n_runs', 1)) for result in results)
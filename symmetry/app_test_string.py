@@ -32,7 +32,7 @@ def xtb_symmetry_test_string(
         crystal=crystal,
         options=options,
         assertions=assertions,
-        named_result=named_result + "_no_symmetry",
+        named_result=named_result + "_symmetry",
         comments=comments)
 
     return input_no_symmetry + input_symmetry
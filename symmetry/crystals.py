@@ -1,6 +1,10 @@
 """
 Inputs  for asserting symmetry_reduction of the Monkhorst Pack grid
 Currently restricted to cubic lattices
+
+Each function passes its crystal, options and assertions to generator, which
+by default returns the input strings with and without symmetry reduction.
+See speedup.py to run the pairs and measure the speedup instead.
 """
 
 from collections import OrderedDict
@@ -9,15 +13,20 @@ from .app_test_string import xtb_symmetry_test_string
 
 from crystal_system import cubic, hexagonal
 from src.xtb_potential import xtb_potential_str, PotentialType
-from src.pymatgen_wrappers import cif_parser_wrapper
+from src.pymatgen_wrappers import load_cif
 from src.utils import Set, SetAssert
+from src.registry import Registry
 
 
 # Variable used by WHOLE script
 potential_type = PotentialType.TRUNCATED
 
+# Generators of this module and their metadata, see src/registry.py
+registry = Registry('symmetry')
+
 
-def alpha_N2(named_result='alpha_N2') -> str:
+@registry.register(bravais='cubic', n_atoms=8, k_points=8, tags=('app_test',))
+def alpha_N2(named_result='alpha_N2', generator=xtb_symmetry_test_string) -> str:
     """
     Simple cubic
     :param named_result: named result string
@@ -25,7 +34,7 @@ def alpha_N2(named_result='alpha_N2') -> str:
     """
 
     fname = '../' + cubic.cubic_cifs['alpha-N2'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'cubic', "crystal not simple cubic"
 
     options = OrderedDict([
@@ -48,12 +57,13 @@ def alpha_N2(named_result='alpha_N2') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return xtb_symmetry_test_string(crystal=crystal,
-                                    options=options,
-                                    assertions=assertions[PotentialType.TRUNCATED],
-                                    named_result=named_result)
+    return generator(crystal=crystal,
+                     options=options,
+                     assertions=assertions[PotentialType.TRUNCATED],
+                     named_result=named_result)
 
-def potassium(named_result='potassium') -> str:
+@registry.register(bravais='bcc', n_atoms=1, k_points=8, tags=('app_test', 'metal'))
+def potassium(named_result='potassium', generator=xtb_symmetry_test_string) -> str:
     """
      BCC
     :param named_result: named result string
@@ -61,7 +71,7 @@ def potassium(named_result='potassium') -> str:
     """
 
     fname = '../' + cubic.bcc_cifs['potassium'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'bcc', "crystal not bcc"
 
     options = OrderedDict([
@@ -85,13 +95,14 @@ def potassium(named_result='potassium') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return xtb_symmetry_test_string(crystal=crystal,
-                                    options=options,
-                                    assertions=assertions[PotentialType.TRUNCATED],
-                                    named_result=named_result)
+    return generator(crystal=crystal,
+                     options=options,
+                     assertions=assertions[PotentialType.TRUNCATED],
+                     named_result=named_result)
 
 
-def nickel_triphosphide(named_result='nickel_triphosphide') -> str:
+@registry.register(bravais='bcc', n_atoms=16, k_points=8, tags=('unconverged',))
+def nickel_triphosphide(named_result='nickel_triphosphide', generator=xtb_symmetry_test_string) -> str:
     """
      BCC
      Won't converge with these settings
@@ -100,7 +111,7 @@ def nickel_triphosphide(named_result='nickel_triphosphide') -> str:
     """
 
     fname = '../' + cubic.bcc_cifs[named_result].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'bcc', "crystal not bcc"
 
     options = OrderedDict([
@@ -123,10 +134,10 @@ def nickel_triphosphide(named_result='nickel_triphosphide') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return xtb_symmetry_test_string(crystal=crystal,
-                                    options=options,
-                                    assertions=assertions[PotentialType.TRUNCATED],
-                                    named_result=named_result)
+    return generator(crystal=crystal,
+                     options=options,
+                     assertions=assertions[PotentialType.TRUNCATED],
+                     named_result=named_result)
 
 def sio2_zeolite(named_result='SiO2') -> str:
     """
@@ -135,7 +146,7 @@ def sio2_zeolite(named_result='SiO2') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + cubic.bcc_cifs['sio2'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'bcc', "crystal not simple cubic"
 
     arbitrary_shift = 0.1
@@ -164,7 +175,8 @@ def sio2_zeolite(named_result='SiO2') -> str:
                               arbitrary_shift, named_result, comments=comments)
 
 
-def silicon(named_result='silicon') -> str:
+@registry.register(bravais='fcc', n_atoms=2, k_points=8, tags=('app_test',))
+def silicon(named_result='silicon', generator=xtb_symmetry_test_string) -> str:
     """
      FCC
     :param named_result: named result string
@@ -194,14 +206,15 @@ def silicon(named_result='silicon') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return xtb_symmetry_test_string(crystal=crystal,
-                                    options=options,
-                                    assertions=assertions[PotentialType.TRUNCATED],
-                                    named_result=named_result)
+    return generator(crystal=crystal,
+                     options=options,
+                     assertions=assertions[PotentialType.TRUNCATED],
+                     named_result=named_result)
 
 
 # Hexagonal
-def boron_nitride_hex(named_result='boron_nitride') -> str:
+@registry.register(bravais='hexagonal', n_atoms=4, k_points=8, tags=('app_test',))
+def boron_nitride_hex(named_result='boron_nitride', generator=xtb_symmetry_test_string) -> str:
     """
      Hexagonal
     :param named_result: named result string
@@ -231,10 +244,10 @@ def boron_nitride_hex(named_result='boron_nitride') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return xtb_symmetry_test_string(crystal=crystal,
-                                    options=options,
-                                    assertions=assertions[PotentialType.TRUNCATED],
-                                    named_result=named_result)
-
+    return generator(crystal=crystal,
+                     options=options,
+                     assertions=assertions[PotentialType.TRUNCATED],
+                     named_result=named_result)
 
 
+all_tests = registry.functions(tags='app_test')
@@ -0,0 +1,203 @@
+"""
+Benchmark the speedup of symmetry_reduction of the Monkhorst-Pack grid.
+
+Each function of crystals.py is called with generator=symmetry_pair, which
+collects its crystal and options instead of building the app-test inputs.
+Both inputs of the pair are then run with qcore, timed, and compared:
+
+ * k-points with and without symmetry reduction, predicted with spglib
+ * wall time of each run, the minimum over repeats, and their ratio, the speedup.
+   Runs with and without symmetry reduction alternate in order, such that
+   neither is systematically first
+ * energy difference, which should be zero to within the energy assertion
+
+The report is printed as a table and written as JSON, and gate() decides
+whether it passes, for example in CI:
+
+    cd symmetry && PYTHONPATH=.. python speedup.py [report.json]
+
+exits with status 1 if any pair disagrees in energy, or, where symmetry
+reduction removes k-points, is slower than min_speedup with it. The margin
+below 1 absorbs timing noise.
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import json
+import sys
+import time
+import typing
+import numpy as np
+
+from src import qcore_input_strings as qcore_input
+from src.run_qcore import run_qcore, qcore_build
+from src.utils import Set
+from converged_inputs.kpoint_convergence import irreducible_k_points
+from src.lattice_vectors import get_bravais
+
+# Energy tolerance in Ha, if a test's assertions do not give one
+default_tolerance = 1.e-6
+default_report = 'symmetry_speedup.json'
+default_repeats = 3
+default_min_speedup = 0.9
+
+
+def symmetry_pair(crystal=None, sub_commands=None, options=None, assertions=None, named_result=None,
+                  comments='') -> dict:
+
+    """
+    Collect a symmetry reduction test, with the same arguments as
+    app_test_string.xtb_symmetry_test_string
+
+    Returns
+    -------
+    pair : dict
+        'crystal', 'options', without symmetry_reduction, 'named_result' and the
+        energy 'tolerance', from the margin of the energy assertion
+    """
+
+    assert sub_commands is None, "Symmetry pairs are only defined by crystal and options"
+    options = collections.OrderedDict((key, value) for key, value in options.items() if key != 'symmetry_reduction')
+    energy_assertion = (assertions or {}).get('energy')
+    margin = energy_assertion.margin if energy_assertion is not None else ''
+    return {'crystal': crystal,
+            'options': options,
+            'named_result': named_result,
+            'tolerance': margin if margin not in ('', 0) else default_tolerance}
+
+
+def timed_energy(input_string: str, named_result: str, repeats=1) -> typing.Tuple[float, float]:
+    """ Energy of an input and its minimum wall time over repeats. NaN if a run fails """
+    energy, wall_times = np.nan, []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = run_qcore(input_string)
+        wall_times.append(time.perf_counter() - start)
+        energy = output.get(named_result, {}).get('energy', np.nan)
+    return energy, min(wall_times)
+
+
+def benchmark_pair(pair: dict, repeats=default_repeats) -> dict:
+
+    """
+    Run a pair without, then with, symmetry reduction
+
+    Returns
+    -------
+    record : dict
+        'named_result', 'bravais', 'monkhorst_pack', 'k_points' and
+        'irreducible_k_points', 'wall_time' and 'energy' without and with
+        symmetry reduction ('_symmetry'), 'speedup', 'energy_difference'
+        and 'tolerance'
+    """
+
+    crystal, mesh = pair['crystal'], pair['options']['monkhorst_pack'].value
+    record = {'named_result': pair['named_result'],
+              'bravais': get_bravais(crystal),
+              'monkhorst_pack': list(mesh),
+              'k_points': irreducible_k_points(crystal, mesh, symmetry_reduction=False),
+              'irreducible_k_points': irreducible_k_points(crystal, mesh)}
+
+    inputs = {}
+    for suffix, symmetry_reduction in [('', False), ('_symmetry', True)]:
+        options = collections.OrderedDict(pair['options'])
+        options['symmetry_reduction'] = Set(symmetry_reduction)
+        named_result = pair['named_result'] + ('_symmetry' if symmetry_reduction else '_no_symmetry')
+        inputs[suffix] = (qcore_input.xtb_input_string_cleaner(crystal=crystal, options=options,
+                                                               named_result=named_result), named_result)
+
+    wall_times = {suffix: [] for suffix in inputs}
+    for repeat in range(repeats):
+        # Alternate the order, such that neither run systematically benefits from warm caches
+        for suffix in (list(inputs) if repeat % 2 == 0 else list(inputs)[::-1]):
+            record['energy' + suffix], wall_time = timed_energy(*inputs[suffix])
+            wall_times[suffix].append(wall_time)
+    for suffix, times in wall_times.items():
+        record['wall_time' + suffix] = min(times)
+
+    record['speedup'] = record['wall_time'] / record['wall_time_symmetry']
+    record['energy_difference'] = record['energy_symmetry'] - record['energy']
+    record['tolerance'] = pair['tolerance']
+    return record
+
+
+def run_benchmark(test_functions: typing.Sequence[typing.Callable], repeats=default_repeats, max_workers=1) -> typing.Dict[str, dict]:
+
+    """
+    Benchmark symmetry reduction for every test function
+
+    Parameters
+    ----------
+    test_functions : sequence of callable
+        Functions taking a generator keyword, such as crystals.all_tests
+    repeats : int, optional
+        Number of runs of each input. Wall times are the minimum over repeats
+    max_workers : int, optional
+        Number of pairs run concurrently. Runs compete for cores, so wall times
+        are only comparable between pairs if this is 1
+
+    Returns
+    -------
+    records : dict
+        Keys = names of the test functions, values = as returned by benchmark_pair
+    """
+
+    pairs = {function.__name__: function(generator=symmetry_pair) for function in test_functions}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(benchmark_pair, pair, repeats) for name, pair in pairs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def passed(record: dict, min_speedup=default_min_speedup) -> bool:
+    """
+    Whether a pair agrees in energy and, if symmetry reduction removes k-points,
+    has a speedup of at least min_speedup. Without fewer k-points, the wall
+    times only differ by timing noise, so are not gated
+    """
+    agrees = abs(record['energy_difference']) <= record['tolerance']
+    if record['irreducible_k_points'] < record['k_points']:
+        return bool(agrees and record['speedup'] >= min_speedup)
+    return bool(agrees)
+
+
+def gate(records: typing.Dict[str, dict], min_speedup=default_min_speedup) -> bool:
+    """ Whether every pair passed. False if there are no pairs """
+    return len(records) > 0 and all(passed(record, min_speedup) for record in records.values())
+
+
+def print_report(records: typing.Dict[str, dict], min_speedup=default_min_speedup) -> None:
+    """ Table of k-points, wall times, speedups and energy differences """
+    print('test'.ljust(20) + 'bravais'.ljust(11) + 'k-points'.ljust(10) + 'wall time (s)'.ljust(16) +
+          'speedup'.ljust(9) + 'dE (Ha)'.ljust(11) + 'result')
+    for name, record in records.items():
+        print(name.ljust(20) + str(record['bravais']).ljust(11) +
+              '{:d}/{:d}'.format(record['irreducible_k_points'], record['k_points']).ljust(10) +
+              '{:.2f}/{:.2f}'.format(record['wall_time_symmetry'], record['wall_time']).ljust(16) +
+              '{:<9.2f}{:<11.1e}'.format(record['speedup'], record['energy_difference']) +
+              ('pass' if passed(record, min_speedup) else 'FAIL'))
+
+
+def write_report(records: typing.Dict[str, dict], file_name=default_report, min_speedup=default_min_speedup) -> None:
+    """ Write the records, the qcore build and the gate result as JSON. NaN is written as null """
+    def json_value(value):
+        value = value.item() if isinstance(value, np.generic) else value
+        return None if isinstance(value, float) and np.isnan(value) else value
+
+    report = {'qcore_build': qcore_build(),
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'min_speedup': min_speedup,
+              'passed': gate(records, min_speedup),
+              'records': {name: {key: json_value(value) for key, value in record.items()}
+                          for name, record in records.items()}}
+    with open(file_name, 'w') as fid:
+        json.dump(report, fid, indent=2)
+
+
+if __name__ == '__main__':
+    from symmetry.crystals import all_tests
+
+    records = run_benchmark(all_tests)
+    print_report(records)
+    write_report(records, sys.argv[1] if len(sys.argv) > 1 else default_report)
+    sys.exit(0 if gate(records) else 1)
@@ -23,8 +23,6 @@ header = """!Symmetry application test for all lattices for which the
 !Total energy should be unaffected by utilising symmetry_reduction 
 !on the k-point grid"""
 
-all_tests = [alpha_N2, potassium, silicon, boron_nitride_hex]
-
 print(produce_test_string(all_tests, header=header))
 
 
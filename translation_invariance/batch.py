@@ -0,0 +1,152 @@
+"""
+Run translational invariance tests directly, rather than printing their inputs.
+
+Each test function of crystals.py (or range_of_translations.py) is called with
+generator=translation_test, which collects its crystal, options, shifts and
+energy tolerance instead of building the app-test input. The energy of every
+shift is then computed with qcore and compared to the unshifted energy in code.
+
+All shifts of all crystals are submitted to one thread pool, so with enough
+workers a whole suite takes the time of its slowest calculation. Alternatively,
+the shifts of a crystal are packed into one qcore invocation, with one named
+result per shift.
+"""
+
+import concurrent.futures
+import os
+import time
+import typing
+import numpy as np
+
+from src.run_qcore import run_qcore
+from translation_invariance.string_generator import xtb_input_string, crystal_in_bohr, shifted_crystal
+
+# Energy tolerance in Ha, if a test's assertions do not give one
+default_tolerance = 1.e-6
+
+
+def translation_test(crystal: dict, options: dict, assertions: dict, shift, named_result: str,
+                     comments=None) -> dict:
+
+    """
+    Collect a translational invariance test, with the same arguments as
+    string_generator.xtb_translational_invariance_string
+
+    Returns
+    -------
+    test : dict
+        'crystal' with lattice constants in bohr, 'options', 'named_result',
+        'shifts', floats or vectors, always starting with no shift, and the energy 'tolerance',
+        from the margin of the energy assertion
+    """
+
+    shifts = [0., shift] if isinstance(shift, float) else list(shift)
+    if np.any(shifts[0]):
+        shifts.insert(0, 0.)
+    energy_assertion = assertions.get('energy')
+    margin = energy_assertion.margin if energy_assertion is not None else ''
+    return {'crystal': crystal_in_bohr(crystal),
+            'options': options,
+            'named_result': named_result,
+            'shifts': shifts,
+            'tolerance': margin if margin not in ('', 0) else default_tolerance}
+
+
+def shift_inputs(test: dict) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Named result and input string of every shift of a test. Assertions are left to the runner.
+    If test['wrap'] is True, shifted positions are wrapped into the cell, rather than by qcore
+    """
+    inputs = []
+    for i, shift in enumerate(test['shifts']):
+        named_result = test['named_result'] + '_shift' + str(i)
+        crystal = shifted_crystal(test['crystal'], shift, wrap=test.get('wrap', False)) if np.any(shift) \
+            else test['crystal']
+        inputs.append((named_result, xtb_input_string(crystal, test['options'], None, named_result,
+                                                      convert_units=False)))
+    return inputs
+
+
+def _energy(output: dict, named_result: str) -> float:
+    return output.get(named_result, {}).get('energy', np.nan)
+
+
+def submit_test(executor: concurrent.futures.Executor, test: dict, packed=False) -> list:
+    """ Submit the shifts of a test. Returns (named results, future) pairs, each future returning a qcore output """
+    inputs = shift_inputs(test)
+    if packed:
+        packed_input = '\n'.join(input_string for _, input_string in inputs)
+        return [([named_result for named_result, _ in inputs], executor.submit(run_qcore, packed_input))]
+    return [([named_result], executor.submit(run_qcore, input_string)) for named_result, input_string in inputs]
+
+
+def collect_test(test: dict, submitted: list) -> dict:
+
+    """
+    Energies of a submitted test, compared to the unshifted energy
+
+    Returns
+    -------
+    result : dict
+        'shifts', 'energies' and 'deviations' from the unshifted energy, as
+        np.ndarrays, 'max_deviation', 'tolerance' and 'passed'. Failed runs
+        have NaN energies, and fail the test.
+    """
+
+    energies = []
+    for named_results, future in submitted:
+        output = future.result()
+        energies += [_energy(output, named_result) for named_result in named_results]
+    energies = np.array(energies)
+    deviations = energies - energies[0]
+    max_deviation = np.max(np.abs(deviations))
+    return {'shifts': np.array(test['shifts']),
+            'energies': energies,
+            'deviations': deviations,
+            'max_deviation': max_deviation,
+            'tolerance': test['tolerance'],
+            'passed': bool(max_deviation <= test['tolerance'])}
+
+
+def run_suite(test_functions: typing.Sequence[typing.Callable],
+              max_workers=None,
+              packed=False) -> typing.Dict[str, dict]:
+
+    """
+    Run translational invariance tests concurrently, and print a summary
+
+    Parameters
+    ----------
+    test_functions : sequence of callable
+        Functions taking a generator keyword, such as crystals.all_tests
+    max_workers : int, optional
+        Number of concurrent qcore processes. Defaults to one per run, up to the number of cores
+    packed : bool, optional
+        Run all shifts of a crystal in one qcore invocation
+
+    Returns
+    -------
+    results : dict
+        Keys = names of the test functions, values = as returned by collect_test
+    """
+
+    tests = [function(generator=translation_test) for function in test_functions]
+    n_runs = len(tests) if packed else sum(len(test['shifts']) for test in tests)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or min(n_runs, os.cpu_count())) as executor:
+        submitted = [submit_test(executor, test, packed) for test in tests]
+        results = {function.__name__: collect_test(test, runs)
+                   for function, test, runs in zip(test_functions, tests, submitted)}
+    wall_time = time.perf_counter() - start
+
+    print('test'.ljust(24) + 'shifts'.ljust(8) + 'max |dE| (Ha)'.ljust(16) + 'tolerance'.ljust(12) + 'result')
+    for name, result in results.items():
+        print(name.ljust(24) + str(result['shifts'].size).ljust(8) + '{:<16.2e}{:<12.1e}'.format(
+            result['max_deviation'], result['tolerance']) + ('pass' if result['passed'] else 'FAIL'))
+    # NaN if any run failed
+    max_deviation = np.max([result['max_deviation'] for result in results.values()] or [np.nan])
+    print('Maximum deviation {:.2e} Ha, {:d} of {:d} tests passed, in {:.1f} s'.format(
+        max_deviation, sum(result['passed'] for result in results.values()), len(results), wall_time))
+
+    return results
@@ -16,14 +16,19 @@ handled. One can switch between potential_type with the variable at the top of t
 arbitrary_shifts are given in fractional units and can be anything in principle.
 If A shifted position lies outside of [0:1], then wrap_atoms = true is automatically
 added to the structure command
+
+Each function passes its crystal, options, assertions and shift to generator,
+which by default returns the input string of the app test. See batch.py to
+run the tests directly instead.
 """
 
 from collections import OrderedDict
 
 from src.xtb_potential import xtb_potential_str, PotentialType
 from src.utils import Set, SetAssert
+from src.registry import Registry
 from crystal_system import cubic, tetragonal, hexagonal, trigonal, orthorhombic
-from src.pymatgen_wrappers import cif_parser_wrapper
+from src.pymatgen_wrappers import load_cif
 from translation_invariance.string_generator \
     import xtb_translational_invariance_string as translation_string, \
     comments_list
@@ -32,8 +37,12 @@ from translation_invariance.string_generator \
 # Variable used by WHOLE script
 potential_type = PotentialType.TRUNCATED
 
+# Generators of this module and their metadata, see src/registry.py
+registry = Registry('translation_invariance')
+
 
-def alpha_N2(named_result='alpha_N2') -> str:
+@registry.register(bravais='cubic', n_atoms=8, k_points=8, tags=('app_test',))
+def alpha_N2(named_result='alpha_N2', generator=translation_string) -> str:
     """
     Simple cubic
     TODO(Alex) If the shift is large for alpha N2, the total energy is massively different
@@ -45,7 +54,7 @@ def alpha_N2(named_result='alpha_N2') -> str:
     """
 
     fname = '../' + cubic.cubic_cifs['alpha-N2'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'cubic', "crystal not simple cubic"
     arbitrary_shift = 0.05
 
@@ -67,11 +76,12 @@ def alpha_N2(named_result='alpha_N2') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
 
 
-def sio2_zeolite(named_result='SiO2') -> str:
+@registry.register(bravais='bcc', n_atoms=18, k_points=8, tags=('app_test',))
+def sio2_zeolite(named_result='SiO2', generator=translation_string) -> str:
     """
     BCC structure
     Notes:
@@ -84,7 +94,7 @@ def sio2_zeolite(named_result='SiO2') -> str:
     """
 
     fname = '../' + cubic.bcc_cifs['sio2'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'bcc', "crystal not simple cubic"
 
     arbitrary_shift = 0.24
@@ -107,11 +117,12 @@ def sio2_zeolite(named_result='SiO2') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
 
 
-def silicon(named_result='silicon') -> str:
+@registry.register(bravais='fcc', n_atoms=2, k_points=8, tags=('app_test',))
+def silicon(named_result='silicon', generator=translation_string) -> str:
     """
     FCC structure
     :param named_result: named result string
@@ -139,11 +150,12 @@ def silicon(named_result='silicon') -> str:
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
 
 
-def copper(named_result='copper') -> str:
+@registry.register(bravais='fcc', n_atoms=1, k_points=8, tags=('app_test', 'metal'))
+def copper(named_result='copper', generator=translation_string) -> str:
     """
     FCC metal
     :param named_result: named result string
@@ -151,7 +163,7 @@ def copper(named_result='copper') -> str:
     """
 
     fname = '../' + cubic.fcc_cifs['copper'].file
-    crystal = cif_parser_wrapper(fname, fractional=True)
+    crystal = load_cif(fname, fractional=True)
     arbitrary_shift = 0.53
 
     options = OrderedDict([
@@ -172,11 +184,12 @@ def copper(named_result='copper') -> str:
                                               ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result, comments=comments_list(arbitrary_shift))
 
 
-def tio2_rutile(named_result='rutile') -> str:
+@registry.register(bravais='tetragonal', n_atoms=6, k_points=8, tags=('app_test',))
+def tio2_rutile(named_result='rutile', generator=translation_string) -> str:
     """
     Simple tetragonal
     Notes:
@@ -210,12 +223,13 @@ def tio2_rutile(named_result='rutile') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def tio2_anatase(named_result='anatase') -> str:
+@registry.register(bravais='body_centred_tetragonal', n_atoms=6, k_points=8, tags=('app_test',))
+def tio2_anatase(named_result='anatase', generator=translation_string) -> str:
     """
     Base-centred tetragonal
     :param named_result: named result string
@@ -244,12 +258,13 @@ def tio2_anatase(named_result='anatase') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def boron_nitride_hex(named_result='bn_hex') -> str:
+@registry.register(bravais='hexagonal', n_atoms=4, k_points=8, tags=('app_test',))
+def boron_nitride_hex(named_result='bn_hex', generator=translation_string) -> str:
     """
     Hexagonal.
 
@@ -277,12 +292,13 @@ def boron_nitride_hex(named_result='bn_hex') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def molybdenum_disulfide(named_result='MoS2') -> str:
+@registry.register(bravais='rhombohedral', n_atoms=3, k_points=8, tags=('app_test',))
+def molybdenum_disulfide(named_result='MoS2', generator=translation_string) -> str:
     """
     Rhombohedral.
 
@@ -311,12 +327,13 @@ def molybdenum_disulfide(named_result='MoS2') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def gold_cadmium(named_result='CaAu') -> str:
+@registry.register(bravais='orthorhombic', n_atoms=4, k_points=8)
+def gold_cadmium(named_result='CaAu', generator=translation_string) -> str:
     """
     Simple orthorhombic.
     TODO(Alex) Try to converge
@@ -325,7 +342,7 @@ def gold_cadmium(named_result='CaAu') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + orthorhombic.simple_orthorhombic_cifs['gold_cadmium'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     arbitrary_shift = 0.18
 
     options = OrderedDict([
@@ -347,12 +364,13 @@ def gold_cadmium(named_result='CaAu') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def calcium_titanate(named_result='CaTiO3') -> str:
+@registry.register(bravais='orthorhombic', n_atoms=20, k_points=8)
+def calcium_titanate(named_result='CaTiO3', generator=translation_string) -> str:
     """
     Simple orthorhombic.
     TODO(Alex) Try to converge
@@ -361,7 +379,7 @@ def calcium_titanate(named_result='CaTiO3') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + orthorhombic.simple_orthorhombic_cifs['calcium_titanate'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     arbitrary_shift = 0.18
 
     options = OrderedDict([
@@ -383,12 +401,13 @@ def calcium_titanate(named_result='CaTiO3') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def copper_oxyfluoride(named_result='CuO2F') -> str:
+@registry.register(bravais='body_centred_orthorhombic', n_atoms=8, k_points=1, tags=('app_test',))
+def copper_oxyfluoride(named_result='CuO2F', generator=translation_string) -> str:
     """
     Body-centred orthorhombic.
 
@@ -396,7 +415,7 @@ def copper_oxyfluoride(named_result='CuO2F') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + orthorhombic.body_centred_orthorhombic_cifs['copper_oxyfluoride'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     arbitrary_shift = 0.38
 
     options = OrderedDict([
@@ -418,13 +437,14 @@ def copper_oxyfluoride(named_result='CuO2F') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
 
-def aluminium_titanate(named_result='TiAl2O5') -> str:
+@registry.register(bravais='base_centred_orthorhombic', n_atoms=16, k_points=8)
+def aluminium_titanate(named_result='TiAl2O5', generator=translation_string) -> str:
     """
     Base-centred C orthorhombic.
     # NOTE: Can't converge
@@ -433,7 +453,7 @@ def aluminium_titanate(named_result='TiAl2O5') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + orthorhombic.base_centred_orthorhombic_cifs['aluminium_titanate'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     # Will require wrap_atoms
     arbitrary_shift = 0.38
 
@@ -456,12 +476,13 @@ def aluminium_titanate(named_result='TiAl2O5') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
-def titanium_disilicide(named_result='TiSi2') -> str:
+@registry.register(bravais='face_centred_orthorhombic', n_atoms=6, k_points=8)
+def titanium_disilicide(named_result='TiSi2', generator=translation_string) -> str:
     """
     Face-centred orthorhombic.
     # NOTE: Can't converge
@@ -470,7 +491,7 @@ def titanium_disilicide(named_result='TiSi2') -> str:
     :return: Input for testing translational invariance
     """
     fname = '../' + orthorhombic.face_centred_orthorhombic_cifs['titanium_disilicide'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     # Will require wrap_atoms
     arbitrary_shift = 0.38
 
@@ -493,9 +514,9 @@ def titanium_disilicide(named_result='TiSi2') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
 # TODO Find: simple monoclinic
@@ -504,7 +525,8 @@ def titanium_disilicide(named_result='TiSi2') -> str:
 # TODO Find: base-centred C monoclinic
 
 
-def malh_perovskite(named_result='malh_perovskite'):
+@registry.register(bravais='monoclinic', n_atoms=12, k_points=8)
+def malh_perovskite(named_result='malh_perovskite', generator=translation_string):
     """
     Second simple cubic, with several atoms in the central cell.
     # TODO Relaxed structure looks triclinic from lattice parameters
@@ -519,7 +541,7 @@ def malh_perovskite(named_result='malh_perovskite'):
     :return: Input for testing translational invariance
     """
     fname = '../' + cubic.cubic_cifs['CH3NH3PbI3'].file
-    crystal = cif_parser_wrapper(fname)
+    crystal = load_cif(fname)
     assert crystal['bravais'] == 'monoclinic', "crystal not simple monoclinic"
 
     arbitrary_shift = 0.65
@@ -545,11 +567,13 @@ def malh_perovskite(named_result='malh_perovskite'):
                                               ("energy", SetAssert(0, 0))])
     }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result,
-                              comments=comments_list(arbitrary_shift))
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result,
+                     comments=comments_list(arbitrary_shift))
 
 
 # TODO Add Triclinic
 
 
+# TODO(Alex) Add remaining lattices
+all_tests = registry.functions(tags='app_test')
@@ -4,7 +4,7 @@ Generate translational invariance input file.
 See translation_invariance.crystals for each crystal setting
 and details on the app test.
 """
-from translation_invariance.crystals import *
+from translation_invariance.crystals import registry
 
 
 def produce_translation_test(crystal_inputs: list):
@@ -32,20 +32,16 @@ test_header = \
 ! TODO(Alex) Add triclinic lattice test
 """
 
-# TODO(Alex) Add remaining lattices
-all_tests = [alpha_N2,               # Simple cubic
-             sio2_zeolite,           # BCC
-             silicon,                # FCC
-             copper,                 # FCC metal
-             tio2_rutile,            # Simple tetragonal
-             tio2_anatase,           # Base-centred tetragonal
-             boron_nitride_hex,      # Hexagonal
-             molybdenum_disulfide,   # Rhombohedral
-             copper_oxyfluoride      # Body-centred orthorhombic
-             ]
-
 print(test_header)
-print(produce_translation_test(all_tests))
+print(produce_translation_test(registry.functions(tags='app_test')))
+
+#print(produce_translation_test(registry.functions(names=['alpha_N2'])))
+
 
-#print(produce_translation_test([alpha_N2]))
+# To run the tests and compare energies directly, rather than printing the inputs:
+# from translation_invariance import batch
+# batch.run_suite(registry.functions(tags='app_test'))
 
+# To scan shifts along many directions, see scan.py:
+# from translation_invariance import scan
+# scan.run_scans(registry.functions(tags='app_test'))
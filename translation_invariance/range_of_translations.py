@@ -20,7 +20,7 @@ from translation_invariance.string_generator import xtb_translational_invariance
 potential_type = PotentialType.TRUNCATED
 
 
-def sio2_zeolite(named_result='SiO2') -> str:
+def sio2_zeolite(named_result='SiO2', generator=translation_string) -> str:
     """
     BCC structure
     :param named_result: named result string
@@ -52,11 +52,11 @@ def sio2_zeolite(named_result='SiO2') -> str:
 
     comments = ['! Fractional shift of '] * len(arbitrary_shifts)
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shifts, named_result,
-                              comments=[x + str(arbitrary_shifts[i]) for i, x in enumerate(comments)])
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shifts, named_result,
+                     comments=[x + str(arbitrary_shifts[i]) for i, x in enumerate(comments)])
 
-def sio2_zeolite_gamma_point(named_result='SiO2') -> str:
+def sio2_zeolite_gamma_point(named_result='SiO2', generator=translation_string) -> str:
     """
     BCC structure
     :param named_result: named result string
@@ -88,15 +88,12 @@ def sio2_zeolite_gamma_point(named_result='SiO2') -> str:
 
     comments = ['! Fractional shift of '] * len(arbitrary_shifts)
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shifts, named_result,
-                              comments=[x + str(arbitrary_shifts[i]) for i, x in enumerate(comments)])
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shifts, named_result,
+                     comments=[x + str(arbitrary_shifts[i]) for i, x in enumerate(comments)])
 
-print(sio2_zeolite_gamma_point())
-quit()
 
-
-def tio2_rutile_gamma(named_result='rutile') -> str:
+def tio2_rutile_gamma(named_result='rutile', generator=translation_string) -> str:
     """
     Simple tetragonal
     :param named_result: named result string
@@ -122,5 +119,16 @@ def tio2_rutile_gamma(named_result='rutile') -> str:
                                                         ("energy", SetAssert(0, 0))])
                   }
 
-    return translation_string(crystal, options, assertions[potential_type],
-                              arbitrary_shift, named_result)
\ No newline at end of file
+    return generator(crystal, options, assertions[potential_type],
+                     arbitrary_shift, named_result)
+
+
+if __name__ == '__main__':
+    print(sio2_zeolite_gamma_point())
+
+    # To run the shifts concurrently and compare energies, rather than printing the input:
+    # from translation_invariance import batch
+    # batch.run_suite([sio2_zeolite, sio2_zeolite_gamma_point])
+    # Or scan shifts along many directions, running those most likely to break invariance:
+    # from translation_invariance import scan
+    # scan.run_scans([sio2_zeolite, sio2_zeolite_gamma_point])
@@ -0,0 +1,280 @@
+"""
+Dense scan for translational non-invariance, along many directions.
+
+Rather than a few hand-picked shifts, shifts t d are sampled densely along
+lattice directions d (fractional coordinates, t in [0, 1)), and a cheap local
+surrogate picks the shifts most likely to expose non-invariance. Only those
+are run with qcore, concurrently.
+
+Surrogate: a rigid shift leaves every interatomic distance unchanged, but
+wrapping shifted atoms back into the cell changes the separation vector of a
+pair by a lattice vector. A real-space sum truncated by lattice translation,
+|T| < cutoff, rather than by distance, |r_ij + T| < cutoff, then includes a
+different set of images for that pair. The surrogate evaluates the change in
+sum_ij sum_{|T| < cutoff} 1 / sqrt(|r_ij + T|^2 + 1) caused by wrapping, which
+only needs the pairs whose wrapped separation changes.
+
+After the runs, the surrogate is calibrated against the qcore deviations by
+least squares, which interpolates the deviation over every scanned shift.
+Runs whose deviation is not explained by the calibrated surrogate (for
+example an SCF converging to a different state) are flagged as outliers.
+
+Shifts along directions with several nonzero components move atoms by more
+than one cell, so shifted positions are wrapped into the cell before they
+are passed to qcore, as the surrogate assumes.
+
+Run from this folder, as cif paths are relative to it, for example in
+range_of_translations.py:
+
+    from translation_invariance import scan
+    scan.run_scans([sio2_zeolite, sio2_zeolite_gamma_point])
+"""
+
+import itertools
+import math
+import typing
+import concurrent.futures
+import numpy as np
+
+from src import lattice_vectors
+from src.lattice_vectors import get_bravais
+from translation_invariance import batch
+
+# Robust z-score above which a run is an outlier
+outlier_threshold = 3.
+
+
+def lattice_directions(max_index=1) -> np.ndarray:
+    """ Lattice directions [uvw] with |u|, |v|, |w| <= max_index, one per +/- pair, without common factors """
+    directions = []
+    for uvw in itertools.product(range(-max_index, max_index + 1), repeat=3):
+        if uvw > (0, 0, 0) and math.gcd(*uvw) == 1:
+            directions.append(uvw)
+    return np.array(directions, dtype=float)
+
+
+def translation_vectors(lattice: np.ndarray, cutoff: float) -> np.ndarray:
+    """ Integer vectors n of all lattice translations L n with |L n| < cutoff """
+    reach = np.ceil(cutoff * np.linalg.norm(lattice_vectors.reciprocal_lattice_vectors(lattice), axis=0)
+                    / (2. * np.pi)).astype(int)
+    n = np.array(list(itertools.product(*[range(-m, m + 1) for m in reach])), dtype=float)
+    return n[np.linalg.norm(n @ lattice.T, axis=1) < cutoff]
+
+
+def surrogate_deviations(crystal: dict, shifts: np.ndarray, cutoff: float) -> np.ndarray:
+
+    """
+    Surrogate energy change of rigid shifts, from wrapping atoms into the cell
+
+    Parameters
+    ----------
+    crystal : dict
+        Crystal with fractional positions
+    shifts : np.ndarray
+        Fractional shifts, with shape (n_shifts, 3)
+    cutoff : float
+        Cutoff on lattice translations, in the unit of the lattice constants
+
+    Returns
+    -------
+    deviations : np.ndarray
+        Shape (n_shifts). Zero if no pair changes its wrapped separation
+    """
+
+    lattice = lattice_vectors.lattice_vectors_from_parameters(get_bravais(crystal), crystal['lattice_parameters'])
+    fractional = np.asarray(crystal['fractional'], dtype=float)
+    images = translation_vectors(lattice, cutoff)
+    i, j = np.triu_indices(fractional.shape[0])
+
+    def image_sum(separation):
+        r = (separation + images) @ lattice.T
+        distance2 = np.sum(r * r, axis=1)
+        return np.sum(1. / np.sqrt(distance2 + 1.))
+
+    # Sum over images for (i, j, change of wrapped separation), which repeats across shifts
+    image_sums = {}
+
+    def pair_sum(pair, change):
+        key = (pair, change)
+        if key not in image_sums:
+            image_sums[key] = image_sum(fractional[j[pair]] - fractional[i[pair]] + np.array(change))
+        return image_sums[key]
+
+    wrapped = np.floor(fractional)
+    deviations = np.zeros(len(shifts))
+    for k, shift in enumerate(shifts):
+        cell = np.floor(fractional + shift) - wrapped
+        changes = cell[i] - cell[j]
+        for pair in np.flatnonzero(np.any(changes != 0, axis=1)):
+            change = tuple(changes[pair])
+            deviations[k] += pair_sum(pair, change) - pair_sum(pair, (0., 0., 0.))
+    return deviations
+
+
+def select_shifts(deviations: np.ndarray, n_runs: int, n_per_direction: int) -> np.ndarray:
+
+    """
+    Indices of the shifts with the largest surrogate deviations, keeping
+    shifts apart such that one discontinuity does not take every run
+
+    Parameters
+    ----------
+    deviations : np.ndarray
+        Surrogate deviations with shape (n_directions, n_shifts)
+    n_runs : int
+        Number of shifts to select
+    n_per_direction : int
+        Maximum number of shifts per direction
+
+    Returns
+    -------
+    selected : np.ndarray
+        (direction, shift) index pairs, with shape (n_selected, 2)
+    """
+
+    n_shifts = deviations.shape[1]
+    separation = max(1, n_shifts // (2 * n_per_direction))
+    selected = []
+    for flat in np.argsort(-np.abs(deviations), axis=None):
+        d, s = np.unravel_index(flat, deviations.shape)
+        same_direction = [t for e, t in selected if e == d]
+        if len(same_direction) >= n_per_direction or \
+                any(min(abs(s - t), n_shifts - abs(s - t)) < separation for t in same_direction):
+            continue
+        selected.append((d, s))
+        if len(selected) == n_runs:
+            break
+    return np.array(selected, dtype=int).reshape(-1, 2)
+
+
+def robust_outliers(residuals: np.ndarray, threshold=outlier_threshold) -> np.ndarray:
+    """ Residuals further than threshold robust standard deviations (1.4826 MAD) from the median """
+    median = np.nanmedian(residuals)
+    mad = 1.4826 * np.nanmedian(np.abs(residuals - median))
+    if not mad > 0:
+        return np.abs(residuals - median) > 0
+    return np.abs(residuals - median) > threshold * mad
+
+
+def scan_translations(test_function: typing.Callable,
+                      directions=None,
+                      n_shifts=100,
+                      n_runs=16,
+                      n_per_direction=3,
+                      cutoff=None,
+                      max_workers=None,
+                      packed=False) -> dict:
+
+    """
+    Scan shifts along many directions, and run those the surrogate ranks highest.
+
+    Parameters
+    ----------
+    test_function : callable
+        Test of crystals.py or range_of_translations.py, taking a generator keyword
+    directions : np.ndarray, optional
+        Fractional directions, with shape (n_directions, 3). Defaults to the 13
+        directions of lattice_directions(1)
+    n_shifts : int, optional
+        Number of shifts t d per direction, for t in [0, 1)
+    n_runs : int, optional
+        Number of shifted qcore runs, in addition to the unshifted run
+    n_per_direction : int, optional
+        Maximum number of runs per direction
+    cutoff : float, optional
+        Surrogate translation cutoff, in bohr. Defaults to ewald_real_cutoff
+    max_workers : int, optional
+        Number of concurrent qcore processes. Defaults to one per run
+    packed : bool, optional
+        Run all shifts in one qcore invocation
+
+    Returns
+    -------
+    scan : dict
+        'shifts': scanned shifts with shape (n_directions, n_shifts, 3),
+        'surrogate': calibrated surrogate deviations over all scanned shifts, in Ha,
+        'run_shifts', 'deviations' and 'outliers' of the qcore runs,
+        'worst_shift' and 'worst_deviation' of the runs, 'predicted_worst_shift'
+        and 'predicted_worst_deviation' from the calibrated surrogate,
+        'tolerance' and 'passed'
+    """
+
+    test = test_function(generator=batch.translation_test)
+    directions = lattice_directions(1) if directions is None else np.asarray(directions, dtype=float)
+    if cutoff is None:
+        cutoff = test['options']['ewald_real_cutoff'].value if 'ewald_real_cutoff' in test['options'] else 40.
+
+    t = np.arange(1, n_shifts + 1) / (n_shifts + 1)
+    shifts = t[None, :, None] * directions[:, None, :]
+    surrogate = surrogate_deviations(test['crystal'], shifts.reshape(-1, 3), cutoff).reshape(shifts.shape[:2])
+
+    selected = select_shifts(surrogate, n_runs, n_per_direction)
+    run_shifts = shifts[selected[:, 0], selected[:, 1]]
+    test['shifts'] = [np.zeros(3)] + list(run_shifts)
+    test['wrap'] = True
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or len(test['shifts'])) as executor:
+        result = batch.collect_test(test, batch.submit_test(executor, test, packed))
+    deviations = result['deviations'][1:]
+
+    # Calibrate the surrogate to the qcore deviations: deviation = scale * surrogate
+    x = surrogate[selected[:, 0], selected[:, 1]]
+    finite = np.isfinite(deviations)
+    scale = np.dot(x[finite], deviations[finite]) / np.dot(x[finite], x[finite]) if np.any(x[finite]) else 0.
+    outliers = robust_outliers(deviations - scale * x) | ~finite
+
+    worst = int(np.nanargmax(np.abs(deviations))) if finite.any() else 0
+    predicted_worst = np.unravel_index(np.argmax(np.abs(scale * surrogate)), surrogate.shape)
+
+    return {'shifts': shifts,
+            'surrogate': scale * surrogate,
+            'run_shifts': run_shifts,
+            'deviations': deviations,
+            'outliers': outliers,
+            'worst_shift': run_shifts[worst],
+            'worst_deviation': deviations[worst],
+            'predicted_worst_shift': shifts[predicted_worst],
+            'predicted_worst_deviation': scale * surrogate[predicted_worst],
+            'tolerance': test['tolerance'],
+            'passed': result['passed']}
+
+
+def print_scan(name: str, scan: dict) -> None:
+    """ Runs of a scan, flagging outliers and the worst-case shift """
+    print(name, 'max |dE| = {:.2e} Ha, tolerance {:.1e} Ha, {}'.format(
+        abs(scan['worst_deviation']), scan['tolerance'], 'pass' if scan['passed'] else 'FAIL'))
+    print('shift'.ljust(30) + 'dE (Ha)'.ljust(14) + 'surrogate (Ha)')
+    for k, shift in enumerate(scan['run_shifts']):
+        flags = (' outlier' if scan['outliers'][k] else '') + \
+                (' worst' if np.array_equal(shift, scan['worst_shift']) else '')
+        surrogate = scan['surrogate'].reshape(-1)[np.flatnonzero(
+            np.all(scan['shifts'].reshape(-1, 3) == shift, axis=1))[0]]
+        print(str(np.round(shift, 4)).ljust(30) + '{:<14.2e}{:<14.2e}'.format(scan['deviations'][k], surrogate) + flags)
+    print('Predicted worst shift', np.round(scan['predicted_worst_shift'], 4),
+          'dE = {:.2e} Ha'.format(scan['predicted_worst_deviation']))
+
+
+def run_scans(test_functions: typing.Sequence[typing.Callable], **kwargs) -> typing.Dict[str, dict]:
+
+    """
+    Scan every test function in turn, and print each scan and a summary
+
+    Parameters
+    ----------
+    test_functions : sequence of callable
+        Functions taking a generator keyword, such as crystals.all_tests
+    **kwargs
+        Passed to scan_translations
+
+    Returns
+    -------
+    scans : dict
+        Keys = names of the test functions, values = as returned by scan_translations
+    """
+
+    scans = {}
+    for function in test_functions:
+        scans[function.__name__] = scan_translations(function, **kwargs)
+        print_scan(function.__name__, scans[function.__name__])
+    print('{:d} of {:d} scans passed'.format(sum(scan['passed'] for scan in scans.values()), len(scans)))
+    return scans
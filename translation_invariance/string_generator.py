@@ -1,5 +1,5 @@
 from collections import OrderedDict
-import copy
+import numpy as np
 
 from src import qcore_input_strings as qcore_input, utils
 
@@ -25,13 +25,35 @@ def comments_list(shifts) -> list:
         return comments
 
 
+def crystal_in_bohr(crystal: dict) -> dict:
+    """ Shallow copy of crystal with lattice constants in bohr. The caller's crystal is not modified """
+    return dict(crystal, lattice_parameters=utils.angstrom_to_bohr(crystal['lattice_parameters']))
+
+
+def shifted_crystal(crystal: dict, shift, wrap=False) -> dict:
+    """
+    Shallow copy of crystal with all positions rigidly shifted. The caller's crystal is not modified.
+    shift is a float, added to every component, or a vector.
+    If wrap, fractional positions are wrapped back into [0, 1)
+    """
+    if np.ndim(shift) == 0 and not wrap:
+        return utils.update_positions(dict(crystal), shift)
+    position_key = utils.get_positions_key(crystal)
+    assert position_key == 'fractional' or not wrap, "Only fractional positions can be wrapped"
+    positions = np.add(crystal[position_key], shift)
+    if wrap:
+        positions = utils.wrap_fractional_positions(positions, in_place=True)
+    return dict(crystal, **{position_key: positions.tolist()})
+
+
 def xtb_input_string(
         crystal:      dict,
         options:      dict,
         assertions:   dict,
         named_result: str,
         sub_commands=None,
-        comments=None) -> str:
+        comments=None,
+        convert_units=True) -> str:
     """
     Generate two input strings to test the translational invariance of periodic xTB in qCore.
 
@@ -44,18 +66,22 @@ def xtb_input_string(
     options : dict
          xTB options (excluding sub-commands, like structure)
     assertions : dict
-         assertions
+         assertions. None for no assertions
     shift : float
         rigid shift to atomic positions, in fractional units
     named_result : str
         named result
+    convert_units : bool, optional
+        Convert lattice constants from angstrom to bohr. False if the crystal
+        has already been converted, see crystal_in_bohr
 
     Results
     ----------
     qcore periodic xtb input string : str
 
     """
-    crystal['lattice_parameters'] = utils.angstrom_to_bohr(crystal['lattice_parameters'])
+    if convert_units:
+        crystal = crystal_in_bohr(crystal)
     all_positions_in_cell = utils.check_fractional_positions(named_result, crystal['fractional'])
 
     if all_positions_in_cell:
@@ -66,7 +92,7 @@ def xtb_input_string(
 
     sub_commands_str = qcore_input.commands_to_string(sub_commands) if sub_commands is not None else ''
     options_str = qcore_input.option_to_string(options)
-    assertions_str = qcore_input.assertions_string(named_result, assertions)
+    assertions_str = qcore_input.assertions_string(named_result, assertions) if assertions is not None else ''
     comments_str = comments if comments else ''
 
     return comments_str + '\n' + named_result + ' := xtb(\n ' + structure_str + '\n' + \
@@ -91,9 +117,11 @@ def xtb_translational_invariance_string(
         else:
             comments = [''] * 2
 
-        input_no_shift = xtb_input_string(crystal, options, assertions, named_result + '_no_shift', comments=comments[0])
-        crystal = utils.update_positions(crystal, shift)
-        input_shift = xtb_input_string(crystal, options, assertions, named_result + '_shift', comments=comments[1])
+        crystal = crystal_in_bohr(crystal)
+        input_no_shift = xtb_input_string(crystal, options, assertions, named_result + '_no_shift',
+                                          comments=comments[0], convert_units=False)
+        input_shift = xtb_input_string(shifted_crystal(crystal, shift), options, assertions, named_result + '_shift',
+                                       comments=comments[1], convert_units=False)
         return input_no_shift + '\n' + input_shift
 
     elif isinstance(shift, list):
@@ -102,11 +130,12 @@ def xtb_translational_invariance_string(
         else:
             comments = [''] * len(shift)
 
+        # Lattice constants are converted once, and positions are only copied when shifted
+        crystal = crystal_in_bohr(crystal)
         input = ''
         for i,s in enumerate(shift):
             assert isinstance(s, float), "fractional shift must a float or list of floats"
-            updated_crystal = utils.update_positions(copy.deepcopy(crystal), s)
-            input += xtb_input_string(updated_crystal, options, assertions,
-                                      named_result + '_shift' + str(i), comments=comments[i]) + '\n'
+            input += xtb_input_string(shifted_crystal(crystal, s), options, assertions,
+                                      named_result + '_shift' + str(i), comments=comments[i],
+                                      convert_units=False) + '\n'
         return input
-